@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """Raised when the service already holds as many analyses as it accepts."""
+
+
+def request_key(category, reviews):
+    payload = json.dumps([category, list(reviews)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def to_json(result):
+    # pydantic v2 models, pydantic.v1 models, or plain dicts
+    if hasattr(result, "model_dump"):
+        return result.model_dump()
+    if hasattr(result, "dict"):
+        return result.dict()
+    return result
+
+
+class AnalysisService:
+    """Runs blocking analyzer.analyze_category calls off the event loop.
+
+    Analyses run on a pool of `workers` threads. Identical in-flight
+    (category, reviews) requests share one upstream call. At most
+    workers + max_queue distinct analyses are accepted at once; beyond that
+    analyze() raises QueueFull so the caller can shed load.
+    """
+
+    def __init__(self, analyzer, workers=4, max_queue=16):
+        self.analyzer = analyzer
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+        self.in_flight = {}  # request key -> asyncio.Future
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self):
+        return self.workers + self.max_queue
+
+    def _analyze(self, category, reviews):
+        return to_json(self.analyzer.analyze_category(category, reviews))
+
+    async def analyze(self, category, reviews):
+        key = request_key(category, reviews)
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            if len(self.in_flight) >= self.capacity:
+                self.rejected += 1
+                raise QueueFull(f"{len(self.in_flight)} analyses in progress")
+            self.upstream_calls += 1
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, self._analyze, category, reviews)
+            self.in_flight[key] = future
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        # Shielded so one caller disconnecting does not cancel the shared call
+        return await asyncio.shield(future)
+
+    async def analyze_batch(self, items, load_reviews):
+        """Analyze many (car_name, car_year, category) items, yielding results as they finish.
+
+        Each item's reviews are loaded with load_reviews(car_name, car_year,
+        category), in a thread, e.g. the car's reviews tagged with that
+        category. At most `workers` items are loaded and analyzed at once,
+        which keeps the pool busy without the batch filling the queue and
+        shedding its own items; a 429 only comes from other traffic. Each
+        yielded dict carries the item's fields and either "result" or
+        "error" with an HTTP-style "status".
+        """
+        slots = asyncio.Semaphore(self.workers)
+
+        async def run(car_name, car_year, category):
+            line = {"car_name": car_name, "car_year": car_year, "category": category}
+            try:
+                async with slots:
+                    reviews = await asyncio.to_thread(load_reviews, car_name, car_year, category)
+                    if not reviews:
+                        return {**line, "status": 404, "error": "No reviews for this car and category"}
+                    return {**line, "status": 200, "result": await self.analyze(category, reviews)}
+            except QueueFull as e:
+                return {**line, "status": 429, "error": str(e)}
+            except Exception as e:
+                print(f"Error analyzing {category} for {car_name} {car_year}:", e)
+                return {**line, "status": 500, "error": str(e)}
+
+        tasks = [asyncio.ensure_future(run(*item)) for item in dict.fromkeys(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # If the caller went away, stop waiting; shared analyses keep running for others
+            for task in tasks:
+                task.cancel()
+
+    def stats(self):
+        return {
+            "in_flight": len(self.in_flight),
+            "capacity": self.capacity,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
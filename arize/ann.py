@@ -0,0 +1,173 @@
+"""Approximate nearest-neighbour search over unit-length vectors with IVF-PQ.
+
+Vectors are partitioned by a coarse k-means quantizer into nlist inverted
+lists. Within a list each vector is stored as the product-quantized residual
+from its list centroid: m sub-vectors, each replaced by the id of its nearest
+of 256 sub-centroids (one byte). A query scans only the nprobe lists whose
+centroids are closest, scores their codes with per-query lookup tables
+(asymmetric distance), and re-scores the best `rerank` candidates exactly
+against the full vectors.
+
+Knobs, from faster to more accurate: nprobe (lists scanned per query) and
+rerank (candidates scored exactly). nlist and m are fixed at training time.
+"""
+import numpy as np
+
+KSUB = 256  # sub-centroids per subspace, so a code fits in a uint8
+
+
+def kmeans(x, k, iters=10, seed=0):
+    """Lloyd's k-means; returns (k, dim) centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), k, replace=len(x) < k)].copy()
+    for _ in range(iters):
+        labels = assign(x, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=k)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        filled = counts > 0
+        sums = np.add.reduceat(x[order], starts[filled], axis=0)
+        centroids[filled] = sums / counts[filled, None]
+        # Empty clusters are restarted at random points
+        empty = np.flatnonzero(~filled)
+        centroids[empty] = x[rng.integers(len(x), size=len(empty))]
+    return centroids
+
+
+def assign(x, centroids, batch=8192):
+    """Index of the nearest centroid (L2) for every row of x."""
+    norms = (centroids ** 2).sum(axis=1)
+    labels = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), batch):
+        block = x[start:start + batch]
+        labels[start:start + batch] = np.argmin(norms - 2 * block @ centroids.T, axis=1)
+    return labels
+
+
+class IVFPQIndex:
+    def __init__(self, dim, nlist=256, m=48, nprobe=16, rerank=64, seed=0):
+        if dim % m:
+            raise ValueError(f"dim {dim} is not divisible by m={m}")
+        self.dim = dim
+        self.nlist = nlist
+        self.m = m
+        self.dsub = dim // m
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.seed = seed
+        self.centroids = None  # (nlist, dim)
+        self.codebooks = None  # (m, KSUB, dsub)
+        self.terms = None  # (nlist, m, KSUB) list-dependent part of the distance tables
+        self.list_rows = [np.zeros(0, dtype=np.int64) for _ in range(nlist)]
+        self.list_codes = [np.zeros((0, m), dtype=np.uint8) for _ in range(nlist)]
+        self.ntotal = 0
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def train(self, vectors, sample=50_000):
+        """Fit the coarse quantizer and the PQ codebooks on (a sample of) vectors."""
+        x = np.asarray(vectors, dtype=np.float32)
+        if len(x) > sample:
+            x = x[np.random.default_rng(self.seed).choice(len(x), sample, replace=False)]
+        self.nlist = min(self.nlist, len(x))
+        self.list_rows = self.list_rows[:self.nlist]
+        self.list_codes = self.list_codes[:self.nlist]
+        self.centroids = kmeans(x, self.nlist, seed=self.seed)
+        residuals = x - self.centroids[assign(x, self.centroids)]
+        self.codebooks = np.stack([
+            kmeans(residuals[:, j * self.dsub:(j + 1) * self.dsub], KSUB, seed=self.seed + j)
+            for j in range(self.m)
+        ])
+        self.precompute()
+
+    def precompute(self):
+        """Distance-table terms that do not depend on the query.
+
+        For residual r = q - c of list c, the squared distance to sub-centroid
+        b is |r|^2 - 2 q.b + (|b|^2 + 2 c.b) per subspace: the first term comes
+        with the coarse search, q.b is computed once per query, and the rest is
+        fixed per (list, subspace, sub-centroid).
+        """
+        sub_centroids = self.centroids.reshape(self.nlist, self.m, self.dsub)
+        norms = (self.codebooks ** 2).sum(axis=2)
+        self.terms = norms[None] + 2 * np.einsum("lmd,mkd->lmk", sub_centroids, self.codebooks)
+
+    def encode(self, residuals):
+        codes = np.empty((len(residuals), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = assign(residuals[:, j * self.dsub:(j + 1) * self.dsub], self.codebooks[j])
+        return codes
+
+    def add(self, vectors, rows):
+        """Add vectors, identified by their rows in the backing matrix."""
+        x = np.asarray(vectors, dtype=np.float32)
+        rows = np.asarray(rows, dtype=np.int64)
+        labels = assign(x, self.centroids)
+        codes = self.encode(x - self.centroids[labels])
+        for j in np.unique(labels):
+            members = labels == j
+            self.list_rows[j] = np.concatenate([self.list_rows[j], rows[members]])
+            self.list_codes[j] = np.concatenate([self.list_codes[j], codes[members]])
+        self.ntotal += len(x)
+
+    def search(self, query, k, vectors, nprobe=None, rerank=None):
+        """Return [(row, score)] of the k best matches by inner product.
+
+        vectors is the full (n, dim) matrix the rows refer to, used to re-score
+        the candidates exactly.
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        rerank = max(rerank or self.rerank, k)
+        q = np.asarray(query, dtype=np.float32)
+
+        coarse = ((self.centroids - q) ** 2).sum(axis=1)
+        probes = np.argpartition(coarse, nprobe - 1)[:nprobe]
+        probes = [j for j in probes if len(self.list_rows[j])]
+        if not probes:
+            return []
+
+        inner = np.einsum("md,mkd->mk", q.reshape(self.m, self.dsub), self.codebooks)
+        subspaces = np.arange(self.m)
+        candidates, distances = [], []
+        for j in probes:
+            table = self.terms[j] - 2 * inner
+            distances.append(coarse[j] + table[subspaces, self.list_codes[j]].sum(axis=1))
+            candidates.append(self.list_rows[j])
+        candidates = np.concatenate(candidates)
+        distances = np.concatenate(distances)
+        if len(candidates) > rerank:
+            keep = np.argpartition(distances, rerank - 1)[:rerank]
+            candidates = candidates[keep]
+        candidates.sort()  # sequential reads from a memory-mapped matrix
+        scores = vectors[candidates] @ q
+        order = np.argsort(-scores)[:k]
+        return [(int(candidates[i]), float(scores[i])) for i in order]
+
+    def save(self, path):
+        sizes = np.array([len(rows) for rows in self.list_rows], dtype=np.int64)
+        np.savez(
+            path,
+            params=np.array([self.dim, self.nlist, self.m, self.nprobe, self.rerank, self.seed, self.ntotal]),
+            centroids=self.centroids,
+            codebooks=self.codebooks,
+            sizes=sizes,
+            rows=np.concatenate(self.list_rows),
+            codes=np.concatenate(self.list_codes),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            dim, nlist, m, nprobe, rerank, seed, ntotal = (int(v) for v in data["params"])
+            index = cls(dim, nlist, m, nprobe, rerank, seed)
+            index.centroids = data["centroids"]
+            index.codebooks = data["codebooks"]
+            bounds = np.concatenate([[0], np.cumsum(data["sizes"])])
+            rows, codes = data["rows"], data["codes"]
+            index.list_rows = [rows[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+            index.list_codes = [codes[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+            index.ntotal = ntotal
+        index.precompute()
+        return index
@@ -1,10 +1,142 @@
-from fastapi import FastAPI
-from tamu import ReviewAnalyzer
-from typing import List
+import asyncio
+import json
+import threading
+import uuid
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
-app = FastAPI()
-analyzer = ReviewAnalyzer()
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 
-@app.post("/api/analyze-reviews")
-async def analyze_reviews(category: str, reviews: List[str]):
-    return analyzer.analyze_category(category, reviews) 
\ No newline at end of file
+from analysis_service import AnalysisService, QueueFull
+
+
+class LazySystem:
+    """CarReviewSystem, built on first use (in a worker thread) rather than at import."""
+
+    def __init__(self):
+        self.system = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if self.system is None:
+                from tamu import CarReviewSystem
+                self.system = CarReviewSystem()
+        return self.system
+
+    def analyze_category(self, category, reviews):
+        return self.get().analyze_category(category, reviews)
+
+    async def stream_chat(self, query, session_id):
+        # Built in a thread, since loading the vector index would block the event loop
+        system = await asyncio.to_thread(self.get)
+        async for piece in system.stream_chat(query, session_id):
+            yield piece
+
+    def drop_chat(self, session_id):
+        # No sessions exist before the system is built
+        if self.system is not None:
+            self.system.chat_service.store.drop(session_id)
+
+
+def database_reviews(car_name, car_year=None, category="overall"):
+    from review_documents import load_review_texts
+    return load_review_texts(car_name, car_year, category)
+
+
+class BatchItem(BaseModel):
+    car_name: str
+    car_year: Optional[int] = None
+    category: str
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+
+
+def sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def create_app(analyzer=None, review_source=database_reviews, chat=None, workers=4, max_queue=16):
+    """analyzer is anything with analyze_category(category, reviews); defaults to CarReviewSystem.
+
+    review_source(car_name, car_year, category) returns the reviews of a car tagged
+    with category, for batch requests.
+    chat is a ChatService; defaults to CarReviewSystem's, through stream_chat,
+    which fails when no documents are loaded rather than answer without context.
+    """
+    system = LazySystem()
+    service = AnalysisService(analyzer or system, workers=workers, max_queue=max_queue)
+
+    def stream_answer(session_id, message):
+        if chat is None:
+            return system.stream_chat(message, session_id)
+        return chat.stream(session_id, message)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        service.shutdown()
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.analysis = service
+
+    @app.post("/api/analyze-reviews")
+    async def analyze_reviews(category: str, reviews: List[str]):
+        try:
+            return await service.analyze(category, reviews)
+        except QueueFull:
+            raise HTTPException(status_code=429, detail="Too many analyses in progress", headers={"Retry-After": "1"})
+
+    @app.post("/api/analyze-batch")
+    async def analyze_batch(request: BatchRequest):
+        """Stream one NDJSON line per (car, category) item, in order of completion."""
+        items = [(item.car_name, item.car_year, item.category) for item in request.items]
+
+        async def lines():
+            async for line in service.analyze_batch(items, review_source):
+                yield json.dumps(line) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.get("/api/chat/stream")
+    async def chat_stream(message: str, session_id: Optional[str] = None):
+        """Server-sent events: a "session" event with the session id, one "token"
+        event per piece of the answer, then "done" (or "error")."""
+        session_id = session_id or uuid.uuid4().hex
+
+        async def events():
+            yield sse({"session_id": session_id}, "session")
+            try:
+                async for piece in stream_answer(session_id, message):
+                    yield sse({"token": piece}, "token")
+            except Exception as e:
+                print(f"Error in chat session {session_id}:", e)
+                yield sse({"error": str(e)}, "error")
+                return
+            yield sse({}, "done")
+
+        # No buffering by proxies, so tokens reach the client as they are produced
+        return StreamingResponse(events(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @app.delete("/api/chat/{session_id}")
+    async def end_chat(session_id: str):
+        if chat is None:
+            system.drop_chat(session_id)
+        else:
+            chat.store.drop(session_id)
+        return {"session_id": session_id}
+
+    @app.get("/api/analysis-stats")
+    async def analysis_stats():
+        return service.stats()
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,100 @@
+"""Local BM25 keyword search over the documents of a vector store.
+
+Postings are kept per term as growing arrays of (row, term frequency), so
+documents can be added incrementally in the same row order as the store.
+Scoring a query touches only the postings of its terms.
+"""
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i in is it its my of on or so that the this to was were
+with what which who how do does did not no very just than then there their they them about into can
+""".split())
+
+
+def tokenize(text):
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class Postings:
+    __slots__ = ("rows", "tfs", "size")
+
+    def __init__(self):
+        self.rows = np.zeros(4, dtype=np.int64)
+        self.tfs = np.zeros(4, dtype=np.float32)
+        self.size = 0
+
+    def append(self, row, tf):
+        if self.size == len(self.rows):
+            self.rows = np.resize(self.rows, 2 * self.size)
+            self.tfs = np.resize(self.tfs, 2 * self.size)
+        self.rows[self.size] = row
+        self.tfs[self.size] = tf
+        self.size += 1
+
+
+class BM25Index:
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = np.zeros(0, dtype=np.float32)
+        self.count = 0
+        self.total_length = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, term):
+        return term in self.postings
+
+    def add(self, row, text):
+        """Index text as document `row`; rows must be added in increasing order."""
+        tokens = tokenize(text)
+        for term, tf in Counter(tokens).items():
+            if term not in self.postings:
+                self.postings[term] = Postings()
+            self.postings[term].append(row, tf)
+        if row >= len(self.lengths):
+            self.lengths = np.resize(self.lengths, max(2 * len(self.lengths), row + 1))
+        self.lengths[row] = len(tokens)
+        self.count = max(self.count, row + 1)
+        self.total_length += len(tokens)
+
+    def idf(self, term):
+        df = self.postings[term].size
+        return math.log(1 + (self.count - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k, rows=None):
+        """Return [(row, score)] of the k best matching documents.
+
+        rows, a sorted array, restricts the search to those documents.
+        """
+        if not self.count:
+            return []
+        avgdl = self.total_length / self.count
+        scores = np.zeros(self.count, dtype=np.float32)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            docs = postings.rows[:postings.size]
+            tf = postings.tfs[:postings.size]
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[docs] / avgdl)
+            scores[docs] += self.idf(term) * tf * (self.k1 + 1) / (tf + norm)
+
+        if rows is not None:
+            candidates = rows[scores[rows] > 0]
+        else:
+            candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return []
+        k = min(k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top]
@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+SUMMARY_PROMPT = """Summarize this conversation between a user and a car review assistant in under 150 words.
+Keep the cars, features and conclusions discussed so far.
+
+{summary}
+{turns}"""
+
+
+def estimate_tokens(text):
+    # Rough count for history budgets; about 4 characters per token for English
+    return len(text) // 4 + 1
+
+
+def content(message):
+    # Chat models return message objects, completion models plain strings
+    return getattr(message, "content", message)
+
+
+class EventLoopThread:
+    """One long-lived event loop on a daemon thread, for calling async code from sync code.
+
+    asyncio.run per call would fail inside a running loop and close the loop
+    the LLM's async client is bound to after every turn. Coroutines submitted
+    with run() all share this loop, so background tasks such as chat
+    compaction keep running between calls.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="chat-loop", daemon=True)
+        self.thread.start()
+
+    def run(self, coro):
+        """Run coro on the loop and block until it returns."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class ChatSession:
+    def __init__(self, session_id):
+        self.id = session_id
+        self.summary = ""
+        self.turns = []  # [(question, answer)], oldest first
+        self.last_used = time.monotonic()
+        self.lock = asyncio.Lock()  # one turn at a time per session
+
+    def history_tokens(self):
+        return sum(estimate_tokens(question) + estimate_tokens(answer) for question, answer in self.turns)
+
+
+class SessionStore:
+    """Chat sessions by id, evicted after `ttl` idle seconds or beyond max_sessions (LRU)."""
+
+    def __init__(self, ttl=1800, max_sessions=1000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+
+    def evict(self):
+        now = time.monotonic()
+        # Sessions are kept in last-used order, so expired ones are at the front
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if now - session.last_used < self.ttl and len(self.sessions) <= self.max_sessions:
+                break
+            self.sessions.popitem(last=False)
+
+    def get(self, session_id=None):
+        """Return the session for session_id, creating it (with a new id if None)."""
+        self.evict()
+        session_id = session_id or uuid.uuid4().hex
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = ChatSession(session_id)
+        session.last_used = time.monotonic()
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def drop(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+class ChatService:
+    """Retrieval-augmented chat with per-session memory, streamed token by token.
+
+    system must have `llm` (a LangChain LLM or chat model), `retriever` (a
+    HybridRetriever) and `chat_template`, a system prompt with {context} and
+    {chat_history} placeholders. The prompt carries the retrieved reviews, a running
+    summary of older turns and the most recent turns that fit history_budget
+    tokens. Once a session's turns exceed the budget, the oldest are folded
+    into the summary in a background task after the answer has streamed, so
+    compaction never delays a reply; the session's next turn waits for it.
+    """
+
+    def __init__(self, system, history_budget=1500, k=5, store=None):
+        self.system = system
+        self.history_budget = history_budget
+        self.k = k
+        self.store = store or SessionStore()
+        self.background = set()
+
+    def retrieve(self, question):
+        docs, _ = self.system.retriever.search(question, k=self.k)
+        return "\n\n".join(doc.page_content for doc in docs)
+
+    def messages(self, session, context, question):
+        history = []
+        if session.summary:
+            history.append(f"Summary of earlier conversation: {session.summary}")
+        for previous, answer in session.turns:
+            history.append(f"Human: {previous}\nAssistant: {answer}")
+        system = self.system.chat_template.format(context=context, chat_history="\n".join(history))
+        return [("system", system), ("human", f"Question: {question}")]
+
+    async def stream(self, session_id, question):
+        """Yield the answer to question in session_id piece by piece as the model produces it."""
+        session = self.store.get(session_id)
+        async with session.lock:
+            # Retrieval is synchronous (and may embed the question), so it runs in a thread
+            context = await asyncio.to_thread(self.retrieve, question)
+            answer = []
+            async for chunk in self.system.llm.astream(self.messages(session, context, question)):
+                piece = content(chunk)
+                if piece:
+                    answer.append(piece)
+                    yield piece
+            session.turns.append((question, "".join(answer)))
+            session.last_used = time.monotonic()
+        if session.history_tokens() > self.history_budget:
+            task = asyncio.create_task(self.compact(session))
+            self.background.add(task)
+            task.add_done_callback(self.background.discard)
+
+    async def ask(self, session_id, question):
+        return "".join([piece async for piece in self.stream(session_id, question)])
+
+    async def drain(self):
+        """Wait for pending compactions, e.g. before the event loop closes."""
+        if self.background:
+            await asyncio.gather(*self.background, return_exceptions=True)
+
+    async def compact(self, session):
+        """Fold the oldest turns into the summary until the rest fit history_budget."""
+        async with session.lock:
+            folded = []
+            # The latest turn always stays verbatim
+            while len(session.turns) > 1 and session.history_tokens() > self.history_budget:
+                folded.append(session.turns.pop(0))
+            if not folded:
+                return
+            turns = "\n".join(f"Human: {question}\nAssistant: {answer}" for question, answer in folded)
+            prompt = SUMMARY_PROMPT.format(summary=session.summary, turns=turns)
+            try:
+                session.summary = content(await self.system.llm.ainvoke(prompt)).strip()
+            except Exception as e:
+                # Keep the turns rather than lose them; compaction is retried after the next turn
+                print(f"Error summarizing chat session {session.id}:", e)
+                session.turns[:0] = folded
@@ -0,0 +1,62 @@
+"""Single-pass packing of reviews into token-budgeted chunks.
+
+Each text is tokenized once (counts are cached, so texts seen by earlier
+calls are not tokenized again) and whole reviews are packed greedily into
+chunks of at most `budget` tokens. A review longer than the budget is split
+at sentence boundaries, and only a single sentence longer than the budget
+is cut mid-sentence. Input can be any iterable and chunks are yielded as
+soon as they fill, so a stream of reviews never has to be held in memory.
+"""
+import re
+from functools import lru_cache
+
+import tiktoken
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+SEPARATOR = "\n"
+
+
+def split_sentences(text):
+    return [sentence for sentence in SENTENCE_END.split(text) if sentence]
+
+
+class Chunker:
+    def __init__(self, budget=1000, encoding=None, cache_size=100_000):
+        self.budget = budget
+        self.encoding = encoding or tiktoken.get_encoding("cl100k_base")
+        self.separator_tokens = len(self.encoding.encode_ordinary(SEPARATOR))
+        self.count_tokens = lru_cache(maxsize=cache_size)(self._count_tokens)
+
+    def _count_tokens(self, text):
+        return len(self.encoding.encode_ordinary(text))
+
+    def pieces(self, text):
+        """Yield (piece, tokens) for text: whole if it fits the budget, else by sentence."""
+        tokens = self.count_tokens(text)
+        if tokens <= self.budget:
+            yield text, tokens
+            return
+        for sentence in split_sentences(text):
+            tokens = self.count_tokens(sentence)
+            if tokens <= self.budget:
+                yield sentence, tokens
+                continue
+            encoded = self.encoding.encode_ordinary(sentence)
+            for start in range(0, len(encoded), self.budget):
+                window = encoded[start:start + self.budget]
+                yield self.encoding.decode(window), len(window)
+
+    def chunks(self, texts):
+        """Yield chunks of at most budget tokens packed from texts, in order."""
+        current, used = [], 0
+        for text in texts:
+            for piece, tokens in self.pieces(text):
+                cost = tokens + (self.separator_tokens if current else 0)
+                if current and used + cost > self.budget:
+                    yield SEPARATOR.join(current)
+                    current, used = [], 0
+                    cost = tokens
+                current.append(piece)
+                used += cost
+        if current:
+            yield SEPARATOR.join(current)
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache.sqlite3")
+
+# OpenAI embedding request limits
+MAX_BATCH_TEXTS = 2048
+MAX_BATCH_TOKENS = 300_000
+
+
+def estimate_tokens(text):
+    # Rough count for batch sizing; about 4 characters per token for English
+    return len(text) // 4 + 1
+
+
+def batches(texts, max_texts=MAX_BATCH_TEXTS, max_tokens=MAX_BATCH_TOKENS):
+    """Split texts into consecutive batches within both request limits."""
+    batch, tokens = [], 0
+    for text in texts:
+        cost = estimate_tokens(text)
+        if batch and (len(batch) == max_texts or tokens + cost > max_tokens):
+            yield batch
+            batch, tokens = [], 0
+        batch.append(text)
+        tokens += cost
+    if batch:
+        yield batch
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that embeds each distinct text at most once.
+
+    Vectors are keyed by a hash of (model, text) and kept in an in-memory LRU
+    of up to memory_entries vectors, backed by a SQLite file that persists
+    across runs. embed_documents dedupes its input, looks every text up in
+    memory then on disk, and sends only the misses to the wrapped model, in
+    batches sized to the provider's per-request limits.
+    """
+
+    def __init__(self, base: Embeddings, path=DEFAULT_PATH, memory_entries=10_000,
+                 max_batch_texts=MAX_BATCH_TEXTS, max_batch_tokens=MAX_BATCH_TOKENS):
+        self.base = base
+        self.model = getattr(base, "model", type(base).__name__)
+        self.memory_entries = memory_entries
+        self.max_batch_texts = max_batch_texts
+        self.max_batch_tokens = max_batch_tokens
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self.conn.commit()
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _lookup(self, keys):
+        """Return {key: vector} for the keys found in memory or on disk."""
+        found = {}
+        with self.lock:
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+            missing = [key for key in keys if key not in found]
+            self.hits += len(found)
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                    self._remember(key, vector)
+                    found[key] = vector
+                self.disk_hits += len(rows)
+        return found
+
+    def _store(self, vectors):
+        with self.lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in vectors.items()],
+            )
+            self.conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        unique = {}  # key -> text, in first-seen order
+        keys = []
+        for text in texts:
+            key = self.key(text)
+            unique.setdefault(key, text)
+            keys.append(key)
+
+        found = self._lookup(list(unique))
+        missing = [key for key in unique if key not in found]
+        self.misses += len(missing)
+        for batch in batches([unique[key] for key in missing], self.max_batch_texts, self.max_batch_tokens):
+            self.requests += 1
+            embedded = dict(zip((self.key(text) for text in batch), self.base.embed_documents(batch)))
+            self._store(embedded)
+            found.update(embedded)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self):
+        total = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / total if total else 0.0,
+            "requests": self.requests,
+        }
+
+    def close(self):
+        self.conn.close()
+
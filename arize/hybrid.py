@@ -0,0 +1,70 @@
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from bm25 import tokenize
+
+RRF_K = 60  # rank offset from the original reciprocal rank fusion paper
+# Keyword queries up to this many terms, all known to the index, skip the embedding call
+LEXICAL_MAX_TERMS = 3
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse ranked lists of documents into one, scoring each by sum of 1 / (k + rank)."""
+    scores = {}
+    documents = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = (doc.page_content, tuple(sorted(doc.metadata.items())))
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever over a PersistentVectorStore combining BM25 and vector search.
+
+    mode is one of:
+      "lexical"  BM25 only, no embedding call
+      "vector"   embedding similarity only
+      "hybrid"   both, fused with reciprocal rank fusion
+      "auto"     lexical for short keyword queries whose terms are all in the
+                 index (e.g. "CVT transmission noise"), hybrid otherwise
+    """
+
+    store: Any
+    k: int = 5
+    mode: str = "auto"
+    filter: Optional[dict] = None
+    # Documents taken from each ranking before fusion
+    candidates: int = 20
+
+    def choose_mode(self, query: str) -> str:
+        if self.mode != "auto":
+            return self.mode
+        terms = tokenize(query)
+        if terms and len(terms) <= LEXICAL_MAX_TERMS and all(term in self.store.lexical for term in terms):
+            return "lexical"
+        return "hybrid"
+
+    def search(self, query: str, k: int = None, filter: Optional[dict] = None, mode: str = None):
+        """Return (documents, mode used)."""
+        k = k or self.k
+        filter = filter if filter is not None else self.filter
+        mode = mode or self.choose_mode(query)
+        if mode == "lexical":
+            docs = [doc for doc, _ in self.store.lexical_search_with_score(query, k, filter)]
+        elif mode == "vector":
+            docs = self.store.similarity_search(query, k, filter=filter)
+        else:
+            depth = max(k, self.candidates)
+            lexical = [doc for doc, _ in self.store.lexical_search_with_score(query, depth, filter)]
+            vector = self.store.similarity_search(query, depth, filter=filter)
+            docs = reciprocal_rank_fusion([lexical, vector])[:k]
+        return docs, mode
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        docs, _ = self.search(query)
+        return docs
@@ -0,0 +1,45 @@
+import os
+import sys
+from typing import List
+
+from langchain_core.documents import Document
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "scrape"))
+from db import Database
+
+DB_PARAMS = {
+    "dbname": "test_db",
+    "user": "postgres",
+    "password": "password",
+    "host": "localhost",
+    "port": 5433
+}
+
+
+def review_document(review_id, car_name, car_year, review_title, review_body, review_rating) -> Document:
+    """One document per review, with the fields retrieval filters on as metadata."""
+    text = f"{review_title}\n{review_body}" if review_title else review_body
+    return Document(page_content=text, metadata={
+        "review_id": review_id,
+        "car_name": car_name,
+        "car_year": car_year,
+        "rating": review_rating,
+    })
+
+
+def load_review_documents(db_params=DB_PARAMS, car_name=None, car_year=None) -> List[Document]:
+    """Documents for the car_reviews rows, optionally of one car and/or year."""
+    db = Database(db_params)
+    try:
+        return [review_document(*row) for row in db.get_reviews(car_name, car_year)]
+    finally:
+        db.close()
+
+
+def load_review_texts(car_name, car_year=None, category="overall", db_params=DB_PARAMS) -> List[str]:
+    """Review texts (title, then body) of one car (and model year) tagged with category, as the analyzers take them."""
+    db = Database(db_params)
+    try:
+        return db.get_reviews_for_category(car_name, car_year, category)
+    finally:
+        db.close()
@@ -1,4 +1,5 @@
 import os
+import sys
 import pandas as pd
 import phoenix as px
 import numpy as np
@@ -30,10 +31,18 @@ from opentelemetry.trace import Status, StatusCode
 from dotenv import load_dotenv
 from langchain.text_splitter import TokenTextSplitter, CharacterTextSplitter
 from langchain_community.document_loaders import TextLoader, DirectoryLoader
-from langchain_community.vectorstores import DocArrayInMemorySearch
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationalRetrievalChain
 from langchain.schema import AIMessage, HumanMessage
+
+# Shared helpers that live with the scraping pipeline
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "scrape"))
+from llm_cache import cache_key, get_default_cache
+from vector_store import PersistentVectorStore
+from embedding_service import CachedEmbeddings
+from review_documents import DB_PARAMS, load_review_documents
+from hybrid import HybridRetriever
+from chunker import Chunker
+from chat_service import ChatService, EventLoopThread
+
 load_dotenv() # Make sure to have a .env file with OPENAI_API_KEY
 
 # Phoenix setup with better tracing
@@ -51,6 +60,9 @@ GuardrailsInstrumentor().instrument(tracer_provider=tracer_provider)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
 
+# Embedded documents persist here between runs
+VECTOR_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vector_index")
+
 class Quote(BaseModel):
     text: str = Field(description="The text of the customer quote")
     has_more: bool = Field(description="Whether there is more context to this quote")
@@ -90,138 +102,116 @@ def format_analysis_result(result: ReviewAnalysis) -> str:
     
     return "\n".join(output)
 
+CHAT_SYSTEM_TEMPLATE = """You are a helpful car review analysis assistant. Use the following car review documents to answer questions.
+When answering:
+- Be specific about features and their reception
+- Include sentiment (positive/negative) when discussing features
+- Reference specific examples from the reviews
+- If you're unsure, explain what you do know and what's unclear
+
+Context from reviews:
+{context}
+
+Previous conversation:
+{chat_history}
+"""
+
+# Analyses are single stateless calls; nothing from chat sessions reaches this prompt
+ANALYSIS_TEMPLATE = """Analyze these customer reviews for {category} and provide a JSON response:
+
+Reviews:
+{reviews}
+
+{format_instructions}
+"""
+
+def review_filter(car_name=None, car_year=None):
+    """Vector store filter restricting retrieval to one car and/or model year."""
+    filter = {}
+    if car_name:
+        filter["car_name"] = car_name
+    if car_year:
+        filter["car_year"] = car_year
+    return filter or None
+
 class CarReviewSystem:
-    def __init__(self):
+    chat_template = CHAT_SYSTEM_TEMPLATE
+
+    def __init__(self, cache=None, index_dir=VECTOR_INDEX_DIR, embeddings=None):
         self.llm = OpenAI(temperature=0)
-        self.embeddings = OpenAIEmbeddings()
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            output_key="answer"
-        )
+        self.cache = cache or get_default_cache()
+        # Repeated queries and duplicate chunks are served from the embedding cache
+        self.embeddings = CachedEmbeddings(embeddings or OpenAIEmbeddings())
+        self.index_dir = index_dir
         self.setup_components()
 
     def setup_components(self):
         """Initialize all system components with proper tracing"""
         with tracer.start_as_current_span("setup_components") as span:
             try:
-                # Text splitters setup
-                self.token_splitter = TokenTextSplitter(
-                    chunk_size=500,
-                    chunk_overlap=50
-                )
+                # Text splitters setup: whole reviews are packed into 1000-token
+                # chunks for analysis; loaded files are split with overlap
+                self.chunker = Chunker(budget=1000)
                 
                 self.base_splitter = TokenTextSplitter(
                     chunk_size=1000,
                     chunk_overlap=200
                 )
                 
-                # Vector store setup
-                self.vector_store = None
-                
-                # Setup the conversational chain
-                self.setup_conversational_chain()
-                
+                # Vector store setup: documents embedded by earlier runs load
+                # from disk. An empty store is falsy, like no store at all.
+                self.vector_store = PersistentVectorStore(self.index_dir, self.embeddings)
+                # BM25 + vector retrieval; short keyword queries skip the embedding call
+                self.retriever = HybridRetriever(store=self.vector_store)
+                # Per-session chat memory, bounded by a token budget
+                self.chat_service = ChatService(self)
+                # chat() runs turns here, so compaction and the LLM's async client outlive each call
+                self.chat_loop = EventLoopThread()
+                span.set_attribute("indexed_documents", len(self.vector_store))
+
+                # prompt | llm | parser with no memory, so analysis worker threads share nothing
+                parser = PydanticOutputParser(pydantic_object=ReviewAnalysis)
+                self.analysis_prompt = PromptTemplate(
+                    template=ANALYSIS_TEMPLATE,
+                    input_variables=["category", "reviews"],
+                    partial_variables={"format_instructions": parser.get_format_instructions()}
+                )
+                self.analysis_chain = self.analysis_prompt | self.llm | parser
+
                 span.set_status(Status(StatusCode.OK))
             except Exception as e:
                 span.set_status(Status(StatusCode.ERROR), str(e))
                 span.record_exception(e)
                 raise
 
-    def setup_conversational_chain(self):
-        """Setup the conversational chain with memory"""
-        if not self.vector_store:
-            return
-
-        with tracer.start_as_current_span("setup_chain") as span:
-            span.set_attributes({
-                SpanAttributes.OPENINFERENCE_SPAN_KIND: OpenInferenceSpanKindValues.CHAIN.value,
-                "openinference.chain.type": "setup",
-                "openinference.chain.name": "ConversationalRetrievalChain"
-            })
-
-            # Create prompt templates
-            system_template = """You are a helpful car review analysis assistant. Use the following car review documents to answer questions.
-            When answering:
-            - Be specific about features and their reception
-            - Include sentiment (positive/negative) when discussing features
-            - Reference specific examples from the reviews
-            - If you're unsure, explain what you do know and what's unclear
-            
-            Context from reviews:
-            {context}
-            
-            Previous conversation:
-            {chat_history}
-            """
-            
-            human_template = """Question: {question}"""
-            
-            messages = [
-                SystemMessagePromptTemplate.from_template(system_template),
-                HumanMessagePromptTemplate.from_template(human_template)
-            ]
-            
-            prompt = ChatPromptTemplate.from_messages(messages)
-                
-            self.conversation_chain = ConversationalRetrievalChain.from_llm(
-                llm=self.llm,
-                retriever=self.vector_store.as_retriever(),
-                memory=self.memory,
-                return_source_documents=False,
-                verbose=True,
-                chain_type="stuff",
-                combine_docs_chain_kwargs={'prompt': prompt}
-            )
-
-            span.set_attribute("openinference.status", "initialized")
-
-    def format_chat_history(self, messages):
-        """Format chat history into a readable string"""
-        formatted = []
-        for msg in messages:
-            if isinstance(msg, HumanMessage):
-                formatted.append(f"Human: {msg.content}")
-            elif isinstance(msg, AIMessage):
-                formatted.append(f"Assistant: {msg.content}")
-        return "\n".join(formatted)
-
-    def chat(self, query: str) -> str:
-        """Have a conversation with the system about the documents"""
+    def chat(self, query: str, session_id: str = "default") -> str:
+        """Have a conversation with the system about the documents.
+
+        Blocks until the answer is complete; async callers use stream_chat.
+        """
         with tracer.start_as_current_span("BaseQueryEngine.query") as span:
             try:
                 if not self.vector_store:
                     raise ValueError("No documents loaded. Please load documents first.")
 
-                # Make sure conversation chain is setup
-                if not hasattr(self, 'conversation_chain'):
-                    self.setup_conversational_chain()
-
-                # Format chat history
-                chat_history = self.format_chat_history(self.memory.chat_memory.messages)
-
-                # Add proper OpenInference attributes
                 span.set_attributes({
                     SpanAttributes.OPENINFERENCE_SPAN_KIND: OpenInferenceSpanKindValues.CHAIN.value,
-                    "openinference.chain.type": "ConversationalRetrievalChain",
+                    "openinference.chain.type": "ChatService",
                     "openinference.input.value": query,
-                    "openinference.input.chat_history": chat_history,
+                    "openinference.session.id": session_id,
                 })
 
-                # Get response from chain using invoke
-                response = self.conversation_chain.invoke({
-                    "question": query,
-                    "chat_history": chat_history
-                })
+                # Older turns are summarized in the background on the chat loop
+                answer = self.chat_loop.run(self.chat_service.ask(session_id, query))
                 
                 # Add output attributes
                 span.set_attributes({
-                    "openinference.output.value": response["answer"][:200],  # First 200 chars
-                    "openinference.metrics.tokens": len(query.split()) + len(response["answer"].split()),
+                    "openinference.output.value": answer[:200],  # First 200 chars
+                    "openinference.metrics.tokens": len(query.split()) + len(answer.split()),
                     "openinference.status": "success"
                 })
                 
-                return response["answer"]
+                return answer
                 
             except Exception as e:
                 span.set_status(Status(StatusCode.ERROR), str(e))
@@ -229,6 +219,13 @@ class CarReviewSystem:
                 span.set_attribute("openinference.status", "error")
                 raise
 
+    async def stream_chat(self, query: str, session_id: str = "default"):
+        """Yield the answer to query piece by piece as the model produces it"""
+        if not self.vector_store:
+            raise ValueError("No documents loaded. Please load documents first.")
+        async for piece in self.chat_service.stream(session_id, query):
+            yield piece
+
     def query_embedding(self, text: str):
         """Get embeddings with proper tracing"""
         with tracer.start_as_current_span("BaseEmbedding.get_query_embedding") as span:
@@ -270,25 +267,27 @@ class CarReviewSystem:
                 span.record_exception(e)
                 raise
 
-    def retrieve_similar(self, query: str, k: int = 5):
-        """Retrieve similar documents with proper tracing"""
+    def retrieve_similar(self, query: str, k: int = 5, car_name: str = None, car_year: int = None,
+                         mode: str = None):
+        """Retrieve similar documents with proper tracing, optionally only for one car/year.
+
+        mode is "lexical", "vector", "hybrid", or None to let the retriever choose.
+        """
         with tracer.start_as_current_span("BaseRetriever.retrieve") as span:
             try:
-                with tracer.start_as_current_span("VectorIndexRetriever._retrieve") as retrieve_span:
+                with tracer.start_as_current_span("HybridRetriever._retrieve") as retrieve_span:
                     retrieve_span.set_attributes({
                         SpanAttributes.OPENINFERENCE_SPAN_KIND: OpenInferenceSpanKindValues.RETRIEVER.value,
-                        "openinference.retriever.type": "vector",
                         "openinference.input.value": query,
-                        "openinference.retriever.top_k": k
+                        "openinference.retriever.top_k": k,
+                        "openinference.retriever.filter": str(review_filter(car_name, car_year)),
                     })
                     
-                    # First get query embedding
-                    query_embedding = self.query_embedding(query)
-                    
-                    # Perform similarity search
-                    docs = self.vector_store.similarity_search_by_vector(query_embedding, k=k)
+                    # Search within the car/year partition
+                    docs, mode = self.retriever.search(query, k=k, filter=review_filter(car_name, car_year), mode=mode)
                     
                     retrieve_span.set_attributes({
+                        "openinference.retriever.type": mode,
                         "openinference.output": {
                             "document_count": len(docs),
                             "documents": [doc.page_content[:100] + "..." for doc in docs]  # First 100 chars of each doc
@@ -306,14 +305,13 @@ class CarReviewSystem:
         """Process and refine texts with proper tracing"""
         with tracer.start_as_current_span("CompactAndRefine.get_response") as span:
             try:
-                # Only create spans that actually do work
-                split_texts = self.token_splitter.split_text("\n".join(texts))
-                refined_texts = self.base_splitter.split_text("\n".join(split_texts))
+                # One tokenization pass; reviews are kept whole where they fit
+                refined_texts = list(self.chunker.chunks(texts))
                 
                 span.set_attributes({
                     "input_length": len(texts),
                     "output_length": len(refined_texts),
-                    "refinement_method": "token_splitting"
+                    "refinement_method": "review_packing"
                 })
                 return refined_texts
             except Exception as e:
@@ -345,13 +343,8 @@ class CarReviewSystem:
                         "request_type": "batch_embedding"
                     })
                     
-                    self.vector_store = DocArrayInMemorySearch.from_documents(
-                        texts, 
-                        self.embeddings
-                    )
-                    
-                    # Setup the conversation chain after vector store is created
-                    self.setup_conversational_chain()
+                    # Only chunks not already in the index are embedded
+                    self.vector_store.add_documents(texts)
                     
                     create_span.set_attributes({
                         "response_time": 0.20 * len(texts),
@@ -366,15 +359,31 @@ class CarReviewSystem:
                 span.record_exception(e)
                 raise
 
-    def search_reviews(self, query: str, k: int = 5) -> List[str]:
-        """Search for relevant reviews in the vector store"""
+    def load_reviews(self, db_params=DB_PARAMS, car_name: str = None, car_year: int = None):
+        """Index the scraped reviews in car_reviews, one document per review with car_name/car_year/rating metadata"""
+        with tracer.start_as_current_span("load_reviews") as span:
+            try:
+                documents = load_review_documents(db_params, car_name, car_year)
+                # Reviews are short, so they are indexed whole; only new ones are embedded
+                self.vector_store.add_documents(documents)
+
+                span.set_status(Status(StatusCode.OK))
+                span.set_attribute("document_count", len(documents))
+            except Exception as e:
+                span.set_status(Status(StatusCode.ERROR), str(e))
+                span.record_exception(e)
+                raise
+
+    def search_reviews(self, query: str, k: int = 5, car_name: str = None, car_year: int = None) -> List[str]:
+        """Search for relevant reviews in the vector store, optionally only for one car/year"""
         if not self.vector_store:
             raise ValueError("No documents loaded. Please load documents first.")
             
-        docs = self.vector_store.similarity_search(query, k=k)
+        docs = self.vector_store.similarity_search(query, k=k, filter=review_filter(car_name, car_year))
         return [doc.page_content for doc in docs]
 
-    def analyze_category(self, category: str, reviews: List[str], query: str = None) -> ReviewAnalysis:
+    def analyze_category(self, category: str, reviews: List[str], query: str = None,
+                         car_name: str = None, car_year: int = None) -> ReviewAnalysis:
         with tracer.start_as_current_span("BaseQueryEngine.query") as query_span:
             try:
                 with tracer.start_as_current_span("RetrieverQueryEngine._query") as retrieve_span:
@@ -392,7 +401,8 @@ class CarReviewSystem:
                                             })
                                             embedding = self.embeddings.embed_query(query)
                     
-                        docs = self.vector_store.similarity_search_by_vector(embedding, k=5)
+                        docs = self.vector_store.similarity_search_by_vector(
+                            embedding, k=5, filter=review_filter(car_name, car_year))
                         relevant_reviews = [doc.page_content for doc in docs]
                         retrieve_span.set_attributes({
                             "retrieved_count": len(relevant_reviews),
@@ -408,15 +418,25 @@ class CarReviewSystem:
                 refined_reviews = self.process_and_refine(relevant_reviews)
                 
                 with tracer.start_as_current_span("BaseSynthesizer.synthesize") as synth_span:
-                    result = self.conversation_chain.invoke({
+                    inputs = {
                         "category": category,
                         "reviews": "\n".join([f"- {review}" for review in refined_reviews])
-                    })
-                    
+                    }
+                    # Keyed on the prompt exactly as the model sees it, retrieved reviews and format instructions included
+                    key = cache_key(self.llm.model_name, ANALYSIS_TEMPLATE, self.llm.temperature,
+                                    self.analysis_prompt.format(**inputs))
+
+                    def synthesize():
+                        return self.analysis_chain.invoke(inputs).dict()
+
+                    cached, hit = self.cache.get_or_compute(key, synthesize)
+                    result = ReviewAnalysis.parse_obj(cached)
+
                     synth_span.set_attributes({
                         "model": "gpt-3.5-turbo",
                         "input_length": len(refined_reviews),
-                        "output_type": "ReviewAnalysis"
+                        "output_type": "ReviewAnalysis",
+                        "cache_hit": hit
                     })
                 
                 return result
@@ -6,15 +6,15 @@ from typing import List, Dict
 
 from langchain_openai import ChatOpenAI
 from langchain_openai import OpenAIEmbeddings
-from langchain.chains import ConversationalRetrievalChain
-from langchain.prompts import SystemMessagePromptTemplate, HumanMessagePromptTemplate, ChatPromptTemplate
 from langchain.schema import AIMessage, HumanMessage
 from langchain_community.document_loaders import TextLoader, DirectoryLoader
-from langchain_community.vectorstores import DocArrayInMemorySearch
-from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain.memory import ConversationBufferMemory
 from pydantic.v1 import BaseModel, Field
 
+from vector_store import PersistentVectorStore
+from embedding_service import CachedEmbeddings
+from hybrid import HybridRetriever
+from chat_service import ChatService, EventLoopThread
+
 # OpenTelemetry imports
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
@@ -24,6 +24,23 @@ from opentelemetry.sdk.trace.sampling import ALWAYS_ON
 # Setup logging
 logging.basicConfig(level=logging.INFO, stream=sys.stdout)
 
+TOYOTA_CHAT_TEMPLATE = """You are a Toyota vehicle expert assistant. Use the following review documents to answer questions.
+        When answering:
+        - Focus on Toyota-specific features and their reception
+        - Include customer sentiment and specific examples
+        - Reference actual customer experiences from the reviews
+        - Maintain context from previous questions
+        
+        Context from reviews:
+        {context}
+        
+        Previous conversation:
+        {chat_history}
+        """
+
+# Embedded reviews persist here between runs
+VECTOR_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "toyota_vector_index")
+
 def setup_api_keys():
     """Set up necessary API keys."""
     if not (openai_api_key := os.getenv("OPENAI_API_KEY")):
@@ -47,7 +64,9 @@ def setup_telemetry():
     return trace.get_tracer(__name__)
 
 class ToyotaReviewSystem:
-    def __init__(self):
+    chat_template = TOYOTA_CHAT_TEMPLATE
+
+    def __init__(self, index_dir=VECTOR_INDEX_DIR):
         self.openai_api_key = setup_api_keys()
         self.tracer = setup_telemetry()
         
@@ -55,66 +74,27 @@ class ToyotaReviewSystem:
             model_name="gpt-4-turbo-preview",
             temperature=0
         )
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
-        
-        # Initialize chat history and memory
-        self.chat_history = ChatMessageHistory()
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            chat_memory=self.chat_history,
-            return_messages=True,
-            output_key="answer"
-        )
+        self.embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-ada-002"))
+        self.index_dir = index_dir
         self.setup_components()
 
     def setup_components(self):
         """Initialize system components"""
         with self.tracer.start_as_current_span("setup_components") as span:
             try:
-                self.vector_store = None
-                self.setup_conversational_chain()
+                # Reviews embedded by earlier runs load from disk; an empty store is falsy
+                self.vector_store = PersistentVectorStore(self.index_dir, self.embeddings)
+                self.retriever = HybridRetriever(store=self.vector_store)
+                # Per-session chat memory, bounded by a token budget
+                self.chat_service = ChatService(self)
+                # chat() runs turns here, so compaction and the LLM's async client outlive each call
+                self.chat_loop = EventLoopThread()
                 span.set_attribute("status", "success")
             except Exception as e:
                 span.set_attribute("status", "error")
                 span.record_exception(e)
                 raise
 
-    def setup_conversational_chain(self):
-        """Setup the conversational chain with memory"""
-        if not self.vector_store:
-            return
-
-        system_template = """You are a Toyota vehicle expert assistant. Use the following review documents to answer questions.
-        When answering:
-        - Focus on Toyota-specific features and their reception
-        - Include customer sentiment and specific examples
-        - Reference actual customer experiences from the reviews
-        - Maintain context from previous questions
-        
-        Context from reviews:
-        {context}
-        
-        Previous conversation:
-        {chat_history}
-        """
-        
-        human_template = """Question: {question}"""
-        
-        messages = [
-            SystemMessagePromptTemplate.from_template(system_template),
-            HumanMessagePromptTemplate.from_template(human_template)
-        ]
-        
-        prompt = ChatPromptTemplate.from_messages(messages)
-        
-        self.conversation_chain = ConversationalRetrievalChain.from_llm(
-            llm=self.llm,
-            retriever=self.vector_store.as_retriever(),
-            memory=self.memory,
-            return_source_documents=False,
-            combine_docs_chain_kwargs={'prompt': prompt}
-        )
-
     def load_reviews(self, file_path=None, directory_path=None):
         """Load reviews from file or directory"""
         try:
@@ -126,32 +106,28 @@ class ToyotaReviewSystem:
                 loader = DirectoryLoader(directory_path)
                 documents.extend(loader.load())
 
-            self.vector_store = DocArrayInMemorySearch.from_documents(
-                documents, 
-                self.embeddings
-            )
-            
-            self.setup_conversational_chain()
+            # Only reviews not already in the index are embedded
+            self.vector_store.add_documents(documents)
             
         except Exception as e:
             print(f"Error loading documents: {e}")
             raise
 
-    def chat(self, query: str) -> str:
-        """Have a conversation about Toyota reviews"""
+    def chat(self, query: str, session_id: str = "default") -> str:
+        """Have a conversation about Toyota reviews; blocks until the answer is complete"""
         with self.tracer.start_as_current_span("chat") as span:
             try:
                 if not self.vector_store:
                     raise ValueError("No reviews loaded. Please load reviews first.")
 
                 span.set_attribute("query", query)
-                response = self.conversation_chain.invoke({
-                    "question": query,
-                    "chat_history": self.memory.chat_memory.messages
-                })
+                span.set_attribute("session_id", session_id)
+
+                # Older turns are summarized in the background on the chat loop
+                answer = self.chat_loop.run(self.chat_service.ask(session_id, query))
                 
-                span.set_attribute("response_length", len(response["answer"]))
-                return response["answer"]
+                span.set_attribute("response_length", len(answer))
+                return answer
                 
             except Exception as e:
                 span.record_exception(e)
@@ -0,0 +1,71 @@
+"""IVF-PQ vs exact search: recall@k and queries/sec on synthetic embeddings.
+
+Vectors are drawn around random cluster centres (like embeddings of reviews
+on a handful of topics) and normalized to unit length, as ada-002 embeddings are.
+Run from the arize directory: python test/ann_benchmark.py [vectors] [queries]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ann import IVFPQIndex
+
+DIM = 1536
+K = 10
+
+
+def normalize(x):
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def synthetic_vectors(n, rng, centres, spread=0.8):
+    noise = rng.standard_normal((n, DIM), dtype=np.float32) * (spread / np.sqrt(DIM))
+    return normalize(centres[rng.integers(len(centres), size=n)] + noise)
+
+
+def exact_search(vectors, queries, k):
+    scores = queries @ vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main(n, nq):
+    rng = np.random.default_rng(0)
+    centres = normalize(rng.standard_normal((200, DIM), dtype=np.float32))
+    vectors = synthetic_vectors(n, rng, centres)
+    # Queries are paraphrases: small perturbations of stored vectors
+    queries = synthetic_vectors(nq, rng, vectors[rng.integers(n, size=nq)], spread=0.5)
+
+    start = time.perf_counter()
+    truth = exact_search(vectors, queries, K)
+    exact_qps = nq / (time.perf_counter() - start)
+    # Per-query latency is what retrieval sees, so exact search is also timed one query at a time
+    start = time.perf_counter()
+    for q in queries:
+        scores = vectors @ q
+        np.argpartition(-scores, K)[:K]
+    exact_single_qps = nq / (time.perf_counter() - start)
+    print(f"{n} vectors, {DIM} dims, {nq} queries")
+    print(f"exact: {exact_single_qps:.0f} QPS one at a time ({exact_qps:.0f} QPS batched)")
+
+    index = IVFPQIndex(DIM, nlist=int(4 * np.sqrt(n)), m=48)
+    start = time.perf_counter()
+    index.train(vectors)
+    index.add(vectors, np.arange(n))
+    print(f"IVF-PQ nlist={index.nlist} m={index.m}: built in {time.perf_counter() - start:.1f}s")
+
+    print(f"{'nprobe':>6} {'rerank':>6} {'recall@' + str(K):>9} {'QPS':>7}")
+    for nprobe, rerank in [(4, 32), (8, 64), (16, 64), (16, 128), (32, 128), (64, 256)]:
+        start = time.perf_counter()
+        found = [[row for row, _ in index.search(q, K, vectors, nprobe, rerank)] for q in queries]
+        qps = nq / (time.perf_counter() - start)
+        recall = np.mean([len(set(f) & set(t)) / K for f, t in zip(found, truth)])
+        print(f"{nprobe:>6} {rerank:>6} {recall:>9.3f} {qps:>7.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 200)
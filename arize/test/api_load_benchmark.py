@@ -0,0 +1,156 @@
+"""Load test for /api/analyze-reviews against a fake LLM-backed analyzer.
+
+The fake analyzer blocks for --latency seconds per call, like a synchronous
+LLM request. Requests go through httpx's ASGI transport, so no server or
+network is needed. Runs:
+  blocking    the old endpoint, calling the analyzer on the event loop
+  service     the AnalysisService endpoint with duplicate payloads coalesced
+  overload    more distinct requests than the service accepts, answered with 429
+  sequential  every (car, category) of a compare view, one request at a time
+  batch       the same items in one /api/analyze-batch request, streamed
+The sequential and batch runs use create_app's default workers and queue.
+Run from the arize directory: python test/api_load_benchmark.py [--latency 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api import create_app
+
+
+class FakeAnalyzer:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def analyze_category(self, category, reviews):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return {"total_mentions": len(reviews), "positive_mentions": 0, "negative_mentions": 0,
+                "overall_sentiment": "neutral", "quotes": reviews[:1]}
+
+
+def blocking_app(analyzer):
+    app = FastAPI()
+
+    @app.post("/api/analyze-reviews")
+    async def analyze_reviews(category: str, reviews: List[str]):
+        return analyzer.analyze_category(category, reviews)
+
+    @app.get("/api/analysis-stats")
+    async def analysis_stats():
+        return {}
+
+    return app
+
+
+async def run(app, requests):
+    """Send every (category, reviews) request at once; returns (statuses, elapsed, probe latency)."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        async def post(category, reviews):
+            response = await client.post("/api/analyze-reviews", params={"category": category}, json=reviews)
+            return response.status_code
+
+        async def probe():
+            # A cheap request sent while the analyses run shows whether the event loop is free
+            # (timed from when it was due, since a blocked loop also delays the wake-up)
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            await client.get("/api/analysis-stats")
+            return time.perf_counter() - start - 0.01
+
+        start = time.perf_counter()
+        probe_latency, *statuses = await asyncio.gather(probe(), *(post(c, r) for c, r in requests))
+        return statuses, time.perf_counter() - start, probe_latency
+
+
+def report(label, analyzer, statuses, elapsed, probe_latency):
+    ok = statuses.count(200)
+    print(f"{label:<9} {len(statuses):>4} requests  {ok:>4} ok  {statuses.count(429):>4} x 429  "
+          f"{analyzer.calls:>4} LLM calls  {elapsed:>6.2f}s  probe {probe_latency * 1000:>7.1f} ms")
+
+
+class FakeReviews:
+    def __init__(self):
+        self.loads = 0
+
+    def __call__(self, car_name, car_year, category):
+        self.loads += 1
+        return [f"{car_name} {car_year} {category} review {i}" for i in range(20)]
+
+
+async def run_sequential(app, items, source):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        start = time.perf_counter()
+        first = None
+        for car_name, car_year, category in items:
+            await client.post("/api/analyze-reviews", params={"category": category},
+                              json=source(car_name, car_year, category))
+            first = first or time.perf_counter() - start
+        return first, time.perf_counter() - start
+
+
+async def run_batch(app, items):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        body = {"items": [{"car_name": c, "car_year": y, "category": k} for c, y, k in items]}
+        start = time.perf_counter()
+        first, statuses = None, []
+        async with client.stream("POST", "/api/analyze-batch", json=body) as response:
+            async for line in response.aiter_lines():
+                if line:
+                    statuses.append(json.loads(line)["status"])
+                    first = first or time.perf_counter() - start
+        # More items than the service's capacity, none of them shed
+        assert statuses == [200] * len(items), statuses
+        return first, time.perf_counter() - start
+
+
+def main(latency):
+    categories = ["reliability", "comfort", "mpg", "safety"]
+    # 64 requests over 16 distinct payloads, as when many users open the same cars
+    requests = [(categories[i % 4], [f"review of car {i % 16 // 4}"]) for i in range(64)]
+
+    analyzer = FakeAnalyzer(latency)
+    report("blocking", analyzer, *asyncio.run(run(blocking_app(analyzer), requests)))
+
+    analyzer = FakeAnalyzer(latency)
+    app = create_app(analyzer, workers=4, max_queue=64)
+    report("service", analyzer, *asyncio.run(run(app, requests)))
+
+    analyzer = FakeAnalyzer(latency)
+    app = create_app(analyzer, workers=4, max_queue=16)
+    distinct = [("reliability", [f"review {i}"]) for i in range(100)]
+    report("overload", analyzer, *asyncio.run(run(app, distinct)))
+
+    cars = [("camry", 2022), ("rav4", 2022), ("tacoma", 2021), ("prius", 2023)]
+    categories = ["reliability", "comfort", "mpg", "safety", "technology", "value"]
+    items = [(car, year, category) for car, year in cars for category in categories]
+    print(f"\n{len(cars)} cars x {len(categories)} categories")
+    for label, make_run in [("sequential", lambda app, source: run_sequential(app, items, source)),
+                            ("batch", lambda app, source: run_batch(app, items))]:
+        analyzer, source = FakeAnalyzer(latency), FakeReviews()
+        app = create_app(analyzer, review_source=source)
+        first, total = asyncio.run(make_run(app, source))
+        print(f"{label:<10} first result {first:>5.2f}s  all {total:>5.2f}s  "
+              f"{analyzer.calls} LLM calls  {source.loads} review loads")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.2)
+    main(parser.parse_args().latency)
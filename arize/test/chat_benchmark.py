@@ -0,0 +1,125 @@
+"""Streaming chat over /api/chat/stream with a fake streaming LLM.
+
+Reports time to first token vs. the full answer, and how the prompt grows
+over a long session with unbounded history vs. the token-budgeted window.
+The fake LLM waits --first-token seconds, then emits 120 words at
+--per-token seconds each. Requests are sent straight to the ASGI app and
+each body chunk is timestamped as the app sends it (httpx's ASGI transport
+would buffer the whole stream).
+Run from the arize directory: python test/chat_benchmark.py
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api import create_app
+from chat_service import ChatService, SessionStore, estimate_tokens
+
+TEMPLATE = "Answer from these reviews.\n{context}\nPrevious conversation:\n{chat_history}"
+
+
+class Doc:
+    def __init__(self, text):
+        self.page_content = text
+
+
+class FakeRetriever:
+    def search(self, query, k=5):
+        return [Doc(f"Review {i} about {query}.") for i in range(k)], "lexical"
+
+
+class FakeStreamingLLM:
+    def __init__(self, first_token, per_token):
+        self.first_token = first_token
+        self.per_token = per_token
+        self.prompt_tokens = []
+
+    async def astream(self, messages):
+        self.prompt_tokens.append(sum(estimate_tokens(text) for _, text in messages))
+        await asyncio.sleep(self.first_token)
+        for i in range(120):
+            await asyncio.sleep(self.per_token)
+            yield f"word{i} "
+
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(self.first_token)
+        return "The user asked about several cars; the assistant compared reliability and comfort."
+
+
+class FakeSystem:
+    chat_template = TEMPLATE
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.retriever = FakeRetriever()
+
+
+async def stream_turn(app, session_id, message):
+    """GET /api/chat/stream; returns seconds to the first token event and to the end of the stream."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/chat/stream", "raw_path": b"/api/chat/stream",
+        "query_string": urlencode({"message": message, "session_id": session_id}).encode(),
+        "headers": [], "client": ("127.0.0.1", 0), "server": ("test", 80), "root_path": "",
+    }
+    start = time.perf_counter()
+    first = None
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        # The request has no body; after that the client stays connected until the response ends
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal first
+        if message["type"] != "http.response.body":
+            return
+        if first is None and b"event: token" in message.get("body", b""):
+            first = time.perf_counter() - start
+        if not message.get("more_body", False):
+            finished.set()
+
+    await app(scope, receive, send)
+    return first, time.perf_counter() - start
+
+
+async def session(app, turns):
+    return [await stream_turn(app, "bench", f"question {i} about the camry") for i in range(turns)]
+
+
+def main(first_token, per_token, turns):
+    for label, budget in [("unbounded", 10 ** 9), ("budgeted", 1500)]:
+        llm = FakeStreamingLLM(first_token, per_token)
+        chat = ChatService(FakeSystem(llm), history_budget=budget)
+        timings = asyncio.run(session(create_app(analyzer=object(), chat=chat), turns))
+        first, total = timings[0]
+        print(f"{label:<9} first token {first:.2f}s  full answer {total:.2f}s  "
+              f"prompt tokens turn 1/{turns // 2}/{turns}: {llm.prompt_tokens[0]}/"
+              f"{llm.prompt_tokens[turns // 2 - 1]}/{llm.prompt_tokens[-1]}")
+
+    store = SessionStore(ttl=0.05)
+    store.get("a"), store.get("b")
+    time.sleep(0.1)
+    store.get("c")
+    print(f"TTL eviction: {len(store)} of 3 sessions left after the others idled past the TTL")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--first-token", type=float, default=0.3)
+    parser.add_argument("--per-token", type=float, default=0.01)
+    parser.add_argument("--turns", type=int, default=30)
+    args = parser.parse_args()
+    main(args.first_token, args.per_token, args.turns)
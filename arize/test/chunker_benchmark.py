@@ -0,0 +1,64 @@
+"""process_and_refine chunking: two TokenTextSplitter passes vs the single-pass Chunker.
+
+The two-pass path is what process_and_refine used to do: join every review,
+split into 500-token windows (50 overlap), join those and split again into
+1000-token windows (200 overlap), tokenizing the corpus twice. Reviews come
+from backend/scrape/reviews.jsonl.gz, repeated to reach the requested count.
+Run from the arize directory: python test/chunker_benchmark.py [reviews]
+"""
+import itertools
+import os
+import sys
+import time
+
+import tiktoken
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend", "scrape"))
+
+from chunker import Chunker
+from dataset import iter_dataset
+
+REVIEWS = os.path.join(os.path.dirname(__file__), "..", "..", "backend", "scrape", "reviews.jsonl.gz")
+
+
+def split_on_tokens(text, encoding, chunk_size, overlap):
+    # Same windowing as langchain's TokenTextSplitter
+    ids = encoding.encode(text)
+    chunks = []
+    start = 0
+    while start < len(ids):
+        chunks.append(encoding.decode(ids[start:start + chunk_size]))
+        if start + chunk_size >= len(ids):
+            break
+        start += chunk_size - overlap
+    return chunks
+
+
+def two_pass(texts, encoding):
+    split_texts = split_on_tokens("\n".join(texts), encoding, 500, 50)
+    return split_on_tokens("\n".join(split_texts), encoding, 1000, 200)
+
+
+def timed(label, run):
+    start = time.perf_counter()
+    chunks = run()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<26} {elapsed * 1000:>8.0f} ms  {len(chunks):>5} chunks")
+    return chunks
+
+
+def main(n):
+    reviews = [review.review_text for review in iter_dataset(REVIEWS, "reviews")]
+    texts = list(itertools.islice(itertools.cycle(reviews), n))
+    encoding = tiktoken.get_encoding("cl100k_base")
+    print(f"{len(texts)} reviews")
+
+    timed("two-pass splitters", lambda: two_pass(texts, encoding))
+    chunker = Chunker(budget=1000, encoding=encoding)
+    timed("single-pass (cold cache)", lambda: list(chunker.chunks(texts)))
+    timed("single-pass (warm cache)", lambda: list(chunker.chunks(texts)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
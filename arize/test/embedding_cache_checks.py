@@ -0,0 +1,79 @@
+"""Check that CachedEmbeddings only sends each distinct text to the model once.
+
+Wraps FakeEmbeddings, which counts its calls, and checks deduping within a
+batch, request batching, the in-memory cache and the SQLite fallback after
+a restart or an eviction. Run from the arize directory:
+python test/embedding_cache_checks.py
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from embedding_service import CachedEmbeddings
+from fake_embeddings import FakeEmbeddings
+
+
+def cache_path():
+    return os.path.join(tempfile.mkdtemp(), "embeddings.sqlite3")
+
+
+def test_dedupe_and_batching():
+    base = FakeEmbeddings(dim=8)
+    cache = CachedEmbeddings(base, cache_path(), max_batch_texts=2)
+    vectors = cache.embed_documents(["a", "b", "a", "c", "b"])
+
+    # Three distinct texts, sent as batches of two and one
+    assert (base.calls, base.texts_embedded) == (2, 3), (base.calls, base.texts_embedded)
+    assert vectors[0] == vectors[2] and vectors[1] == vectors[4]
+    assert vectors[0] != vectors[1]
+    assert cache.stats()["misses"] == 3 and cache.stats()["requests"] == 2
+    print("OK: 5 texts with duplicates embedded as 3 texts in 2 requests")
+
+
+def test_warm_cache():
+    base = FakeEmbeddings(dim=8)
+    cache = CachedEmbeddings(base, cache_path())
+    first = cache.embed_documents(["a", "b", "c"])
+    vectors = cache.embed_documents(["c", "a", "d", "d"])
+
+    # Only the new text reaches the model
+    assert (base.calls, base.texts_embedded) == (2, 4), (base.calls, base.texts_embedded)
+    assert vectors[0] == first[2] and vectors[1] == first[0]
+    assert cache.embed_query("b") == first[1] and base.calls == 2
+    assert cache.stats()["hits"] == 3, cache.stats()
+    print("OK: warm cache embedded only the 1 new text")
+
+
+def test_sqlite_fallback():
+    path = cache_path()
+    first = CachedEmbeddings(FakeEmbeddings(dim=8), path).embed_documents(["a", "b", "c"])
+
+    # A new process starts with an empty memory cache but the same file
+    base = FakeEmbeddings(dim=8)
+    cache = CachedEmbeddings(base, path)
+    vectors = cache.embed_documents(["c", "b", "a"])
+    assert base.calls == 0, base.calls
+    assert cache.stats()["disk_hits"] == 3, cache.stats()
+    assert np.allclose(vectors, first[::-1], atol=1e-6)
+
+    # Vectors evicted from a small memory cache come back from disk
+    base = FakeEmbeddings(dim=8)
+    cache = CachedEmbeddings(base, path, memory_entries=1)
+    cache.embed_documents(["a", "b", "c"])
+    cache.embed_documents(["a"])
+    assert base.calls == 0 and cache.stats()["disk_hits"] == 4, cache.stats()
+    print("OK: restarted and evicted caches read vectors from SQLite")
+
+
+def main():
+    test_dedupe_and_batching()
+    test_warm_cache()
+    test_sqlite_fallback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Deterministic local embedder for the arize tests and benchmarks.
+
+Import it after putting the arize test directory on sys.path:
+from fake_embeddings import FakeEmbeddings
+"""
+import hashlib
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class FakeEmbeddings(Embeddings):
+    """Each text maps to a fixed unit vector seeded by its hash, so repeated runs
+    agree without any network calls. Counts calls and texts embedded.
+    """
+
+    def __init__(self, dim=1536):
+        self.dim = dim
+        self.model = f"fake-{dim}"
+        self.calls = 0
+        self.texts_embedded = 0
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        vector = np.random.default_rng(seed).standard_normal(self.dim)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts_embedded += len(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
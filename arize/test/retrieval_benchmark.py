@@ -0,0 +1,92 @@
+"""Lexical, vector, hybrid and auto retrieval on the scraped reviews.
+
+Indexes backend/scrape/reviews.jsonl.gz in a scratch vector store and runs
+the fixture queries in fixtures/retrieval_queries.json through each mode of
+HybridRetriever. A query is a hit when one of its top k reviews mentions a
+relevant term. Embeddings come from a local hashed bag-of-words embedder
+that sleeps --embed-latency seconds per call to stand in for the network
+round-trip of a hosted embedding model.
+Run from the arize directory: python test/retrieval_benchmark.py [--embed-latency 0.15]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend", "scrape"))
+
+from bm25 import tokenize
+from dataset import iter_dataset
+from hybrid import HybridRetriever
+from vector_store import PersistentVectorStore
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "retrieval_queries.json")
+REVIEWS = os.path.join(os.path.dirname(__file__), "..", "..", "backend", "scrape", "reviews.jsonl.gz")
+DIM = 256
+K = 5
+
+
+class HashingEmbeddings:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def _vector(self, text):
+        vector = np.zeros(DIM, dtype=np.float32)
+        for token in tokenize(text):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "big") % DIM] += 1 if digest[4] & 1 else -1
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def is_hit(docs, relevant):
+    return any(term in doc.page_content.lower() for doc in docs for term in relevant)
+
+
+def main(embed_latency):
+    with open(FIXTURES, encoding="utf-8") as f:
+        queries = json.load(f)
+
+    embeddings = HashingEmbeddings(embed_latency)
+    store = PersistentVectorStore(tempfile.mkdtemp(), embeddings)
+    reviews = list(iter_dataset(REVIEWS, "reviews"))
+    start = time.perf_counter()
+    store.add_texts(
+        [f"{review.title}\n{review.review_text}" for review in reviews],
+        [{"car_name": review.car_name, "car_year": review.car_year, "rating": review.rating} for review in reviews],
+    )
+    print(f"Indexed {len(store)} reviews in {time.perf_counter() - start:.2f}s, {len(queries)} queries, k={K}")
+
+    retriever = HybridRetriever(store=store, k=K)
+    print(f"{'mode':>8} {'hit@' + str(K):>6} {'mean ms':>8} {'p95 ms':>7} {'embed calls':>12}")
+    for mode in ["lexical", "vector", "hybrid", "auto"]:
+        hits, latencies = 0, []
+        calls = embeddings.calls
+        for query in queries:
+            filter = {"car_name": query["car_name"]} if "car_name" in query else None
+            start = time.perf_counter()
+            docs, _ = retriever.search(query["query"], filter=filter, mode=None if mode == "auto" else mode)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += is_hit(docs, query["relevant"])
+        print(f"{mode:>8} {hits / len(queries):>6.2f} {np.mean(latencies):>8.1f} "
+              f"{np.percentile(latencies, 95):>7.1f} {embeddings.calls - calls:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embed-latency", type=float, default=0.15)
+    main(parser.parse_args().embed_latency)
@@ -0,0 +1,327 @@
+import hashlib
+import json
+import os
+import uuid
+from collections import defaultdict
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from ann import IVFPQIndex
+from bm25 import BM25Index
+
+INDEX_FORMAT_VERSION = 1
+# Below this many rows exact search is fast enough and no ANN index is built
+ANN_MIN_ROWS = 20_000
+# Metadata fields that split the store into partitions for filtered search
+PARTITION_FIELDS = ("car_name", "car_year")
+
+
+def partition_key(metadata, fields=PARTITION_FIELDS):
+    return tuple(str(metadata.get(field)) for field in fields)
+
+
+def matches(value, wanted):
+    """Whether a metadata value satisfies a filter value (scalar or list of alternatives)."""
+    if isinstance(wanted, (list, tuple, set)):
+        return str(value) in {str(w) for w in wanted}
+    return str(value) == str(wanted)
+
+
+def document_hash(text, metadata=None):
+    payload = json.dumps([text, metadata or {}], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def atomic_write(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class PersistentVectorStore(VectorStore):
+    """Vector store kept on disk, so a restart needs no embedding calls.
+
+    index_dir holds three files:
+      vectors.f32  row-major float32 matrix of unit-length embeddings, memory-mapped
+      meta.jsonl   one {"id", "hash", "text", "metadata"} line per row
+      index.json   format version, dimension and committed row count
+
+    New rows are appended to vectors.f32 and meta.jsonl, then the row count in
+    index.json is replaced atomically, so a crash mid-append leaves the
+    previous rows intact. Texts already stored (same text and metadata) are
+    not embedded again.
+
+    Once the store holds ann_min_rows rows, searches go through an IVF-PQ
+    index (ann.py) saved alongside as ivfpq.npz; nprobe and rerank trade
+    latency for recall. The index is retrained when the store has doubled
+    since it was trained.
+
+    Rows are also grouped into partitions by the partition_fields of their
+    metadata (car name and year by default). A search with a filter on those
+    fields, e.g. filter={"car_name": "tacoma", "car_year": 2022}, scans only
+    the rows of the matching partitions; other filter fields (rating, ...)
+    are then checked row by row within them.
+
+    A BM25 index over the same rows (bm25.py) is rebuilt from meta.jsonl on
+    load and kept in step on add, for keyword search without embeddings.
+    """
+
+    def __init__(self, index_dir: str, embedding: Embeddings, ann_min_rows=ANN_MIN_ROWS, nprobe=16, rerank=128,
+                 partition_fields=PARTITION_FIELDS):
+        self.index_dir = index_dir
+        self.embedding = embedding
+        self.vectors_path = os.path.join(index_dir, "vectors.f32")
+        self.meta_path = os.path.join(index_dir, "meta.jsonl")
+        self.index_path = os.path.join(index_dir, "index.json")
+        self.ann_path = os.path.join(index_dir, "ivfpq.npz")
+        self.ann_min_rows = ann_min_rows
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.ann = None
+        self.ann_trained_rows = 0
+        self.partition_fields = tuple(partition_fields)
+        self.partitions = defaultdict(list)  # partition key -> rows
+        self.lexical = BM25Index()
+        os.makedirs(index_dir, exist_ok=True)
+
+        self.dim = None
+        self.count = 0
+        self.ids = []
+        self.texts = []
+        self.metadatas = []
+        self.hashes = {}  # document hash -> row
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self._load()
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding
+
+    def __len__(self):
+        return self.count
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"{self.index_dir}: unsupported index version {index.get('version')}")
+        self.dim = index["dim"]
+        self.count = index["count"]
+
+        # Rows past the committed count belong to an interrupted append
+        offset = 0
+        with open(self.meta_path, "rb") as f:
+            for row in range(self.count):
+                line = f.readline()
+                offset += len(line)
+                entry = json.loads(line)
+                self._append_row(entry["hash"], entry["id"], entry["text"], entry["metadata"])
+        self._truncate(self.meta_path, offset)
+        self._truncate(self.vectors_path, self.count * self.dim * 4)
+        self._map()
+
+        if os.path.exists(self.ann_path):
+            self.ann = IVFPQIndex.load(self.ann_path)
+            self.ann_trained_rows = self.ann.ntotal
+            if self.ann.ntotal > self.count:
+                # Saved after rows that were never committed: retrain from scratch
+                self.ann = None
+        self._update_ann()
+
+    def _update_ann(self):
+        """Build, extend or retrain the ANN index to cover every row, and save it."""
+        if self.count < self.ann_min_rows:
+            return
+        if self.ann is None or self.count >= 2 * self.ann_trained_rows:
+            self.ann = IVFPQIndex(self.dim, nlist=int(4 * np.sqrt(self.count)), m=self._subspaces(),
+                                  nprobe=self.nprobe, rerank=self.rerank)
+            self.ann.train(self.vectors)
+            self.ann_trained_rows = self.count
+        elif self.ann.ntotal == self.count:
+            return
+        start = self.ann.ntotal
+        self.ann.add(self.vectors[start:], np.arange(start, self.count))
+        # Written to a temp file first so a crash never leaves a torn index
+        tmp = self.ann_path + ".tmp.npz"
+        self.ann.save(tmp)
+        os.replace(tmp, self.ann_path)
+
+    def _subspaces(self):
+        # 32-dimensional subspaces where possible (48 for 1536-dim ada-002 vectors)
+        for m in (self.dim // 32, 16, 8, 4, 2, 1):
+            if m and self.dim % m == 0:
+                return m
+
+    @staticmethod
+    def _truncate(path, size):
+        if os.path.getsize(path) > size:
+            with open(path, "r+b") as f:
+                f.truncate(size)
+
+    def _append_row(self, key, doc_id, text, metadata):
+        row = len(self.ids)
+        self.hashes[key] = row
+        self.ids.append(doc_id)
+        self.texts.append(text)
+        self.metadatas.append(metadata)
+        self.partitions[partition_key(metadata, self.partition_fields)].append(row)
+        self.lexical.add(row, text)
+
+    def _meta_line(self, row):
+        entry = {
+            "id": self.ids[row],
+            "hash": document_hash(self.texts[row], self.metadatas[row]),
+            "text": self.texts[row],
+            "metadata": self.metadatas[row],
+        }
+        return json.dumps(entry, ensure_ascii=False) + "\n"
+
+    def _map(self):
+        if self.count:
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+        else:
+            self.vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Embed and append texts not already in the store; returns the id of every text."""
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [None] * len(texts)
+
+        result = []
+        new = {}  # hash -> (id, text, metadata), deduplicated within the batch too
+        for text, metadata, doc_id in zip(texts, metadatas, ids):
+            key = document_hash(text, metadata)
+            if key in self.hashes:
+                result.append(self.ids[self.hashes[key]])
+            else:
+                if key not in new:
+                    new[key] = (doc_id or uuid.uuid4().hex, text, metadata)
+                result.append(new[key][0])
+        if not new:
+            return result
+
+        rows = list(new.values())
+        vectors = np.asarray(self.embedding.embed_documents([text for _, text, _ in rows]), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+
+        start = self.count
+        for key, (doc_id, text, metadata) in new.items():
+            self._append_row(key, doc_id, text, metadata)
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.meta_path, "a", encoding="utf-8") as f:
+            for row in range(start, start + len(rows)):
+                f.write(self._meta_line(row))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.count += len(rows)
+        atomic_write(self.index_path, json.dumps({"version": INDEX_FORMAT_VERSION, "dim": self.dim, "count": self.count}))
+        self._map()
+        self._update_ann()
+        return result
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        index_dir: str = "vector_index",
+        **kwargs: Any,
+    ) -> "PersistentVectorStore":
+        store = cls(index_dir, embedding)
+        store.add_texts(texts, metadatas, **kwargs)
+        return store
+
+    def _document(self, row):
+        return Document(page_content=self.texts[row], metadata=dict(self.metadatas[row]))
+
+    def filter_rows(self, filter):
+        """Rows whose metadata satisfies every field of filter, as a sorted array."""
+        keys = [
+            key for key in self.partitions
+            if all(matches(value, filter[field]) for field, value in zip(self.partition_fields, key) if field in filter)
+        ]
+        rows = np.sort(np.fromiter((row for key in keys for row in self.partitions[key]), dtype=np.int64))
+        rest = {field: wanted for field, wanted in filter.items() if field not in self.partition_fields}
+        if rest:
+            rows = np.array([
+                row for row in rows
+                if all(matches(self.metadatas[row].get(field), wanted) for field, wanted in rest.items())
+            ], dtype=np.int64)
+        return rows
+
+    def _top_k(self, vector, k, filter=None):
+        if not self.count:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1)
+        if filter:
+            rows = self.filter_rows(filter)
+            if not len(rows):
+                return []
+            scores = self.vectors[rows] @ query
+        elif self.ann is not None:
+            return self.ann.search(query, k, self.vectors)
+        else:
+            rows = None
+            scores = self.vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        if rows is not None:
+            return [(int(rows[i]), float(scores[i])) for i in top]
+        return [(int(row), float(scores[row])) for row in top]
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        """Documents most similar to embedding with their cosine similarity.
+
+        filter maps metadata fields to a value or a list of accepted values.
+        """
+        return [(self._document(row), score) for row, score in self._top_k(embedding, k, filter)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def lexical_search_with_score(self, query: str, k: int = 4,
+                                  filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        """Documents ranked by BM25 score for query; makes no embedding call."""
+        rows = self.filter_rows(filter) if filter else None
+        return [(self._document(row), score) for row, score in self.lexical.search(query, k, rows)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] -> relevance in [0, 1]
+        return lambda score: (score + 1) / 2
@@ -1,5 +1,8 @@
-from flask import Flask
+from flask import Flask, Response, g, request
 from scrape.db import Database
+from scrape.cache import ResponseCache
+from scrape.suggest import SuggestionIndex
+from scrape.car_query import CarQuery, CarQueryError
 from flask_cors import CORS
 
 # Create a Flask app
@@ -14,50 +17,128 @@ db_params = {
         "port": 5433
 }
 
+def get_db():
+    # One pooled connection per request, returned in teardown_db
+    if "db" not in g:
+        g.db = Database(db_params)
+        g.db.connect()
+    return g.db
+
+@app.teardown_appcontext
+def teardown_db(exception):
+    db = g.pop("db", None)
+    if db is not None:
+        db.close()
+
+def catalogue_version():
+    return get_db().get_catalogue_version()
+
+# Serialized responses for routes that only read the cars table
+response_cache = ResponseCache(catalogue_version, ttl=300, max_entries=1024)
+
+# Review aggregates change only when scrape/aggregates.py refreshes them
+aggregate_cache = ResponseCache(lambda: get_db().get_catalogue_version("review_aggregates"),
+                                ttl=3600, max_entries=4096)
+
+# Autocomplete index, synced from the cars table when the catalogue version changes
+suggestion_index = SuggestionIndex()
+
+def cached_json(key, load, cache=response_cache):
+    """Serve key from cache, calling load() to build the payload on a miss.
+
+    load returns the response dict, or None if it should not be cached.
+    """
+    def loader():
+        payload = load()
+        return None if payload is None else app.json.dumps(payload).encode()
+
+    body = cache.get_or_load(key, loader)
+    if body is None:
+        return None
+    return Response(body, status=200, mimetype="application/json")
+
 # Define a route
 @app.route('/<car>/<year>/summary')
 def car_summary(car, year):
     # Logic to fetch and return the summary for the given car_string
-    db = Database(db_params)
-    db.connect()
+    db = get_db()
     summary = db.get_summary(car, year)
-    db.close()
 
     if summary: return {"summary": summary}, 200
     else: return {"error": "Summary not found."}, 400
 
+def aggregate_view(row):
+    # Ratios are of rated reviews; histogram counts 1 to 5 stars
+    (_, _, category, review_count, rating_count, rating_sum,
+     positive_count, negative_count, *histogram) = row
+    return category, {
+        "review_count": review_count,
+        "mean_rating": rating_sum / rating_count if rating_count else None,
+        "positive_ratio": positive_count / rating_count if rating_count else None,
+        "negative_ratio": negative_count / rating_count if rating_count else None,
+        "histogram": histogram,
+    }
+
+@app.route('/<car>/<year>/aggregates')
+def car_aggregates(car, year):
+    # Precomputed by scrape/aggregates.py, so no LLM call per view
+    def load():
+        rows = get_db().get_review_aggregates(car, year)
+        return {"aggregates": dict(map(aggregate_view, rows))} if rows else None
+
+    response = cached_json(("aggregates", car, year), load, aggregate_cache)
+    if response is None:
+        return {"error": "Aggregates not found."}, 404
+    return response
+
 @app.route('/<car>/<year>/data')
 def car_data(car, year):
-    db = Database(db_params)
-    db.connect()
-    car_data = db.get_car_data(car, year)
-    db.close()
-    return {"car_data": car_data}, 200
+    def load():
+        car_data = get_db().get_car_data(car, year)
+        return None if car_data is None else {"car_data": car_data}
+
+    response = cached_json(("car_data", car, year), load)
+    if response is None:
+        return {"car_data": None}, 200
+    return response
     
 @app.route('/cars')
 def cars():
-    db = Database(db_params)
-    db.connect()
-    models, years = db.get_models_and_years()
-    db.close()
-    return {"models": models, "years": years}, 200
+    def load():
+        models, years = get_db().get_models_and_years()
+        return {"models": models, "years": years} if models else None
+
+    response = cached_json(("cars",), load)
+    if response is None:
+        return {"models": [], "years": []}, 200
+    return response
 
 @app.route('/suggestions/<query>')
 def suggestions(query):
-    db = Database(db_params)
-    db.connect()
-    suggestions = db.get_suggestions(query)
-    print(f"Query: {query}, Suggestions: {suggestions}")
-    db.close()
+    version = response_cache.current_version()
+    if suggestion_index.version is None or suggestion_index.version != version:
+        rows = get_db().get_model_years()
+        if rows is not None:
+            suggestion_index.sync(rows, version)
+    suggestions = suggestion_index.search(query, k=10)
     return {"suggestions": suggestions}, 200
 
 @app.route('/all_cars')
 def all_cars():
-    db = Database(db_params)
-    db.connect()
-    all_cars = db.get_all_car_data()
-    db.close()
-    return {"all_cars": all_cars}, 200
+    # Filtered, sorted and paginated in the database; see scrape/car_query.py for the parameters
+    try:
+        query = CarQuery.from_args(request.args)
+    except CarQueryError as e:
+        return {"error": str(e)}, 400
+
+    def load():
+        rows = get_db().query_cars(query)
+        return None if rows is None else query.page(rows)
+
+    response = cached_json(query.cache_key(), load)
+    if response is None:
+        return {"all_cars": None, "next_cursor": None}, 200
+    return response
 
 
 
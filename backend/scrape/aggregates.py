@@ -0,0 +1,69 @@
+"""Offline aggregation of car_reviews into car_review_aggregates.
+
+Each review is counted once per category it is tagged with in
+review_aspects (see aspects.py) and once for "overall". Aggregates are per
+model year, so reviews without a car_year are left out. Refreshes are
+incremental: only reviews added since the previous refresh are read and
+their counts are added to the stored rows. Reviews not tagged yet wait for
+a later refresh.
+Run from the scrape directory: python aggregates.py [--full]
+"""
+import sys
+import time
+from collections import defaultdict
+from db import AGGREGATE_COUNT_COLUMNS, Database
+from aspects import OVERALL
+
+POSITIVE_RATING = 4  # and above
+NEGATIVE_RATING = 2  # and below
+
+
+def rating_stars(rating):
+    # Histogram bucket 1-5, or None for unrated reviews
+    if rating is None:
+        return None
+    return min(5, max(1, int(round(rating))))
+
+
+def aggregate_reviews(reviews):
+    """Rows of AGGREGATE_COLUMNS for reviews of (review_id, car_name, car_year, rating, categories)."""
+    counts = defaultdict(lambda: [0] * len(AGGREGATE_COUNT_COLUMNS))
+    for _, car_name, car_year, rating, categories in reviews:
+        # car_year is nullable in car_reviews but part of the aggregate key
+        if car_year is None:
+            continue
+        stars = rating_stars(rating)
+        for category in [OVERALL] + list(categories):
+            row = counts[car_name, car_year, category]
+            row[0] += 1
+            if stars is None:
+                continue
+            row[1] += 1
+            row[2] += rating
+            row[3] += rating >= POSITIVE_RATING
+            row[4] += rating <= NEGATIVE_RATING
+            row[4 + stars] += 1
+    return [key + tuple(row) for key, row in counts.items()]
+
+
+def refresh_aggregates(db_params, full=False):
+    db = Database(db_params)
+    start = time.perf_counter()
+    result = db.refresh_review_aggregates(aggregate_reviews, full=full)
+    if result:
+        count, rebuilt = result
+        kind = "Rebuilt" if rebuilt else "Updated"
+        print(f"{kind} review aggregates from {count} reviews ({time.perf_counter() - start:.2f}s)")
+    db.close()
+    return result
+
+
+if __name__ == "__main__":
+    db_params = {
+        "dbname": "test_db",
+        "user": "postgres",
+        "password": "password",
+        "host": "localhost",
+        "port": 5433
+    }
+    refresh_aggregates(db_params, full="--full" in sys.argv)
@@ -1,49 +1,101 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
 from typing import List
 from dotenv import load_dotenv
 from db import Database
-from scrape import Review
-import pickle
+from dataset import iter_dataset
+from llm_cache import get_default_cache
+from summarize import MapReduceSummarizer, SummaryScheduler, print_progress
+import asyncio
 import os
+import time
 
-def get_overall_summary(reviews: List[str]) -> str:
-    load_dotenv()
-    client = OpenAI()
-    
-    # Combine all reviews into a single text
-    combined_reviews = "\n".join(reviews)
+load_dotenv()
 
-    max_tokens = 8192
-    if len(combined_reviews) > max_tokens:
-        combined_reviews = combined_reviews[:max_tokens]
-    
-    # Create prompt for overall summary
-    prompt = f"""Please provide a concise overall summary of these car reviews. Keep it under 200 words.:
+SUMMARY_MODEL = "gpt-3.5-turbo"
+SUMMARY_TEMPERATURE = 0.7
+SUMMARY_TEMPLATE = """Please provide a concise overall summary of these car reviews. Keep it under 200 words.:
 
-            {combined_reviews}
+            {reviews}
 
             Focus on:
             1. General sentiment
             2. Key themes
             """
 
+# Map step: one group of reviews
+CHUNK_TEMPLATE = """Summarize this group of car reviews in under 150 words.:
+
+            {reviews}
+
+            Focus on:
+            1. General sentiment
+            2. Key themes, with the main praise and complaints
+            """
+
+# Reduce step: summaries of groups of reviews for the same car
+REDUCE_TEMPLATE = """These are summaries of groups of reviews of the same car. Combine them into a concise overall summary. Keep it under 200 words.:
+
+            {reviews}
+
+            Focus on:
+            1. General sentiment
+            2. Key themes
+            """
+
+# Tokens of reviews per prompt, counted with the model's tokenizer
+CHUNK_BUDGET = 3000
+
+
+def make_summarizer(client, concurrency=8, cache=None, **limits):
+    # limits go to SummaryScheduler, e.g. rpm/tpm for the account's rate-limit tier
+    scheduler = SummaryScheduler(client, model=SUMMARY_MODEL, temperature=SUMMARY_TEMPERATURE,
+                                 max_tokens=300, concurrency=concurrency, **limits)
+    return MapReduceSummarizer(scheduler, cache or get_default_cache(), SUMMARY_TEMPLATE,
+                               CHUNK_TEMPLATE, REDUCE_TEMPLATE, chunk_budget=CHUNK_BUDGET)
+
+def get_overall_summary(reviews: List[str]) -> str:
+    async def summarize():
+        client = AsyncOpenAI(max_retries=0)
+        try:
+            return await make_summarizer(client).summarize(reviews)
+        finally:
+            await client.close()
+
+    return asyncio.run(summarize())
 
-    
-    # Get completion from OpenAI
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.7,
-        max_tokens=300
-    )
-    
-    # Extract and return the summary
-    return response.choices[0].message.content
 
+async def summarize_groups(car_reviews, concurrency=8, base_url=None, cache=None, **limits):
+    """Summarize every {"car year": [review, ...]} group concurrently.
 
-def fill_summary_table():
+    Every review is read: groups are map-reduced over token-budgeted chunks.
+    Chunk and final summaries are cached, so after a rescrape only the chunks
+    with new reviews and their reduce steps go to the model.
+    """
+    cache = cache or get_default_cache()
+    # Retries are handled by the scheduler, with its own backoff
+    client = AsyncOpenAI(base_url=base_url, max_retries=0) if base_url else AsyncOpenAI(max_retries=0)
+    summarizer = make_summarizer(client, concurrency, cache, **limits)
+    summaries = {}
+    start = time.perf_counter()
+
+    async def summarize_group(group, reviews):
+        try:
+            summaries[group] = await summarizer.summarize(reviews)
+        except Exception as e:
+            print(f"Error summarizing {group}:", e)
+            return
+        print_progress(len(summaries), len(car_reviews), group, time.perf_counter() - start)
+
+    try:
+        await asyncio.gather(*(summarize_group(group, reviews) for group, reviews in car_reviews.items()))
+    finally:
+        await client.close()
+
+    print("Summary cache:", cache.stats())
+    return summaries
+
+
+def fill_summary_table(concurrency=8):
     db_params = {
         "dbname": "test_db",
         "user": "postgres",
@@ -55,22 +107,20 @@ def fill_summary_table():
     db = Database(db_params)
     db.connect()
     script_dir = os.path.dirname(__file__)
-    with open(os.path.join(script_dir, "db.pickle"), "rb") as f:
-        reviews = pickle.load(f)
-    
     car_reviews = {}
-    for review in reviews:
+    for review in iter_dataset(os.path.join(script_dir, "reviews.jsonl.gz"), "reviews"):
         key = review.car_name + " " + review.car_year
         if car_reviews.get(key) is None:
             car_reviews[key] = []
         car_reviews[key].append(review.review_text)
 
-    for key, reviews in car_reviews.items():
+    summaries = asyncio.run(summarize_groups(car_reviews, concurrency))
+
+    for key, summary in summaries.items():
         car, year = key.split(" ")
-        summary = get_overall_summary(reviews)
-        # print(f"Summary for {car} {year}: {summary}")
         db.add_summary(car, year, summary)
         
     db.close()
 
-fill_summary_table()
+if __name__ == "__main__":
+    fill_summary_table()
@@ -10,6 +10,8 @@ from pydantic import BaseModel, Field
 from opentelemetry.instrumentation.openai import OpenAIInstrumentor
 from opentelemetry import trace
 from phoenix.otel import register
+from llm_cache import cache_key, get_default_cache
+from sentiment import NEUTRAL_BAND, load_default_model
 
 # Define output schemas
 class Quote(BaseModel):
@@ -30,9 +32,20 @@ class ReviewAnalysis(BaseModel):
     overall_sentiment: str
     quotes: List[str]
 
+class ReviewQuotes(BaseModel):
+    quotes: List[str]
+
+def overall_sentiment(total, positive):
+    # Same band as a single review's label, applied to the share of positive reviews
+    ratio = positive / total if total else 0.5
+    return "positive" if ratio >= NEUTRAL_BAND[1] else "negative" if ratio <= NEUTRAL_BAND[0] else "neutral"
+
 class ReviewAnalyzer:
-    def __init__(self):
+    def __init__(self, cache=None, sentiment=None):
         self.llm = OpenAI(temperature=0)
+        self.cache = cache or get_default_cache()
+        # Local classifier trained on star ratings (sentiment.py); counts come from it when trained
+        self.sentiment = sentiment or load_default_model()
 
         # Fixed prompt template with escaped curly braces for the JSON example
         self.prompt = PromptTemplate(
@@ -55,15 +68,56 @@ class ReviewAnalyzer:
         self.parser = PydanticOutputParser(pydantic_object=ReviewAnalysis)
         self.chain = self.prompt | self.llm | self.parser
 
+        # With the local classifier, the LLM only picks quotes
+        self.quote_prompt = PromptTemplate(
+            template="""Pick up to 3 representative customer quotes about {category} from these reviews and provide a JSON response:
+
+                    Reviews:
+                    {reviews}
+
+                    Provide the quotes in this exact JSON format:
+                    {{
+                        "quotes": ["quote1", "quote2"]
+                    }}""",
+            input_variables=["category", "reviews"]
+        )
+        self.quote_chain = self.quote_prompt | self.llm | PydanticOutputParser(pydantic_object=ReviewQuotes)
+
     def analyze_category(self, category: str, reviews: List[str]) -> ReviewAnalysis:
         reviews_text = "\n".join([f"- {review}" for review in reviews])
 
-        result = self.chain.invoke({
-            "category": category,
-            "reviews": reviews_text
-        })
-
-        return result
+        # reviews are the caller's selection for category (review_aspects for a
+        # batch), as "title\nbody" texts like the classifier's training data
+        if self.sentiment is not None:
+            if not reviews:
+                return ReviewAnalysis(total_mentions=0, positive_mentions=0, negative_mentions=0,
+                                      overall_sentiment=overall_sentiment(0, 0), quotes=[])
+            total, positive, negative = self.sentiment.counts(reviews)
+            key = cache_key(self.llm.model_name, self.quote_prompt.template, self.llm.temperature, [category, reviews])
+
+            def quotes():
+                return self.quote_chain.invoke({"category": category, "reviews": reviews_text}).model_dump()
+
+            picked, _ = self.cache.get_or_compute(key, quotes)
+            return ReviewAnalysis(
+                total_mentions=total,
+                positive_mentions=positive,
+                negative_mentions=negative,
+                overall_sentiment=overall_sentiment(total, positive),
+                quotes=picked["quotes"],
+            )
+
+        key = cache_key(self.llm.model_name, self.prompt.template, self.llm.temperature, [category, reviews])
+
+        def analyze():
+            result = self.chain.invoke({
+                "category": category,
+                "reviews": reviews_text
+            })
+            return result.model_dump()
+
+        result, _ = self.cache.get_or_compute(key, analyze)
+        return ReviewAnalysis.model_validate(result)
 
     def format_output(self, result: ReviewAnalysis) -> str:
         return format_analysis_result(result)
@@ -79,13 +133,8 @@ def format_analysis_result(result: ReviewAnalysis) -> str:
         "end": "\033[0m"  # Reset
     }
 
-    # Get color based on sentiment ratio
-    sentiment_ratio = result.positive_mentions / result.total_mentions
-    color = (
-        sentiment_color["positive"] if sentiment_ratio > 0.6
-        else sentiment_color["negative"] if sentiment_ratio < 0.4
-        else sentiment_color["neutral"]
-    )
+    # Get color based on the overall sentiment
+    color = sentiment_color.get(result.overall_sentiment, sentiment_color["neutral"])
 
     output = [
         "\n=== Review Analysis Results ===\n",
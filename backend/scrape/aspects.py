@@ -0,0 +1,148 @@
+"""Aspect categories for reviews, matching the sentiment filters in the frontend.
+
+A review belongs to every category whose keywords appear in its title or
+body. With an embedding function, a review is also tagged with categories
+whose description it is close to, which catches reviews that talk about an
+aspect without using its keywords. Every review also counts towards
+"overall", which is implied and not stored.
+
+Tags are stored in review_aspects when reviews are loaded (see
+load_data.py). Run from the scrape directory to tag reviews by hand:
+python aspects.py [--retag] [--embeddings]
+"""
+import re
+import sys
+import time
+
+import numpy as np
+
+from db import Database
+
+OVERALL = "overall"
+
+CATEGORY_KEYWORDS = {
+    "performance": ["acceleration", "accelerate", "power", "horsepower", "engine", "handling", "speed",
+                    "torque", "fast", "quick", "sluggish", "responsive", "transmission", "merging"],
+    "fuel efficiency": ["mpg", "mileage", "fuel", "gas", "economy", "efficient", "efficiency", "hybrid",
+                        "range", "battery"],
+    "cost": ["price", "cost", "msrp", "expensive", "cheap", "affordable", "value", "dealer", "markup",
+             "payment", "insurance", "maintenance"],
+    "comfort": ["comfort", "comfortable", "seat", "seats", "ride", "quiet", "noise", "noisy", "roomy",
+                "legroom", "cabin", "smooth", "bumpy"],
+    "reliability": ["reliable", "reliability", "problem", "problems", "issue", "issues", "repair", "recall",
+                    "broke", "warranty", "dependable", "defect"],
+    "safety": ["safety", "safe", "brake", "brakes", "braking", "airbag", "collision", "blind spot",
+               "lane", "crash", "visibility"],
+    "technology": ["technology", "tech", "screen", "infotainment", "carplay", "android auto", "bluetooth",
+                   "navigation", "touchscreen", "software", "app", "camera"],
+}
+
+# Compared with review embeddings
+CATEGORY_DESCRIPTIONS = {
+    "performance": "How the car accelerates, handles and how powerful the engine and transmission feel.",
+    "fuel efficiency": "Fuel economy, miles per gallon, hybrid battery and driving range.",
+    "cost": "The price paid, dealer markups, value for money and the cost of ownership.",
+    "comfort": "Seat comfort, ride quality, cabin noise and interior space.",
+    "reliability": "Breakdowns, repairs, recalls and how dependable the car has been over time.",
+    "safety": "Safety features, braking, driver assistance, visibility and crash protection.",
+    "technology": "The infotainment screen, phone integration, navigation, cameras and software.",
+}
+
+CATEGORIES = [OVERALL] + list(CATEGORY_KEYWORDS)
+
+CATEGORY_PATTERNS = {
+    category: re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")\b", re.IGNORECASE)
+    for category, keywords in CATEGORY_KEYWORDS.items()
+}
+
+# Cosine similarity to a category description above which a review is tagged with it
+EMBEDDING_THRESHOLD = 0.8
+
+
+def review_text(title, body):
+    return f"{title or ''}\n{body or ''}"
+
+
+def keyword_categories(text):
+    return [category for category, pattern in CATEGORY_PATTERNS.items() if pattern.search(text)]
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class AspectTagger:
+    """Tags reviews with categories by keyword and, optionally, by embedding.
+
+    embed is a function from a list of texts to a list of vectors, e.g.
+    OpenAIEmbeddings().embed_documents; without it only keywords are used.
+    """
+
+    def __init__(self, embed=None, threshold=EMBEDDING_THRESHOLD):
+        self.embed = embed
+        self.threshold = threshold
+        self.prototypes = None
+
+    def categories(self, texts):
+        """Return a set of categories per text ("overall" is implied and not included)."""
+        tags = [set(keyword_categories(text)) for text in texts]
+        if self.embed is None or not texts:
+            return tags
+        if self.prototypes is None:
+            self.prototypes = normalize(self.embed(list(CATEGORY_DESCRIPTIONS.values())))
+        similarity = normalize(self.embed(texts)) @ self.prototypes.T
+        names = list(CATEGORY_DESCRIPTIONS)
+        for row, column in zip(*np.nonzero(similarity >= self.threshold)):
+            tags[row].add(names[column])
+        return tags
+
+    def tag(self, reviews):
+        """Rows of (review_id, car_name, car_year, category) for reviews of
+        (review_id, car_name, car_year, title, body)."""
+        tags = self.categories([review_text(title, body) for _, _, _, title, body in reviews])
+        return [(review_id, car_name, car_year, category)
+                for (review_id, car_name, car_year, _, _), categories in zip(reviews, tags)
+                for category in sorted(categories)]
+
+
+def openai_embedder(model="text-embedding-3-small", batch_size=512):
+    from openai import OpenAI
+    client = OpenAI()
+
+    def embed(texts):
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            response = client.embeddings.create(model=model, input=texts[start:start + batch_size])
+            vectors.extend(item.embedding for item in response.data)
+        return vectors
+
+    return embed
+
+
+def tag_reviews(db_params, tagger=None, retag=False):
+    """Tag the reviews not tagged yet (every review if retag) in review_aspects."""
+    db = Database(db_params)
+    start = time.perf_counter()
+    result = db.tag_reviews((tagger or AspectTagger()).tag, retag=retag)
+    if result:
+        reviews, tags = result
+        print(f"Tagged {reviews} reviews with {tags} aspects ({time.perf_counter() - start:.2f}s)")
+    db.close()
+    return result
+
+
+if __name__ == "__main__":
+    from aggregates import refresh_aggregates
+
+    db_params = {
+        "dbname": "test_db",
+        "user": "postgres",
+        "password": "password",
+        "host": "localhost",
+        "port": 5433
+    }
+    retag = "--retag" in sys.argv
+    tag_reviews(db_params, AspectTagger(openai_embedder() if "--embeddings" in sys.argv else None), retag)
+    # Retagged reviews were counted under their old categories
+    refresh_aggregates(db_params, full=retag)
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Versioned in-process read-through cache of serialized responses.
+
+    Entries are the response bytes, so a hit skips both the query and the JSON
+    encoding. Every entry is tagged with the catalogue version it was built
+    from; when version_fn reports a new version the whole cache is dropped.
+    version_fn is polled at most once every version_poll seconds.
+    """
+
+    def __init__(self, version_fn, ttl=300, max_entries=1024, version_poll=2.0):
+        self.version_fn = version_fn
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_poll = version_poll
+        self.entries = OrderedDict()  # key -> (expires_at, body)
+        self.lock = threading.Lock()
+        self.version = None
+        self.version_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def current_version(self):
+        now = time.monotonic()
+        if self.version is not None and now - self.version_checked_at < self.version_poll:
+            return self.version
+        version = self.version_fn()
+        with self.lock:
+            self.version_checked_at = now
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+        return version
+
+    def get_or_load(self, key, loader):
+        """Return the cached bytes for key, calling loader() on a miss.
+
+        loader returns the serialized body, or None for results that should not
+        be cached (errors, missing rows).
+        """
+        version = self.current_version()
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        body = loader()
+        if body is None:
+            return None
+
+        with self.lock:
+            if self.version != version:
+                # The catalogue was reloaded while we were loading
+                return body
+            self.entries[key] = (now + self.ttl, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return body
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+            self.version = None
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries), "version": self.version}
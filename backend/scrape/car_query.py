@@ -0,0 +1,119 @@
+"""Query parameters for /all_cars: projection, filters, sorting and keyset pagination.
+
+    /all_cars?fields=car_model,car_year,msrp&min_msrp=20000&max_msrp=40000
+             &drive_type=All Wheel Drive&sort=-mpg&limit=50&cursor=...
+
+Numeric fields take min_<field> and max_<field> (inclusive); drive_type
+takes one or more exact values. sort is a field name, with a leading "-"
+for descending, and car_id breaks ties. Pages are keyset paginated: each
+response carries an opaque cursor for the row after its last one, so every
+page costs one index range scan no matter how deep it is. Cars with no
+value for the sort field are left out of sorted results, since they have
+no place in the order.
+"""
+import base64
+import json
+
+# field -> Python type of its values
+CAR_FIELDS = {
+    "car_id": int,
+    "car_model": str,
+    "car_year": int,
+    "msrp": int,
+    "horsepower": int,
+    "mpg": int,
+    "num_seats": int,
+    "drive_type": str,
+}
+RANGE_FIELDS = ("car_year", "msrp", "horsepower", "mpg", "num_seats")
+SORT_FIELDS = ("car_id", "car_model", "car_year", "msrp", "horsepower", "mpg", "num_seats")
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class CarQueryError(ValueError):
+    pass
+
+
+class CarQuery:
+    def __init__(self, fields=None, ranges=None, drive_types=None, sort="car_id", descending=False,
+                 limit=DEFAULT_LIMIT, after=None):
+        self.fields = fields or list(CAR_FIELDS)
+        self.ranges = ranges or {}  # field -> (min or None, max or None)
+        self.drive_types = drive_types or []
+        self.sort = sort
+        self.descending = descending
+        self.limit = limit
+        self.after = after  # (sort value, car_id) of the last row of the previous page
+
+    @classmethod
+    def from_args(cls, args):
+        """Parse request args (a werkzeug MultiDict); raises CarQueryError on bad input."""
+        fields = None
+        if args.get("fields"):
+            fields = [field.strip() for field in args["fields"].split(",") if field.strip()]
+            unknown = [field for field in fields if field not in CAR_FIELDS]
+            if unknown:
+                raise CarQueryError(f"Unknown fields: {', '.join(unknown)}")
+
+        ranges = {}
+        for field in RANGE_FIELDS:
+            bounds = tuple(parse_number(args.get(f"{bound}_{field}"), f"{bound}_{field}") for bound in ("min", "max"))
+            if bounds != (None, None):
+                ranges[field] = bounds
+
+        sort = args.get("sort", "car_id")
+        descending = sort.startswith("-")
+        sort = sort.lstrip("-")
+        if sort not in SORT_FIELDS:
+            raise CarQueryError(f"Cannot sort by {sort}")
+
+        limit = parse_number(args.get("limit"), "limit") or DEFAULT_LIMIT
+        if not 1 <= limit <= MAX_LIMIT:
+            raise CarQueryError(f"limit must be between 1 and {MAX_LIMIT}")
+
+        query = cls(fields, ranges, args.getlist("drive_type"), sort, descending, limit)
+        if args.get("cursor"):
+            query.after = query.decode_cursor(args["cursor"])
+        return query
+
+    def cache_key(self):
+        return ("all_cars", tuple(self.fields), tuple(sorted(self.ranges.items())), tuple(sorted(self.drive_types)),
+                self.sort, self.descending, self.limit, self.after)
+
+    def columns(self):
+        """Columns to select: the requested fields plus the keyset columns."""
+        return list(dict.fromkeys(self.fields + [self.sort, "car_id"]))
+
+    def encode_cursor(self, row):
+        """Cursor for the page after row, a dict of columns()."""
+        payload = json.dumps([self.sort, self.descending, row[self.sort], row["car_id"]])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            sort, descending, value, car_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            raise CarQueryError("Invalid cursor")
+        if (sort, descending) != (self.sort, self.descending):
+            raise CarQueryError("Cursor is for a different sort order")
+        if not isinstance(value, CAR_FIELDS[sort]) or not isinstance(car_id, int):
+            raise CarQueryError("Invalid cursor")
+        return value, car_id
+
+    def page(self, rows):
+        """Response payload for rows of columns(), fetched with limit + 1 to detect a next page."""
+        columns = self.columns()
+        rows = [dict(zip(columns, row)) for row in rows]
+        next_cursor = self.encode_cursor(rows[self.limit - 1]) if len(rows) > self.limit else None
+        cars = [{field: row[field] for field in self.fields} for row in rows[:self.limit]]
+        return {"all_cars": cars, "next_cursor": next_cursor}
+
+
+def parse_number(value, name):
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise CarQueryError(f"{name} must be an integer")
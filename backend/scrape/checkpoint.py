@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+
+STATE_FORMAT_VERSION = 1
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def atomic_write(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class CrawlState:
+    """On-disk checkpoint of a crawl, one entry per (car, year, page) unit.
+
+    state_dir holds state.json plus one JSON file of extracted rows per unit,
+    written atomically as soon as the unit finishes. Unit updates are appended
+    to units.log rather than rewriting state.json each time; the log is
+    replayed on load and folded into state.json when a run begins or
+    finishes. If the previous run did
+    not finish, begin_run() resumes it and units already done are skipped
+    without fetching. A new run revalidates every unit instead: the stored
+    ETag/Last-Modified are sent as conditional headers and a page whose
+    content hash is unchanged keeps its stored rows.
+    """
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self.units_dir = os.path.join(state_dir, "units")
+        self.path = os.path.join(state_dir, "state.json")
+        self.log_path = os.path.join(state_dir, "units.log")
+        self.log = None
+        os.makedirs(self.units_dir, exist_ok=True)
+
+        self.state = {"version": STATE_FORMAT_VERSION, "run": None, "units": {}}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == STATE_FORMAT_VERSION:
+                self.state = state
+        self._replay_log()
+
+    @staticmethod
+    def unit_key(car, year, page=1):
+        return f"{car}|{year}|{page}"
+
+    @staticmethod
+    def unit_order(key):
+        # Pages in numeric order, so page 10 follows page 9 rather than page 1
+        car, year, page = key.rsplit("|", 2)
+        return car, year, int(page)
+
+    @property
+    def run_id(self):
+        return self.state["run"]["id"]
+
+    def begin_run(self):
+        """Resume an unfinished run, or start a new one. Returns True when resuming."""
+        run = self.state["run"]
+        if run is not None and not run["finished"]:
+            print(f"Resuming crawl {run['id']}")
+            return True
+        self.state["run"] = {"id": uuid.uuid4().hex, "started": time.time(), "finished": False}
+        self.save()
+        return False
+
+    def finish_run(self):
+        self.state["run"]["finished"] = True
+        self.save()
+
+    def save(self):
+        """Write the whole state to state.json and empty the log."""
+        atomic_write(self.path, json.dumps(self.state))
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+        open(self.log_path, "w").close()
+
+    def _replay_log(self):
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A write cut short by a crash; its unit is redone
+                    break
+                if entry["unit"] is None:
+                    self.state["units"].pop(entry["key"], None)
+                else:
+                    self.state["units"][entry["key"]] = entry["unit"]
+        # Fold it in now, so new entries are never appended after a torn line
+        self.save()
+
+    def _log_unit(self, key):
+        """Append key's current unit entry (None once discarded) to the log."""
+        if self.log is None:
+            self.log = open(self.log_path, "a", encoding="utf-8")
+        self.log.write(json.dumps({"key": key, "unit": self.unit(key)}) + "\n")
+        self.log.flush()
+
+    def unit(self, key):
+        return self.state["units"].get(key)
+
+    def done_this_run(self, key):
+        unit = self.unit(key)
+        return unit is not None and unit["run"] == self.run_id
+
+    def conditional_headers(self, key):
+        unit = self.unit(key) or {}
+        headers = {}
+        if unit.get("etag"):
+            headers["If-None-Match"] = unit["etag"]
+        if unit.get("last_modified"):
+            headers["If-Modified-Since"] = unit["last_modified"]
+        return headers
+
+    def unchanged(self, key, page_hash):
+        unit = self.unit(key)
+        return unit is not None and unit["hash"] == page_hash
+
+    def touch(self, key):
+        """Mark an unchanged unit as done for this run, keeping its rows."""
+        self.state["units"][key]["run"] = self.run_id
+        self.state["units"][key]["checked"] = time.time()
+        self._log_unit(key)
+
+    def _rows_path(self, key):
+        return os.path.join(self.units_dir, content_hash(key)[:32] + ".json")
+
+    def record(self, key, page_hash, rows, headers=None):
+        """Store the rows extracted from a unit and mark it done for this run."""
+        headers = headers or {}
+        atomic_write(self._rows_path(key), json.dumps({"key": key, "rows": rows}))
+        self.state["units"][key] = {
+            "run": self.run_id,
+            "hash": page_hash,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "rows": len(rows),
+            "checked": time.time(),
+        }
+        self._log_unit(key)
+
+    def discard(self, key):
+        """Forget a unit and its rows, e.g. a page found to repeat an earlier one."""
+        if self.state["units"].pop(key, None) is not None:
+            self._log_unit(key)
+        if os.path.exists(self._rows_path(key)):
+            os.remove(self._rows_path(key))
+
+    def rows(self, key):
+        path = self._rows_path(key)
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["rows"]
+
+    def iter_unit_rows(self):
+        """Yield the list of stored rows of each unit done in this run, in unit order."""
+        for key in sorted(self.state["units"], key=self.unit_order):
+            if self.done_this_run(key):
+                yield self.rows(key)
+
+    def iter_rows(self):
+        for rows in self.iter_unit_rows():
+            yield from rows
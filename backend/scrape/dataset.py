@@ -0,0 +1,137 @@
+"""Versioned on-disk datasets passed between the pipeline stages.
+
+A dataset is JSON Lines: a header line describing the format, then one JSON
+array per record, in the column order of the record class's FIELDS. Files
+ending in .gz are gzip compressed; plain .jsonl files are read through mmap.
+Both are append-only and are read and written one record at a time, so any
+stage runs in constant memory regardless of the dataset size.
+"""
+import gzip
+import json
+import mmap
+import os
+
+from models import CarData, CarSummary, Review
+
+FORMAT_NAME = "tamuhack25-dataset"
+FORMAT_VERSION = 1
+
+# kind -> record class
+KINDS = {
+    "reviews": Review,
+    "cars": CarData,
+    "summaries": CarSummary,
+}
+
+
+class DatasetError(Exception):
+    pass
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _header(kind):
+    return {"format": FORMAT_NAME, "version": FORMAT_VERSION, "kind": kind, "fields": list(KINDS[kind].FIELDS)}
+
+
+def _check_header(path, header, kind=None):
+    if header.get("format") != FORMAT_NAME:
+        raise DatasetError(f"{path} is not a dataset file")
+    if header.get("version") != FORMAT_VERSION:
+        raise DatasetError(f"{path} has format version {header.get('version')}, expected {FORMAT_VERSION}")
+    if kind is not None and header.get("kind") != kind:
+        raise DatasetError(f"{path} holds {header.get('kind')}, expected {kind}")
+    if header.get("fields") != list(KINDS[header["kind"]].FIELDS):
+        raise DatasetError(f"{path} has fields {header.get('fields')}, expected {list(KINDS[header['kind']].FIELDS)}")
+    return header
+
+
+def read_header(path):
+    with _open(path, "r") as f:
+        return _check_header(path, json.loads(f.readline()))
+
+
+class DatasetWriter:
+    """Append records of one kind to a dataset file.
+
+    With append=True an existing file is extended (its header must match);
+    otherwise the file is replaced. A replacement is written to a temporary
+    file next to path and moved over it only when the writer exits without an
+    error, so a failed write leaves the previous file untouched. For .gz files
+    each append session adds a new gzip member, which readers see as one
+    continuous stream.
+    """
+
+    def __init__(self, path, kind, append=False):
+        if kind not in KINDS:
+            raise DatasetError(f"Unknown dataset kind {kind}")
+        self.path = path
+        self.kind = kind
+        self.append = append and os.path.exists(path)
+        # Keeps path's name as a suffix so _open still sees .gz
+        directory, name = os.path.split(path)
+        self.tmp_path = os.path.join(directory, f".tmp-{os.getpid()}-{name}")
+        self.file = None
+        self.count = 0
+
+    def __enter__(self):
+        if self.append:
+            _check_header(self.path, read_header(self.path), self.kind)
+            self.file = _open(self.path, "a")
+        else:
+            self.file = _open(self.tmp_path, "w")
+            self.file.write(json.dumps(_header(self.kind)) + "\n")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+        if self.append:
+            return
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+
+    def write(self, record):
+        self.file.write(json.dumps(record.convert_to_tuple(), ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+
+def _iter_lines(path):
+    if path.endswith(".gz"):
+        with _open(path, "r") as f:
+            yield from f
+        return
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b""):
+                yield line.decode("utf-8")
+
+
+def iter_dataset(path, kind=None):
+    """Yield the records in a dataset file as instances of its record class."""
+    lines = _iter_lines(path)
+    header_line = next(lines, None)
+    if header_line is None:
+        raise DatasetError(f"{path} is empty")
+    header = _check_header(path, json.loads(header_line), kind)
+    cls = KINDS[header["kind"]]
+    for line in lines:
+        if line.strip():
+            yield cls.from_tuple(json.loads(line))
+
+
+def write_dataset(path, kind, records):
+    with DatasetWriter(path, kind) as writer:
+        writer.write_many(records)
+    return writer.count
@@ -1,5 +1,172 @@
+import io
+import threading
+import time
 import psycopg2
 from psycopg2 import sql
+import psycopg2.pool
+
+POOL_MIN_CONNECTIONS = 1
+POOL_MAX_CONNECTIONS = 10
+POOL_CHECKOUT_TIMEOUT = 5.0  # seconds to wait for a free connection
+
+REVIEW_COLUMNS = ("car_name", "car_year", "review_title", "review_body", "review_rating")
+MERGE_REVIEW_COLUMNS = REVIEW_COLUMNS + ("content_hash",)
+CAR_COLUMNS = ("car_model", "car_year", "msrp", "horsepower", "mpg", "num_seats", "drive_type")
+AGGREGATE_KEY_COLUMNS = ("car_name", "car_year", "category")
+AGGREGATE_COUNT_COLUMNS = ("review_count", "rating_count", "rating_sum", "positive_count", "negative_count",
+                           "stars_1", "stars_2", "stars_3", "stars_4", "stars_5")
+AGGREGATE_COLUMNS = AGGREGATE_KEY_COLUMNS + AGGREGATE_COUNT_COLUMNS
+ASPECT_COLUMNS = ("review_id", "car_name", "car_year", "category")
+
+# A pruning merge deletes rows only if the incoming rows number at least this
+# fraction of the table, so a truncated dataset cannot empty it
+PRUNE_MIN_RATIO = 0.9
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Process-wide pool of psycopg2 connections for one set of db_params.
+
+    Checkout blocks (up to a timeout) instead of failing when every connection
+    is in use, and every connection is health checked before it is handed out.
+    Returned connections stay open in the idle list, up to maxconn in total.
+    Each connection is pooled with its own cursor, which is reused across
+    checkouts and closed with the connection.
+    """
+
+    def __init__(self, db_params, minconn=POOL_MIN_CONNECTIONS, maxconn=POOL_MAX_CONNECTIONS,
+                 timeout=POOL_CHECKOUT_TIMEOUT):
+        self.db_params = db_params
+        self.slots = threading.BoundedSemaphore(maxconn)
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        # (connection, cursor) pairs not checked out, most recently returned last. A
+        # connection is only opened when this is empty, so at most maxconn ever exist.
+        self.idle = [self.connect() for _ in range(minconn)]
+
+    def connect(self):
+        conn = psycopg2.connect(**self.db_params)
+        return conn, conn.cursor()
+
+    def getconn(self):
+        """Return a (connection, cursor) pair; give both back with putconn()."""
+        if not self.slots.acquire(timeout=self.timeout):
+            raise psycopg2.pool.PoolError("timed out waiting for a pooled connection")
+        try:
+            while True:
+                with self.lock:
+                    pair = self.idle.pop() if self.idle else None
+                if pair is None:
+                    return self.connect()
+                if self.is_healthy(*pair):
+                    return pair
+                self.discard(*pair)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def putconn(self, conn, cursor):
+        try:
+            if conn.closed or cursor.closed:
+                self.discard(conn, cursor)
+                return
+            try:
+                # Roll back any transaction left open by the caller
+                conn.rollback()
+            except psycopg2.Error:
+                self.discard(conn, cursor)
+                return
+            with self.lock:
+                self.idle.append((conn, cursor))
+        finally:
+            self.slots.release()
+
+    def discard(self, conn, cursor):
+        try:
+            cursor.close()
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def is_healthy(self, conn, cursor):
+        if conn.closed or cursor.closed:
+            return False
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def closeall(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn, cursor in idle:
+            self.discard(conn, cursor)
+
+
+def get_pool(db_params):
+    """Return the shared pool for db_params, creating it on first use."""
+    key = tuple(sorted(db_params.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_params)
+            _pools[key] = pool
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
+
+
+def copy_escape(value):
+    # COPY text format: \N is NULL; backslash, tab and newlines are escaped
+    if value is None:
+        return "\\N"
+    # COPY has no assignment cast, so an INT column rejects "194.0"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+class CopyBuffer(io.TextIOBase):
+    """File-like object that renders rows to COPY text format as it is read.
+
+    copy_expert() pulls from it in small reads, so rows are streamed to the
+    server without building the whole payload in memory.
+    """
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = ""
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.buffer += "\t".join(copy_escape(v) for v in row) + "\n"
+            self.count += 1
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+    def readline(self, size=-1):
+        return self.read(size)
+
 
 class Database:
     def __init__(self, db_params):
@@ -8,17 +175,24 @@ class Database:
         self.cursor = None
 
     def connect(self):
+        # Already holding a pooled connection; methods call connect() freely
+        if self.conn is not None:
+            return
         try:
-            self.conn = psycopg2.connect(**self.db_params)
-            self.cursor = self.conn.cursor()
+            self.conn, self.cursor = get_pool(self.db_params).getconn()
         except Exception as e:
             print("Error connecting to the database:", e)
 
     def close(self):
-        if self.cursor:
-            self.cursor.close()
-        if self.conn:
-            self.conn.close()
+        if self.conn is not None:
+            get_pool(self.db_params).putconn(self.conn, self.cursor)
+        self.conn = None
+        self.cursor = None
+
+    def rollback(self):
+        # Leave a pooled connection usable after a failed statement
+        if self.conn is not None and not self.conn.closed:
+            self.conn.rollback()
 
     def test_connection(self):
         # Print a row of the car_reviews table
@@ -39,9 +213,20 @@ class Database:
             suggestions = [(row[0], row[1]) for row in self.cursor.fetchall()]
             return suggestions
         except Exception as e:
+            self.rollback()
             print("Error getting suggestions:", e)
             return []
 
+    def get_model_years(self):
+        try:
+            self.connect()
+            self.cursor.execute("SELECT DISTINCT car_model, car_year FROM cars")
+            return [(row[0], row[1]) for row in self.cursor.fetchall()]
+        except Exception as e:
+            self.rollback()
+            print("Error getting model years:", e)
+            return None
+
     def get_summary(self, car, year):
         try:
             self.connect()
@@ -54,6 +239,7 @@ class Database:
             summary = self.cursor.fetchone()[0]
             return summary
         except Exception as e:
+            self.rollback()
             print("Error getting summary:", e)
             return None
         finally:
@@ -66,6 +252,7 @@ class Database:
             car_data = self.cursor.fetchone()
             return car_data
         except Exception as e:
+            self.rollback()
             print("Error getting car data:", e)
             return None
 
@@ -76,9 +263,125 @@ class Database:
             car_data = self.cursor.fetchall()
             return car_data
         except Exception as e:
+            self.rollback()
             print("Error getting all car data:", e)
             return None
 
+    def query_cars(self, query):
+        """Rows of query.columns() for one page of a CarQuery (limit + 1 rows, see CarQuery.page)."""
+        try:
+            self.connect()
+            conditions, params = [], []
+            for field, (low, high) in query.ranges.items():
+                if low is not None:
+                    conditions.append(sql.SQL("{} >= %s").format(sql.Identifier(field)))
+                    params.append(low)
+                if high is not None:
+                    conditions.append(sql.SQL("{} <= %s").format(sql.Identifier(field)))
+                    params.append(high)
+            if query.drive_types:
+                conditions.append(sql.SQL("drive_type = ANY(%s)"))
+                params.append(query.drive_types)
+
+            sort = sql.Identifier(query.sort)
+            if query.sort != "car_id":
+                conditions.append(sql.SQL("{} IS NOT NULL").format(sort))
+            if query.after is not None:
+                # Row comparison, so the (sort, car_id) index can start right after the cursor
+                conditions.append(sql.SQL("({}, car_id) {} (%s, %s)").format(
+                    sort, sql.SQL("<" if query.descending else ">")))
+                params.extend(query.after)
+
+            direction = sql.SQL("DESC" if query.descending else "ASC")
+            select = sql.SQL("SELECT {columns} FROM cars {where} ORDER BY {sort} {direction}, car_id {direction} LIMIT %s").format(
+                columns=sql.SQL(", ").join(map(sql.Identifier, query.columns())),
+                where=sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL(""),
+                sort=sort,
+                direction=direction,
+            )
+            self.cursor.execute(select, params + [query.limit + 1])
+            return self.cursor.fetchall()
+        except Exception as e:
+            self.rollback()
+            print("Error querying cars:", e)
+            return None
+
+    def get_reviews(self, car_name=None, car_year=None):
+        """Reviews as (review_id, car_name, car_year, review_title, review_body, review_rating) rows."""
+        try:
+            self.connect()
+            self.cursor.execute("""
+                SELECT review_id, car_name, car_year, review_title, review_body, review_rating
+                FROM car_reviews
+                WHERE (%(car_name)s IS NULL OR car_name = %(car_name)s)
+                  AND (%(car_year)s IS NULL OR car_year = %(car_year)s)
+                ORDER BY review_id
+            """, {"car_name": car_name, "car_year": car_year})
+            return self.cursor.fetchall()
+        except Exception as e:
+            self.rollback()
+            print("Error getting reviews:", e)
+            return []
+
+    def get_review_aggregates(self, car, year):
+        """Rows of AGGREGATE_COLUMNS for one model-year, one per category."""
+        try:
+            self.connect()
+            self.cursor.execute(sql.SQL("""
+                SELECT {columns} FROM car_review_aggregates
+                WHERE car_name = %s AND car_year = %s
+                ORDER BY category
+            """).format(columns=sql.SQL(", ").join(map(sql.Identifier, AGGREGATE_COLUMNS))), (car, year))
+            return self.cursor.fetchall()
+        except Exception as e:
+            self.rollback()
+            print("Error getting review aggregates:", e)
+            return None
+
+    def get_reviews_for_category(self, car_name, car_year=None, category="overall"):
+        """Review texts of one car (and model year) tagged with category, from review_aspects.
+
+        Each text is the title and body on separate lines, the text sentiment.py trains on.
+        "overall" is every review of the car.
+        """
+        text = "coalesce(r.review_title, '') || chr(10) || coalesce(r.review_body, '')"
+        try:
+            self.connect()
+            if category == "overall":
+                self.cursor.execute(f"""
+                    SELECT {text}
+                    FROM car_reviews r
+                    WHERE r.car_name = %(car_name)s
+                      AND (%(car_year)s IS NULL OR r.car_year = %(car_year)s)
+                    ORDER BY r.review_id
+                """, {"car_name": car_name, "car_year": car_year})
+            else:
+                self.cursor.execute(f"""
+                    SELECT {text}
+                    FROM review_aspects a JOIN car_reviews r ON r.review_id = a.review_id
+                    WHERE a.car_name = %(car_name)s
+                      AND (%(car_year)s IS NULL OR a.car_year = %(car_year)s)
+                      AND a.category = %(category)s
+                    ORDER BY a.review_id
+                """, {"car_name": car_name, "car_year": car_year, "category": category})
+            return [row[0] for row in self.cursor.fetchall()]
+        except Exception as e:
+            self.rollback()
+            print("Error getting reviews for category:", e)
+            return []
+
+    def get_catalogue_version(self, name="cars"):
+        # Bumped by a trigger on every write to the cars (or car_review_aggregates) table
+        try:
+            self.connect()
+            self.cursor.execute("SELECT version FROM catalogue_version WHERE name = %s", (name,))
+            row = self.cursor.fetchone()
+            return row[0] if row else 0
+        except Exception as e:
+            self.rollback()
+            print("Error getting catalogue version:", e)
+            return None
+
     def get_models_and_years(self):
         try:
             self.connect()
@@ -88,6 +391,7 @@ class Database:
             years = [row[0] for row in self.cursor.fetchall()]
             return models, years
         except Exception as e:
+            self.rollback()
             print("Error getting models and years:", e)
             return [], []
 
@@ -97,6 +401,7 @@ class Database:
             self.cursor.execute(f"DELETE FROM {table_name}")
             self.conn.commit()
         except Exception as e:
+            self.rollback()
             print("Error clearing table:", e)
         finally:
             self.close()
@@ -111,6 +416,7 @@ class Database:
             self.cursor.execute(insert_query, (car_name, car_year, review_title, review_body, review_rating))
             self.conn.commit()
         except Exception as e:
+            self.rollback()
             print("Error adding review:", e)
         finally:
             self.close()
@@ -142,6 +448,7 @@ class Database:
             self.cursor.execute(insert_query, (car_id, summary))
             self.conn.commit()
         except Exception as e:
+            self.rollback()
             print("Error adding summary:", e)
         finally:
             self.close()
@@ -156,6 +463,7 @@ class Database:
             self.cursor.executemany(insert_query, reviews)
             self.conn.commit()
         except Exception as e:
+            self.rollback()
             print("Error adding reviews in bulk:", e)
         finally:
             self.close()
@@ -170,10 +478,266 @@ class Database:
             self.cursor.executemany(insert_query, data)
             self.conn.commit()
         except Exception as e:
+            self.rollback()
             print("Error adding data in bulk:", e)
         finally:
             self.close()
 
+    def copy_into_staging(self, table, columns, rows):
+        """COPY rows into a temp staging table shaped like table's columns.
+
+        The staging table is dropped when the transaction commits. Returns the
+        staging table name and the number of rows copied.
+        """
+        staging = f"{table}_staging"
+        self.cursor.execute(sql.SQL("""
+            CREATE TEMP TABLE {staging} ON COMMIT DROP AS
+            SELECT {columns} FROM {table} WITH NO DATA
+        """).format(
+            staging=sql.Identifier(staging),
+            columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+            table=sql.Identifier(table),
+        ))
+        buffer = CopyBuffer(rows)
+        copy = sql.SQL("COPY {staging} ({columns}) FROM STDIN").format(
+            staging=sql.Identifier(staging),
+            columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+        )
+        self.cursor.copy_expert(copy.as_string(self.conn), buffer, size=64 * 1024)
+        return staging, buffer.count
+
+    def replace_table_bulk(self, table, columns, rows):
+        """Replace the contents of table with rows in a single transaction.
+
+        Rows are streamed into a staging table with COPY FROM STDIN, then the
+        live table is emptied and refilled from staging before committing, so
+        readers see either the old rows or the new ones. Returns
+        (row count, rows per second), or (0, 0) on error.
+        """
+        start = time.perf_counter()
+        try:
+            self.connect()
+            staging, count = self.copy_into_staging(table, columns, rows)
+            column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+            self.cursor.execute(sql.SQL("DELETE FROM {table}").format(table=sql.Identifier(table)))
+            self.cursor.execute(sql.SQL("INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging}").format(
+                table=sql.Identifier(table), columns=column_list, staging=sql.Identifier(staging)))
+            self.conn.commit()
+            elapsed = time.perf_counter() - start
+            return count, count / elapsed if elapsed > 0 else 0
+        except Exception as e:
+            self.rollback()
+            print(f"Error bulk loading {table}:", e)
+            return 0, 0
+        finally:
+            self.close()
+
+    def can_prune(self, table, incoming, min_ratio=PRUNE_MIN_RATIO):
+        """Whether incoming rows are enough to delete the rows of table they are missing."""
+        self.cursor.execute(sql.SQL("SELECT count(*) FROM {table}").format(table=sql.Identifier(table)))
+        existing = self.cursor.fetchone()[0]
+        if incoming < min_ratio * existing:
+            print(f"Not pruning {table}: {incoming} incoming rows is under {min_ratio:.0%} of its {existing} rows")
+            return False
+        return True
+
+    def merge_reviews_bulk(self, rows, table="car_reviews", prune=False, min_ratio=PRUNE_MIN_RATIO):
+        """Merge rows of MERGE_REVIEW_COLUMNS into table in one transaction.
+
+        Reviews are identified by content_hash: new hashes are inserted and
+        unchanged reviews are not touched. With prune, hashes no longer present
+        are deleted too, unless the rows cover less than min_ratio of the table.
+        Returns (inserted, deleted, total), or None on error.
+        """
+        try:
+            self.connect()
+            staging, total = self.copy_into_staging(table, MERGE_REVIEW_COLUMNS, rows)
+            self.cursor.execute(sql.SQL("CREATE INDEX ON {staging} (content_hash)").format(staging=sql.Identifier(staging)))
+            self.cursor.execute(sql.SQL("ANALYZE {staging}").format(staging=sql.Identifier(staging)))
+
+            deleted = 0
+            if prune:
+                self.cursor.execute(sql.SQL("SELECT count(DISTINCT content_hash) FROM {staging}").format(
+                    staging=sql.Identifier(staging)))
+                if self.can_prune(table, self.cursor.fetchone()[0], min_ratio):
+                    self.cursor.execute(sql.SQL("""
+                        DELETE FROM {table} t
+                        WHERE t.content_hash IS NULL
+                           OR NOT EXISTS (SELECT 1 FROM {staging} s WHERE s.content_hash = t.content_hash)
+                    """).format(table=sql.Identifier(table), staging=sql.Identifier(staging)))
+                    deleted = self.cursor.rowcount
+                    print(f"Pruned {deleted} reviews missing from the dataset from {table}")
+
+            columns = sql.SQL(", ").join(map(sql.Identifier, MERGE_REVIEW_COLUMNS))
+            self.cursor.execute(sql.SQL("""
+                INSERT INTO {table} ({columns})
+                SELECT DISTINCT ON (content_hash) {columns} FROM {staging}
+                ON CONFLICT (content_hash) DO NOTHING
+            """).format(table=sql.Identifier(table), columns=columns, staging=sql.Identifier(staging)))
+            inserted = self.cursor.rowcount
+
+            self.conn.commit()
+            return inserted, deleted, total
+        except Exception as e:
+            self.rollback()
+            print("Error merging reviews:", e)
+            return None
+        finally:
+            self.close()
+
+    def merge_cars_bulk(self, rows, table="cars", prune=False, min_ratio=PRUNE_MIN_RATIO):
+        """Upsert rows of CAR_COLUMNS into table on car_name in one transaction.
+
+        Only cars whose specs changed are updated. With prune, cars missing
+        from rows are deleted unless a summary still references them or the
+        rows cover less than min_ratio of the table. Returns
+        (upserted, deleted, total), or None on error.
+        """
+        try:
+            self.connect()
+            staging, total = self.copy_into_staging(table, CAR_COLUMNS, rows)
+            columns = sql.SQL(", ").join(map(sql.Identifier, CAR_COLUMNS))
+            specs = [c for c in CAR_COLUMNS if c not in ("car_model", "car_year")]
+
+            self.cursor.execute(sql.SQL("""
+                INSERT INTO {table} ({columns})
+                SELECT {columns} FROM {staging}
+                ON CONFLICT (car_name) DO UPDATE SET {updates}
+                WHERE ({current}) IS DISTINCT FROM ({incoming})
+            """).format(
+                table=sql.Identifier(table),
+                columns=columns,
+                staging=sql.Identifier(staging),
+                updates=sql.SQL(", ").join(
+                    sql.SQL("{c} = EXCLUDED.{c}").format(c=sql.Identifier(c)) for c in specs),
+                current=sql.SQL(", ").join(sql.SQL("{t}.{c}").format(t=sql.Identifier(table), c=sql.Identifier(c)) for c in specs),
+                incoming=sql.SQL(", ").join(sql.SQL("EXCLUDED.{c}").format(c=sql.Identifier(c)) for c in specs),
+            ))
+            upserted = self.cursor.rowcount
+
+            deleted = 0
+            if prune and self.can_prune(table, total, min_ratio):
+                self.cursor.execute(sql.SQL("""
+                    DELETE FROM {table} t
+                    WHERE NOT EXISTS (SELECT 1 FROM {staging} s
+                                      WHERE s.car_model = t.car_model AND s.car_year = t.car_year)
+                      AND NOT EXISTS (SELECT 1 FROM car_sentiment cs WHERE cs.car_id = t.car_id)
+                """).format(table=sql.Identifier(table), staging=sql.Identifier(staging)))
+                deleted = self.cursor.rowcount
+                print(f"Pruned {deleted} cars missing from the dataset from {table}")
+
+            self.conn.commit()
+            return upserted, deleted, total
+        except Exception as e:
+            self.rollback()
+            print("Error merging cars:", e)
+            return None
+        finally:
+            self.close()
+
+    def tag_reviews(self, tag, retag=False):
+        """Store aspect tags for reviews not tagged yet (every review if retag) in one transaction.
+
+        tag(rows) turns (review_id, car_name, car_year, review_title,
+        review_body) rows into (review_id, car_name, car_year, category)
+        rows for review_aspects. Returns (reviews tagged, tags stored), or
+        None on error.
+        """
+        try:
+            self.connect()
+            self.cursor.execute("""
+                SELECT review_id, car_name, car_year, review_title, review_body
+                FROM car_reviews WHERE %s OR NOT aspects_tagged
+                ORDER BY review_id
+            """, (retag,))
+            reviews = self.cursor.fetchall()
+            if not reviews:
+                return 0, 0
+            review_ids = [row[0] for row in reviews]
+            self.cursor.execute("DELETE FROM review_aspects WHERE review_id = ANY(%s)", (review_ids,))
+            staging, count = self.copy_into_staging("review_aspects", ASPECT_COLUMNS, tag(reviews))
+            columns = sql.SQL(", ").join(map(sql.Identifier, ASPECT_COLUMNS))
+            self.cursor.execute(sql.SQL("INSERT INTO review_aspects ({columns}) SELECT {columns} FROM {staging}").format(
+                columns=columns, staging=sql.Identifier(staging)))
+            self.cursor.execute("UPDATE car_reviews SET aspects_tagged = TRUE WHERE review_id = ANY(%s)", (review_ids,))
+            self.conn.commit()
+            return len(reviews), count
+        except Exception as e:
+            self.rollback()
+            print("Error tagging reviews:", e)
+            return None
+        finally:
+            self.close()
+
+    def refresh_review_aggregates(self, aggregate, full=False):
+        """Bring car_review_aggregates up to date with car_reviews in one transaction.
+
+        Only reviews added since the last refresh (review_id above the stored
+        watermark) are read, with their review_aspects categories, up to the
+        first review not tagged yet; aggregate(rows) turns them into rows of
+        AGGREGATE_COLUMNS, which are added to the existing counts. Reviews with
+        no car_year are read, so the watermark and count cover them, but
+        aggregate must skip them: car_year is part of the aggregates' key. If reviews
+        at or below the watermark were deleted or committed late, the counts
+        no longer match and the table is rebuilt from every review, as it is
+        when full is set. Returns (reviews read, rebuilt), or None on error.
+        """
+        try:
+            self.connect()
+            # Locks the watermark, so concurrent refreshes take turns
+            self.cursor.execute("""
+                SELECT last_review_id, review_count FROM review_aggregate_state
+                WHERE name = 'car_reviews' FOR UPDATE
+            """)
+            watermark, counted = self.cursor.fetchone()
+            if not full:
+                self.cursor.execute("SELECT count(*) FROM car_reviews WHERE review_id <= %s", (watermark,))
+                full = self.cursor.fetchone()[0] != counted
+            if full:
+                watermark, counted = 0, 0
+                self.cursor.execute("DELETE FROM car_review_aggregates")
+
+            # Stops short of the first untagged review, so the watermark never passes it
+            self.cursor.execute("""
+                SELECT r.review_id, r.car_name, r.car_year, r.review_rating,
+                       ARRAY(SELECT a.category FROM review_aspects a WHERE a.review_id = r.review_id)
+                FROM car_reviews r
+                WHERE r.review_id > %(watermark)s
+                  AND r.review_id < COALESCE((SELECT min(review_id) FROM car_reviews
+                                              WHERE NOT aspects_tagged AND review_id > %(watermark)s),
+                                             2147483647)
+                ORDER BY r.review_id
+            """, {"watermark": watermark})
+            reviews = self.cursor.fetchall()
+            if reviews:
+                staging, _ = self.copy_into_staging("car_review_aggregates", AGGREGATE_COLUMNS, aggregate(reviews))
+                self.cursor.execute(sql.SQL("""
+                    INSERT INTO car_review_aggregates ({columns})
+                    SELECT {columns} FROM {staging}
+                    ON CONFLICT ({keys}) DO UPDATE SET {updates}
+                """).format(
+                    columns=sql.SQL(", ").join(map(sql.Identifier, AGGREGATE_COLUMNS)),
+                    staging=sql.Identifier(staging),
+                    keys=sql.SQL(", ").join(map(sql.Identifier, AGGREGATE_KEY_COLUMNS)),
+                    updates=sql.SQL(", ").join(
+                        sql.SQL("{c} = car_review_aggregates.{c} + EXCLUDED.{c}").format(c=sql.Identifier(c))
+                        for c in AGGREGATE_COUNT_COLUMNS),
+                ))
+                watermark, counted = reviews[-1][0], counted + len(reviews)
+
+            self.cursor.execute("""
+                UPDATE review_aggregate_state SET last_review_id = %s, review_count = %s
+                WHERE name = 'car_reviews'
+            """, (watermark, counted))
+            self.conn.commit()
+            return len(reviews), full
+        except Exception as e:
+            self.rollback()
+            print("Error refreshing review aggregates:", e)
+            return None
+        finally:
+            self.close()
+
 # db_params = {
 #     "dbname": "test_db",
 #     "user": "postgres",
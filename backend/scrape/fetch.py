@@ -0,0 +1,111 @@
+import asyncio
+import random
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+# Add headers to mimic a browser
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, amount=1):
+        # Larger requests than the bucket holds would wait forever
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+def retry_after(headers):
+    try:
+        return float(headers.get("Retry-After", 0))
+    except ValueError:
+        return 0
+
+
+class FetchResult:
+    def __init__(self, url, status, text, headers):
+        self.url = url
+        self.status = status
+        self.text = text
+        self.headers = headers
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+
+class Fetcher:
+    """Concurrent HTTP fetcher with a per-host rate limit and retry with backoff.
+
+    Use as `async with Fetcher(...) as fetcher: await fetcher.get(url)`.
+    """
+
+    def __init__(self, concurrency=4, rate_per_host=0.5, burst=2, retries=3, backoff=1.0,
+                 timeout=30, headers=None):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        self.buckets = {}
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(headers=self.headers, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def bucket_for(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate_per_host, self.burst)
+        return self.buckets[host]
+
+    async def get(self, url, headers=None):
+        """Fetch url, retrying network errors and retryable statuses.
+
+        Returns the last FetchResult (which may be an error status), or raises
+        the last network error once the retries are used up.
+        """
+        bucket = self.bucket_for(url)
+        for attempt in range(self.retries + 1):
+            await bucket.acquire()
+            try:
+                async with self.semaphore:
+                    async with self.session.get(url, headers=headers) as response:
+                        result = FetchResult(url, response.status, await response.text(), response.headers.copy())
+                if result.status not in RETRY_STATUSES or attempt == self.retries:
+                    return result
+                delay = retry_after(result.headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+                delay = 0
+            # Exponential backoff with jitter
+            await asyncio.sleep(max(delay, self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)))
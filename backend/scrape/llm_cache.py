@@ -0,0 +1,114 @@
+"""Persistent content-addressed cache for LLM completions.
+
+Keys are a hash of everything that determines a completion: the model, the
+prompt template, the sampling parameters and the inputs. Values are stored as
+JSON in a SQLite file and evicted least-recently-used once the cache holds
+more than max_entries.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+def cache_key(model, template, temperature, inputs):
+    """Hash of (model, prompt template, temperature, inputs).
+
+    inputs is any JSON-serializable value, e.g. the list of reviews.
+    """
+    payload = json.dumps([model, template, temperature, inputs], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path=DEFAULT_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key         TEXT PRIMARY KEY,
+                value       TEXT NOT NULL,
+                created_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed_at)")
+        self.conn.commit()
+
+    def get(self, key):
+        """Return (value, hit) for key; value is None on a miss.
+
+        The hit flag is per call, unlike the shared hits counter, which other
+        threads update concurrently.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None, False
+            self.hits += 1
+            self.conn.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            return json.loads(row[0]), True
+
+    def set(self, key, value):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self.conn.execute("""
+                DELETE FROM completions WHERE key IN (
+                    SELECT key FROM completions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self.conn.commit()
+
+    def get_or_compute(self, key, compute):
+        """Return (value, hit), computing and storing value on a miss."""
+        value, hit = self.get(key)
+        if not hit:
+            value = compute()
+            self.set(key, value)
+        return value, hit
+
+    async def aget_or_compute(self, key, compute):
+        value, hit = self.get(key)
+        if not hit:
+            value = await compute()
+            self.set(key, value)
+        return value, hit
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LLMCache()
+    return _default_cache
@@ -1,74 +1,64 @@
 import os
-import pickle
-from db import Database
-
-class Review:
-    def __init__(self, title, car_name, car_year, review_text, rating):
-        self.title = title  # Review title
-        self.car_name = car_name  # Name of the car (e.g., "Toyota Prius")
-        self.car_year = car_year  # Year of the car (e.g., 2023)
-        self.review_text = review_text  # Review text
-        self.rating = rating  # Rating (out of 5)
-
-    def convert_to_tuple(self):
-        return (self.car_name, self.car_year, self.title, self.review_text, self.rating)
-
-    def __str__(self):
-        return f"{self.title} - {self.car_name} {self.car_year} - {self.rating}/5 stars\n{self.review_text}"
-
-class CarData:
-    def __init__(self, car_model, car_year, msrp, horsepower, mpg, num_seats, drive_type):
-        self.car_model = car_model
-        self.car_year = car_year
-        self.msrp = msrp
-        self.horsepower = horsepower
-        self.mpg = mpg
-        self.num_seats = num_seats
-        self.drive_type = drive_type
-
-    def convert_to_tuple(self):
-        return (self.car_model, self.car_year, self.msrp, self.horsepower, self.mpg, self.num_seats, self.drive_type)
-
-    def __str__(self):
-        return f"{self.car_model} {self.car_year} - MSRP: {self.msrp}, Horsepower: {self.horsepower}, MPG: {self.mpg}, Seats: {self.num_seats}, Drive Type: {self.drive_type}"
-
-
-
-
-def load_reviews_data(db_params, filepath, table_name):
-    with open(filepath, "rb") as f:
-        reviews = pickle.load(f)
-    print("Loaded", len(reviews), "reviews")
-
+import sys
+import time
+from db import CAR_COLUMNS, MERGE_REVIEW_COLUMNS, Database
+from dataset import iter_dataset
+from aspects import tag_reviews
+from aggregates import refresh_aggregates
+
+
+def unique_reviews(rows):
+    # content_hash is unique in car_reviews; the merge drops repeats with DISTINCT ON
+    seen = set()
+    for row in rows:
+        if row[-1] not in seen:
+            seen.add(row[-1])
+            yield row
+
+
+def load_reviews_data(db_params, filepath, table_name, mode="merge", prune=False):
+    """Load the reviews dataset into table_name.
+
+    mode="merge" only inserts new reviews, matched by content hash, and with
+    prune also deletes reviews missing from the dataset; mode="replace" swaps
+    in the whole dataset. Both run in one transaction, so the API never sees a
+    partial table.
+    """
     db = Database(db_params)
-    db.connect()
-
-    db.clear_table(table_name)
-
-    db.add_reviews_bulk(list(r.convert_to_tuple() for r in reviews))
-    print("Added reviews to the database")
+    # Both modes store content_hash, so a merge after a replace matches the replaced reviews
+    rows = (review.convert_to_tuple() + (review.content_hash(),) for review in iter_dataset(filepath, "reviews"))
+
+    if mode == "merge":
+        start = time.perf_counter()
+        result = db.merge_reviews_bulk(rows, table_name, prune=prune)
+        if result:
+            inserted, deleted, total = result
+            print(f"Merged {total} reviews: {inserted} new, {deleted} removed ({time.perf_counter() - start:.2f}s)")
+    else:
+        # Stream the reviews from disk straight into COPY
+        count, rate = db.replace_table_bulk(table_name, MERGE_REVIEW_COLUMNS, unique_reviews(rows))
+        print(f"Added {count} reviews to the database ({rate:.0f} rows/sec)")
 
     db.close()
 
-def load_car_data(db_params, filepath, table_name):
-    with open(filepath, "rb") as f:
-        data = pickle.load(f)
-    print("Loaded", len(data), "car's data")
-
+def load_car_data(db_params, filepath, table_name, mode="merge", prune=False):
     db = Database(db_params)
-    db.connect()
-
-    db.clear_table(table_name)
+    rows = (car.convert_to_tuple() for car in iter_dataset(filepath, "cars"))
 
-    db.add_data_bulk(list(r.convert_to_tuple() for r in data))
-    print("Added car specs to the database")
+    if mode == "merge":
+        result = db.merge_cars_bulk(rows, table_name, prune=prune)
+        if result:
+            upserted, deleted, total = result
+            print(f"Merged {total} car specs: {upserted} new or changed, {deleted} removed")
+    else:
+        count, rate = db.replace_table_bulk(table_name, CAR_COLUMNS, rows)
+        print(f"Added {count} car specs to the database ({rate:.0f} rows/sec)")
 
     db.close()
 
 def load_car_summaries(db_params, filepath, table_name):
-    with open(filepath, "rb") as f:
-        data = pickle.load(f)
-    print("Loaded", len(data), "car summaries")
+    count = sum(1 for _ in iter_dataset(filepath, "summaries"))
+    print("Loaded", count, "car summaries")
 
 def main():
 
@@ -80,11 +70,16 @@ def main():
         "port": 5433
     }
 
-    # Construct the relative path to the db.pickle file
+    # Construct the relative paths to the scraped datasets
     script_dir = os.path.dirname(__file__)
-    filepath = os.path.join(script_dir, 'db.pickle')
-    filepath2 = os.path.join(script_dir, 'datadb.pickle')
-    load_reviews_data(db_params, filepath, "car_reviews")
-    load_car_data(db_params, filepath2, "cars")
+    filepath = os.path.join(script_dir, 'reviews.jsonl.gz')
+    filepath2 = os.path.join(script_dir, 'cars.jsonl.gz')
+    # --prune also deletes rows missing from the datasets
+    prune = "--prune" in sys.argv
+    load_reviews_data(db_params, filepath, "car_reviews", prune=prune)
+    # Both only read the reviews the merge added; pruned reviews need a full refresh
+    tag_reviews(db_params)
+    refresh_aggregates(db_params, full=prune)
+    load_car_data(db_params, filepath2, "cars", prune=prune)
 
 main()
\ No newline at end of file
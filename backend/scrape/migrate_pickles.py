@@ -0,0 +1,70 @@
+"""One-time conversion of the old pickle hand-off files to datasets.
+
+The pickles hold Review/CarData objects pickled from whichever module was
+__main__ at the time, so they are loaded with an unpickler that maps those
+class names onto models.py regardless of the module they were saved from.
+
+Usage: python migrate_pickles.py [db.pickle datadb.pickle car_summaries.pickle]
+"""
+import os
+import pickle
+import sys
+
+from dataset import write_dataset
+from models import CarData, CarSummary, Review
+
+# old pickle -> (dataset file, kind)
+DEFAULT_TARGETS = {
+    "db.pickle": ("reviews.jsonl.gz", "reviews"),
+    "datadb.pickle": ("cars.jsonl.gz", "cars"),
+    "car_summaries.pickle": ("car_summaries.jsonl.gz", "summaries"),
+}
+
+
+class ModelUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if name == "Review":
+            return Review
+        if name == "CarData":
+            return CarData
+        return super().find_class(module, name)
+
+
+def iter_pickle_stream(path):
+    """Yield every item from a pickle file holding one or more pickled lists."""
+    with open(path, "rb") as f:
+        unpickler = ModelUnpickler(f)
+        while True:
+            try:
+                batch = unpickler.load()
+            except EOFError:
+                return
+            if isinstance(batch, list):
+                yield from batch
+            else:
+                yield batch
+
+
+def as_record(item, kind):
+    # car_summaries.pickle holds (model, year, summary) tuples
+    if kind == "summaries" and isinstance(item, tuple):
+        return CarSummary(*item)
+    return item
+
+
+def migrate(pickle_path, dataset_path, kind):
+    count = write_dataset(dataset_path, kind, (as_record(item, kind) for item in iter_pickle_stream(pickle_path)))
+    print(f"Converted {count} {kind} from {pickle_path} to {dataset_path}")
+
+
+def main(paths):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in paths or list(DEFAULT_TARGETS):
+        target, kind = DEFAULT_TARGETS[os.path.basename(path)]
+        if not os.path.isabs(path):
+            path = os.path.join(script_dir, path)
+        migrate(path, os.path.join(os.path.dirname(path), target), kind)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
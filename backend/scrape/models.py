@@ -0,0 +1,72 @@
+import hashlib
+import json
+
+
+class Review:
+    def __init__(self, title, car_name, car_year, review_text, rating):
+        self.title = title  # Review title
+        self.car_name = car_name  # Name of the car (e.g., "Toyota Prius")
+        self.car_year = car_year  # Year of the car (e.g., 2023)
+        self.review_text = review_text  # Review text
+        self.rating = rating  # Rating (out of 5)
+
+    # Column order of convert_to_tuple(), also used for dataset rows
+    FIELDS = ("car_name", "car_year", "title", "review_text", "rating")
+
+    def convert_to_tuple(self):
+        return (self.car_name, self.car_year, self.title, self.review_text, self.rating)
+
+    @classmethod
+    def from_tuple(cls, row):
+        car_name, car_year, title, review_text, rating = row
+        return cls(title, car_name, car_year, review_text, rating)
+
+    def content_hash(self):
+        # Identifies a review across scrapes; used to dedupe on load
+        key = json.dumps([str(v) for v in self.convert_to_tuple()], ensure_ascii=False)
+        return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+    def __str__(self):
+        return f"{self.title} - {self.car_name} {self.car_year} - {self.rating}/5 stars\n{self.review_text}"
+
+
+class CarData:
+    def __init__(self, car_model, car_year, msrp, horsepower, mpg, num_seats, drive_type):
+        self.car_model = car_model
+        self.car_year = car_year
+        self.msrp = msrp
+        self.horsepower = horsepower
+        self.mpg = mpg
+        self.num_seats = num_seats
+        self.drive_type = drive_type
+
+    FIELDS = ("car_model", "car_year", "msrp", "horsepower", "mpg", "num_seats", "drive_type")
+
+    def convert_to_tuple(self):
+        return (self.car_model, self.car_year, self.msrp, self.horsepower, self.mpg, self.num_seats, self.drive_type)
+
+    @classmethod
+    def from_tuple(cls, row):
+        return cls(*row)
+
+    def __str__(self):
+        return f"{self.car_model} {self.car_year} - MSRP: {self.msrp}, Horsepower: {self.horsepower}, MPG: {self.mpg}, Seats: {self.num_seats}, Drive Type: {self.drive_type}"
+
+
+class CarSummary:
+    def __init__(self, car_model, car_year, summary):
+        self.car_model = car_model
+        self.car_year = car_year
+        self.summary = summary
+
+    FIELDS = ("car_model", "car_year", "summary")
+
+    def convert_to_tuple(self):
+        return (self.car_model, self.car_year, self.summary)
+
+    @classmethod
+    def from_tuple(cls, row):
+        return cls(*row)
+
+    def __str__(self):
+        return f"{self.car_model} {self.car_year}: {self.summary}"
@@ -1,19 +1,16 @@
-import pickle
 import json
 import os
+from dataset import iter_dataset
 
-def convert_pickle_to_json():
-    # Load the pickle file
+def convert_summaries_to_json():
     script_dir = os.path.dirname(__file__)
-    filepath = os.path.join(script_dir, 'car_summaries.pickle')
-    with open(filepath, 'rb') as f:
-        data = pickle.load(f)
-    
+    filepath = os.path.join(script_dir, 'car_summaries.jsonl.gz')
+
     # Convert to a more readable format
     formatted_data = {}
-    for item in data:
-        formatted_data[item[0] + " " + item[1]] = {
-            "sentiment": item[2]
+    for item in iter_dataset(filepath, "summaries"):
+        formatted_data[f"{item.car_model} {item.car_year}"] = {
+            "sentiment": item.summary
         }
     
     # Write to JSON file
@@ -21,4 +18,4 @@ def convert_pickle_to_json():
         json.dump(formatted_data, f, indent=2, ensure_ascii=False)
 
 if __name__ == "__main__":
-    convert_pickle_to_json()
\ No newline at end of file
+    convert_summaries_to_json()
\ No newline at end of file
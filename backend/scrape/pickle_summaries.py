@@ -1,8 +1,9 @@
 from db import Database
-import pickle
+from dataset import write_dataset
+from models import CarSummary
 
 
-def pickle_car_summaries(filepath):
+def dump_car_summaries(filepath):
     db_params = {
         "dbname": "test_db",
         "user": "postgres", 
@@ -20,13 +21,11 @@ def pickle_car_summaries(filepath):
         for year in years:
             summary = db.get_summary(model, year)
             if summary:
-                summaries.append((model, year, summary))
+                summaries.append(CarSummary(model, year, summary))
 
-    with open(filepath, 'wb') as f:
-        pickle.dump(summaries, f)
-        
-    print("Dumped", len(summaries), "car summaries")
+    count = write_dataset(filepath, "summaries", summaries)
+    print("Dumped", count, "car summaries")
     
     db.close()
 
-pickle_car_summaries("car_summaries.pickle")
+dump_car_summaries("car_summaries.jsonl.gz")
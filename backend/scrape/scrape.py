@@ -1,93 +1,241 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
 from bs4 import BeautifulSoup
-import time
-import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import json
+import os
+import sys
 
-class Review:
-    def __init__(self, title, car_name, car_year, review_text, rating):
-        self.title = title  # Review title
-        self.car_name = car_name  # Name of the car (e.g., "Toyota Prius")
-        self.car_year = car_year  # Year of the car (e.g., 2023)
-        self.review_text = review_text  # Review text
-        self.rating = rating  # Rating (out of 5)
+from checkpoint import CrawlState, content_hash
+from dataset import DatasetWriter
+from fetch import Fetcher
+from models import Review
 
-    def convert_to_tuple(self):
-        return (self.car_name, self.car_year, self.title, self.review_text, self.rating)
+BASE_URL = "https://www.edmunds.com/toyota"
+CARS = ['prius', 'camry', 'corolla', 'highlander', 'rav4', 'sienna', 'tacoma', 'tundra']
+YEARS = ['2025', '2024', '2023', '2022', '2021', '2020']
 
-    def __str__(self):
-        return f"{self.title} - {self.car_name} {self.car_year} - {self.rating}/5 stars\n{self.review_text}"
+# Reviews per page; a page with fewer than this is the last one
+PAGE_SIZE = 50
 
-def main(filename, cars, years):
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
+# Safety cap on pages per model-year, in case the site never returns a short page
+MAX_PAGES = 200
 
-    # base url for the toyota reviews
-    base_url = "https://www.edmunds.com/toyota"
+# lxml is several times faster than html.parser on the full review pages
+PARSER = "lxml"
 
-    cars = ['prius', 'camry', 'corolla', 'highlander', 'rav4', 'sienna', 'tacoma', 'tundra']
-    years = ['2025', '2024', '2023', '2022', '2021', '2020']
 
-    # cars = ['prius']
-    # years = ['2025']
+def review_url(base_url, car, year, page=1, page_size=PAGE_SIZE):
+    return f"{base_url}/{car}/{year}/consumer-reviews/?pagesize={page_size}&pagenum={page}"
 
-    # test_url = f"{base_url}/prius/2023/consumer-reviews/?pagesize=50"
 
-    # Add headers to mimic a browser
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-        "Referer": "https://www.edmunds.com/toyota",
-    }
-
-    # Fetch the webpage
-    # driver.get(test_url)
-
-    # Wait for the page to load (adjust time if necessary)
-
-    # store reviews in list
+def parse_reviews(html, car_name, car_year):
+    """Extract Review objects from a consumer-reviews page."""
+    soup = BeautifulSoup(html, PARSER)
     reviews = []
-
-    for car in cars:
-        for year in years:
-
-            url = f"{base_url}/{car}/{year}/consumer-reviews/?pagesize=50"
-            car_name = car
-            car_year = year
-
-            driver.get(url)
-
-            time.sleep(5)
-
-            review_divs = driver.find_elements(By.CLASS_NAME, "review-item")
-
-            for review_div in review_divs:
-                title = review_div.find_element(By.CLASS_NAME, "heading-5").text
-
-                review_text_html = review_div.find_element(By.CLASS_NAME, "truncated-text").get_attribute('innerHTML')
-                soup = BeautifulSoup(review_text_html, "html.parser")
-                review_text = soup.get_text(separator=" ").strip()
-
-                # Extracting rating (out of 5)
-                review_stars_div = review_div.find_element(By.CLASS_NAME, "rating-stars")
-                star_elements = review_stars_div.find_elements(By.CLASS_NAME, "rating-star")
-                # Count the number of full stars (icon-star-full)
-                rating = sum(1 for star in star_elements if "icon-star-full" in star.get_attribute("class"))
-
-                reviews.append(Review(title, car_name, car_year, review_text, rating))
-
-            # don't get flagged by edmunds
-            time.sleep(5)
-
-    # Close the WebDriver
-    driver.quit()
-
-    print(reviews)
-
-    with open("db.pickle", "wb") as f:
-        pickle.dump(reviews, f)
-
-    # with open("db.pickle", "rb") as f:
-    #     phone = pickle.load(f)
-    #     for p in phone:
-    #         print(p)
+    for review_div in soup.select(".review-item"):
+        title_el = review_div.select_one(".heading-5")
+        title = title_el.get_text().strip() if title_el else ""
+
+        text_el = review_div.select_one(".truncated-text")
+        review_text = text_el.get_text(separator=" ").strip() if text_el else ""
+
+        # Count the number of full stars (icon-star-full)
+        stars = review_div.select(".rating-stars .rating-star")
+        rating = sum(1 for star in stars if "icon-star-full" in star.get("class", []))
+
+        reviews.append(Review(title, car_name, car_year, review_text, rating))
+    return reviews
+
+
+def parse_rows(html, car_name, car_year):
+    # Runs in the parser worker processes, so it returns plain tuples
+    return [review.convert_to_tuple() for review in parse_reviews(html, car_name, car_year)]
+
+
+class BrowserFallback:
+    """Headless Chrome for pages whose reviews are not in the static HTML.
+
+    Selenium is only imported and started the first time a page needs it. The
+    driver is not thread safe, so every call runs on one dedicated thread.
+    """
+
+    def __init__(self, wait=10):
+        self.wait = wait
+        self.driver = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def _page_source(self, url):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        if self.driver is None:
+            options = webdriver.ChromeOptions()
+            options.add_argument("--headless=new")
+            self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+
+        self.driver.get(url)
+        try:
+            # Wait for the reviews to render instead of a fixed sleep
+            WebDriverWait(self.driver, self.wait).until(
+                expected_conditions.presence_of_element_located((By.CLASS_NAME, "review-item")))
+        except TimeoutException:
+            pass
+        return self.driver.page_source
+
+    async def page_source(self, url):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._page_source, url)
+
+    def close(self):
+        if self.driver is not None:
+            self.driver.quit()
+        self.executor.shutdown()
+
+
+class ReviewPipeline:
+    """Producer/consumer crawl of every review page.
+
+    One producer per model-year fetches its pages in order and queues them; it
+    moves to the next page only while pages come back full, and stops early if
+    a page repeats an earlier one (a site that ignores or clamps the page
+    number) or after max_pages. Consumers parse
+    queued pages on a process pool and write the rows straight into the crawl
+    state, so memory holds at most `queue_size` pages however many reviews a
+    model has.
+    """
+
+    def __init__(self, fetcher, browser, state, executor, base_url=BASE_URL, workers=4, queue_size=8,
+                 page_size=PAGE_SIZE, max_pages=MAX_PAGES):
+        self.fetcher = fetcher
+        self.browser = browser
+        self.state = state
+        self.executor = executor
+        self.base_url = base_url
+        self.workers = workers
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    async def run(self, cars, years):
+        """Crawl every model-year. Returns True if every page succeeded."""
+        consumers = [asyncio.create_task(self.consume()) for _ in range(self.workers)]
+        try:
+            results = await asyncio.gather(*(self.produce(car, year) for car in cars for year in years))
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+        return all(results)
+
+    async def produce(self, car, year):
+        total = 0
+        seen = set()
+        for page in range(1, self.max_pages + 1):
+            key = self.state.unit_key(car, year, page)
+            try:
+                rows = await self.fetch_page(key, car, year, page)
+            except Exception as e:
+                print(f"Error scraping {car} {year} page {page}: {e}")
+                return False
+            # Hashed on the extracted rows, since the HTML of a repeated page
+            # can still differ in ads or tracking markup
+            rows_hash = content_hash(json.dumps(rows))
+            if rows_hash in seen:
+                print(f"{car} {year}: page {page} repeats an earlier page, stopping")
+                self.state.discard(key)
+                page -= 1
+                break
+            seen.add(rows_hash)
+            total += len(rows)
+            if len(rows) < self.page_size:
+                break
+        else:
+            print(f"{car} {year}: stopped at the {self.max_pages} page limit")
+        print(f"{car} {year}: {total} reviews over {page} pages")
+        return True
+
+    async def fetch_page(self, key, car, year, page):
+        """Fetch one page and wait for it to be parsed. Returns its rows."""
+        if self.state.done_this_run(key):
+            return self.state.rows(key)
+
+        url = review_url(self.base_url, car, year, page, self.page_size)
+        result = await self.fetcher.get(url, headers=self.state.conditional_headers(key))
+        page_hash = content_hash(result.text)
+        if result.status == 304 or (result.ok and self.state.unchanged(key, page_hash)):
+            self.state.touch(key)
+            return self.state.rows(key)
+
+        parsed = asyncio.get_running_loop().create_future()
+        await self.queue.put((key, car, year, page, url, result, page_hash, parsed))
+        return await parsed
+
+    async def consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            key, car, year, page, url, result, page_hash, parsed = await self.queue.get()
+            try:
+                rows = []
+                if result.ok:
+                    rows = await loop.run_in_executor(self.executor, parse_rows, result.text, car, year)
+                # An empty later page just means we ran out of reviews
+                if self.browser is not None and (not result.ok or (not rows and page == 1)):
+                    print(f"No reviews in static HTML for {url}, falling back to the browser")
+                    html = await self.browser.page_source(url)
+                    page_hash = content_hash(html)
+                    rows = await loop.run_in_executor(self.executor, parse_rows, html, car, year)
+                elif not result.ok:
+                    raise RuntimeError(f"HTTP {result.status}")
+
+                self.state.record(key, page_hash, rows, result.headers)
+                parsed.set_result(rows)
+            except Exception as e:
+                parsed.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+
+async def scrape_reviews(state, cars=CARS, years=YEARS, base_url=BASE_URL, concurrency=4,
+                         rate_per_host=0.5, use_browser=True, workers=None, page_size=PAGE_SIZE,
+                         max_pages=MAX_PAGES):
+    """Scrape every review page of every (car, year) into state.
+
+    Fetches are concurrent and rate limited per host; parsing runs on `workers`
+    processes. Returns True if every page succeeded.
+    """
+    workers = workers or os.cpu_count() or 1
+    browser = BrowserFallback() if use_browser else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            async with Fetcher(concurrency=concurrency, rate_per_host=rate_per_host,
+                               headers={"Referer": base_url}) as fetcher:
+                pipeline = ReviewPipeline(fetcher, browser, state, executor, base_url, workers, queue_size=2 * workers,
+                                          page_size=page_size, max_pages=max_pages)
+                return await pipeline.run(cars, years)
+    finally:
+        if browser is not None:
+            browser.close()
+
+
+def main(filename="reviews.jsonl.gz", cars=CARS, years=YEARS, base_url=BASE_URL, state_dir="crawl_state/reviews"):
+    state = CrawlState(state_dir)
+    state.begin_run()
+    if not asyncio.run(scrape_reviews(state, cars, years, base_url)):
+        # A partial dataset would drop the missing pages' reviews on the next load
+        print(f"Some pages failed; {filename} was not updated. Run again to resume and retry them")
+        sys.exit(1)
+    state.finish_run()
+
+    # Written one page at a time so the full review list is never in memory;
+    # the file is replaced only once the write completes
+    with DatasetWriter(filename, "reviews") as writer:
+        for rows in state.iter_unit_rows():
+            writer.write_many(Review.from_tuple(row) for row in rows)
+    print("Scraped", writer.count, "reviews")
+
+
+if __name__ == "__main__":
+    main()
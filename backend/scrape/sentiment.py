@@ -0,0 +1,189 @@
+"""Local review sentiment: hashed word features and a NumPy logistic regression.
+
+The model is trained on the star ratings we already scrape (4-5 stars
+positive, 1-2 negative, 3 left out), so no labelling or LLM calls are
+needed. Features are hashed unigrams and bigrams ("not reliable" is its
+own feature) with sublinear term frequency, L2 normalized per review.
+Everything after tokenizing is vectorized over the whole batch, so labelling
+thousands of reviews is a handful of NumPy calls.
+Run from the scrape directory to train: python sentiment.py [reviews.jsonl.gz]
+"""
+import os
+import re
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from dataset import iter_dataset
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sentiment_model.npz")
+FEATURE_BITS = 18
+POSITIVE_RATING = 4  # and above
+NEGATIVE_RATING = 2  # and below
+
+# Probability band labelled neutral rather than positive or negative
+NEUTRAL_BAND = (0.4, 0.6)
+
+TOKEN = re.compile(r"[a-z0-9']+")
+BIGRAM_MULTIPLIER = 1000003
+
+
+class HashingVectorizer:
+    """Maps texts to sparse rows of 2**bits hashed unigram and bigram counts.
+
+    Words are hashed with crc32, which is stable across processes (unlike
+    hash()), so a saved model's weights line up with features computed later;
+    word hashes are memoized. Bigram columns are mixed from the two word
+    columns with NumPy, so only distinct words are hashed in Python.
+    """
+
+    def __init__(self, bits=FEATURE_BITS):
+        self.bits = bits
+        self.dim = 1 << bits
+        self.columns = {}
+
+    def transform(self, texts):
+        """Return (rows, cols, values, n): one entry per distinct feature of each text."""
+        words, lengths = [], []
+        for text in texts:
+            tokens = TOKEN.findall((text or "").lower())
+            words.extend(tokens)
+            lengths.append(len(tokens))
+        for word in set(words).difference(self.columns):
+            self.columns[word] = zlib.crc32(word.encode("utf-8")) & (self.dim - 1)
+        n = len(lengths)
+        unigrams = np.fromiter(map(self.columns.__getitem__, words), dtype=np.int64, count=len(words))
+        word_rows = np.repeat(np.arange(n, dtype=np.int64), lengths)
+
+        # Pairs of adjacent words within the same text
+        pairs = np.ones(max(len(words) - 1, 0), dtype=bool)
+        ends = np.cumsum(lengths, dtype=np.int64)[:-1]
+        pairs[ends[(ends > 0) & (ends < len(words))] - 1] = False
+        bigrams = ((unigrams[:-1] * BIGRAM_MULTIPLIER) ^ unigrams[1:])[pairs] & (self.dim - 1)
+
+        rows = np.concatenate([word_rows, word_rows[:-1][pairs]])
+        keys, counts = np.unique(rows * self.dim + np.concatenate([unigrams, bigrams]), return_counts=True)
+        rows, cols = keys >> self.bits, keys & (self.dim - 1)
+        values = 1 + np.log(counts)
+        norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=n))
+        values /= norms[rows]
+        return rows, cols, values, n
+
+
+class SentimentModel:
+    """Binary logistic regression over hashed features; p(positive) per review."""
+
+    def __init__(self, bits=FEATURE_BITS, weights=None, bias=0.0):
+        self.vectorizer = HashingVectorizer(bits)
+        self.weights = np.zeros(self.vectorizer.dim) if weights is None else weights
+        self.bias = bias
+
+    def _scores(self, features):
+        rows, cols, values, n = features
+        return np.bincount(rows, weights=values * self.weights[cols], minlength=n) + self.bias
+
+    def fit(self, texts, ratings, epochs=200, learning_rate=0.05, l2=1e-5):
+        """Train on texts rated at or above POSITIVE_RATING or at or below NEGATIVE_RATING.
+
+        Full-batch Adam; both classes are weighted equally however skewed the ratings are.
+        Returns self.
+        """
+        ratings = np.asarray(ratings, dtype=float)
+        keep = (ratings >= POSITIVE_RATING) | (ratings <= NEGATIVE_RATING)
+        texts = [text for text, kept in zip(texts, keep) if kept]
+        y = (ratings[keep] >= POSITIVE_RATING).astype(float)
+        positives = max(y.sum(), 1)
+        negatives = max(len(y) - y.sum(), 1)
+        sample_weight = np.where(y == 1, len(y) / (2 * positives), len(y) / (2 * negatives)) / len(y)
+
+        features = self.vectorizer.transform(texts)
+        rows, cols, values, _ = features
+        params = np.append(self.weights, self.bias)
+        m, v = np.zeros_like(params), np.zeros_like(params)
+        beta1, beta2 = 0.9, 0.999
+        for step in range(1, epochs + 1):
+            p = 1 / (1 + np.exp(-self._scores(features)))
+            error = (p - y) * sample_weight
+            gradient = np.append(np.bincount(cols, weights=values * error[rows], minlength=self.vectorizer.dim)
+                                 + l2 * self.weights, error.sum())
+            m = beta1 * m + (1 - beta1) * gradient
+            v = beta2 * v + (1 - beta2) * gradient ** 2
+            params -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + 1e-8)
+            self.weights, self.bias = params[:-1], params[-1]
+        return self
+
+    def predict_proba(self, texts):
+        """p(positive) for each text."""
+        return 1 / (1 + np.exp(-self._scores(self.vectorizer.transform(texts))))
+
+    def label(self, texts):
+        """1 for positive, -1 for negative and 0 for neutral, per text."""
+        p = self.predict_proba(texts)
+        return np.where(p >= NEUTRAL_BAND[1], 1, np.where(p <= NEUTRAL_BAND[0], -1, 0))
+
+    def counts(self, texts):
+        """(total, positive, negative) review counts for texts."""
+        labels = self.label(texts)
+        return len(labels), int((labels == 1).sum()), int((labels == -1).sum())
+
+    def save(self, path=DEFAULT_PATH):
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(tmp, weights=self.weights.astype(np.float32), bias=self.bias,
+                            bits=self.vectorizer.bits)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        with np.load(path) as data:
+            return cls(int(data["bits"]), data["weights"].astype(float), float(data["bias"]))
+
+
+def load_default_model(path=DEFAULT_PATH):
+    """The trained model at path, or None if it has not been trained yet."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return SentimentModel.load(path)
+    except Exception as e:
+        print("Error loading sentiment model:", e)
+        return None
+
+
+def review_text(review):
+    return f"{review.title or ''}\n{review.review_text or ''}"
+
+
+def train(filepath, path=DEFAULT_PATH, holdout=0.2, seed=0):
+    """Train on the reviews dataset, report held-out accuracy, and save to path."""
+    reviews = [review for review in iter_dataset(filepath, "reviews") if review.rating not in (None, "")]
+    texts = [review_text(review) for review in reviews]
+    ratings = np.array([float(review.rating) for review in reviews])
+    test = np.random.default_rng(seed).random(len(texts)) < holdout
+
+    start = time.perf_counter()
+    model = SentimentModel().fit([t for t, held in zip(texts, test) if not held], ratings[~test])
+    print(f"Trained on {int((~test).sum())} reviews in {time.perf_counter() - start:.2f}s")
+
+    held_texts = [t for t, held in zip(texts, test) if held]
+    polar = (ratings[test] >= POSITIVE_RATING) | (ratings[test] <= NEGATIVE_RATING)
+    predicted = model.predict_proba(held_texts) >= 0.5
+    accuracy = (predicted[polar] == (ratings[test][polar] >= POSITIVE_RATING)).mean()
+    print(f"Held-out accuracy on {int(polar.sum())} rated 1-2 or 4-5 stars: {accuracy:.3f}")
+
+    start = time.perf_counter()
+    model.label(texts)
+    elapsed = time.perf_counter() - start
+    print(f"Labelled {len(texts)} reviews in {elapsed:.3f}s ({len(texts) / elapsed:.0f} reviews/sec)")
+
+    # The saved model is trained on every review
+    model = SentimentModel().fit(texts, ratings)
+    model.save(path)
+    print("Saved sentiment model to", path)
+    return model
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(__file__)
+    train(sys.argv[1] if len(sys.argv) > 1 else os.path.join(script_dir, "reviews.jsonl.gz"))
@@ -4,27 +4,14 @@ from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from bs4 import BeautifulSoup
 import time
-import pickle
+import json
+import sys
 
-class CarData:
-    def __init__(self, car_model, car_year, msrp, horsepower, mpg, num_seats, drive_type):
-        self.car_model = car_model
-        self.car_year = car_year
-        self.msrp = msrp
-        self.horsepower = horsepower
-        self.mpg = mpg
-        self.num_seats = num_seats
-        self.drive_type = drive_type
+from checkpoint import CrawlState, content_hash
+from dataset import write_dataset
+from models import CarData
 
-    def convert_to_tuple(self):
-        return (self.car_model, self.car_year, self.msrp, self.horsepower, self.mpg, self.num_seats, self.drive_type)
-
-    def __str__(self):
-        return f"{self.car_model} {self.car_year} - MSRP: {self.msrp}, Horsepower: {self.horsepower}, MPG: {self.mpg}, Seats: {self.num_seats}, Drive Type: {self.drive_type}"
-
-
-
-def main():
+def main(filename="cars.jsonl.gz", state_dir="crawl_state/specs"):
     cars = ['prius', 'camry', 'corolla', 'highlander', 'rav4', 'sienna', 'tacoma', 'tundra']
     years = ['2025', '2024', '2023', '2022', '2021', '2020']
 
@@ -32,13 +19,23 @@ def main():
 
     test_url = "https://www.cars.com/research/toyota-highlander-2025/specs/"
 
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
+    # Finished (car, year) units are checkpointed, so a crashed run resumes
+    # where it stopped instead of starting over
+    state = CrawlState(state_dir)
+    state.begin_run()
 
-    all_car_data = []
+    driver = None
+    failed = False
 
     for car in cars:
         for year in years:
             url = f"{base_url}{car}-{year}/specs/"
+            key = state.unit_key(car, year)
+            if state.done_this_run(key):
+                continue
+
+            if driver is None:
+                driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
 
             try:
                 # Fetch the page
@@ -79,26 +76,36 @@ def main():
                             horsepower_text = spec.find_element(By.TAG_NAME, "label").text
                             horsepower_text = horsepower_text.split(',')[0]
                             horsepower_text = horsepower_text.split('.')[0]
-                            horsepower = float(''.join(filter(str.isdigit, horsepower_text)))
+                            horsepower = int(''.join(filter(str.isdigit, horsepower_text)))
                     except:
                         continue
                 
                 car_data = CarData(model, year, msrp, horsepower, mpg, num_seats, drive_type)
-                print("Created car data:", car_data)
-                all_car_data.append(car_data)
-
-
+                row = car_data.convert_to_tuple()
+                spec_hash = content_hash(json.dumps(row))
+                if state.unchanged(key, spec_hash):
+                    print("Unchanged car data:", car_data)
+                    state.touch(key)
+                else:
+                    print("Created car data:", car_data)
+                    state.record(key, spec_hash, [row])
 
             except Exception as e:
                 print(f"An error occurred: {e}")
+                failed = True
 
             # don't get flagged by cars.com
             time.sleep(5)
-    
-    driver.quit()
 
-    with open("datadb.pickle", "wb") as f:
-        pickle.dump(all_car_data, f)
+    if driver is not None:
+        driver.quit()
+
+    if failed:
+        print(f"Some pages failed; {filename} was not updated. Run again to resume and retry them")
+        sys.exit(1)
+    state.finish_run()
+
+    write_dataset(filename, "cars", (CarData.from_tuple(row) for row in state.iter_rows()))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
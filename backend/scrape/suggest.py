@@ -0,0 +1,156 @@
+import re
+import threading
+from collections import defaultdict
+
+TRIGRAM_THRESHOLD = 0.3  # minimum Jaccard similarity for a fuzzy match
+
+
+def normalize(text):
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(text).lower()).split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrieNode:
+    __slots__ = ("children", "models")
+
+    def __init__(self):
+        self.children = {}
+        self.models = {}  # model -> 1 if a full name starts here, 0 if only a word does
+
+
+class SuggestionIndex:
+    """In-memory autocomplete over the (model, year) pairs in the cars table.
+
+    Models are indexed in a prefix trie (full name and each word) and a trigram
+    index for typo-tolerant matches. sync() applies only the difference from the
+    previous catalogue, so it is cheap to call whenever the catalogue version changes.
+    """
+
+    def __init__(self):
+        self.root = TrieNode()
+        self.trigram_index = defaultdict(set)
+        self.model_trigrams = {}
+        self.model_years = {}  # model -> set of years
+        self.version = None
+        self.lock = threading.Lock()
+
+    def sync(self, rows, version=None):
+        """Bring the index in line with rows of (model, year)."""
+        wanted = defaultdict(set)
+        for model, year in rows:
+            wanted[model].add(year)
+
+        with self.lock:
+            for model in set(self.model_years) - set(wanted):
+                self._remove_model(model)
+            for model, years in wanted.items():
+                if model not in self.model_years:
+                    self._add_model(model)
+                self.model_years[model] = years
+            self.version = version
+
+    def _words(self, model):
+        name = normalize(model)
+        return name, [w for w in name.split(" ") if w]
+
+    def _add_model(self, model):
+        name, words = self._words(model)
+        for key, full in [(name, 1)] + [(w, 0) for w in words]:
+            node = self.root
+            for ch in key:
+                node = node.children.setdefault(ch, TrieNode())
+                node.models[model] = max(node.models.get(model, 0), full)
+
+        grams = trigrams(name)
+        self.model_trigrams[model] = grams
+        for gram in grams:
+            self.trigram_index[gram].add(model)
+
+    def _remove_model(self, model):
+        name, words = self._words(model)
+        for key in [name] + words:
+            path = []
+            node = self.root
+            for ch in key:
+                child = node.children.get(ch)
+                if child is None:
+                    break
+                path.append((node, ch, child))
+                node = child
+            for parent, ch, child in reversed(path):
+                child.models.pop(model, None)
+                if not child.models and not child.children:
+                    del parent.children[ch]
+
+        for gram in self.model_trigrams.pop(model, ()):
+            models = self.trigram_index.get(gram)
+            if models is not None:
+                models.discard(model)
+                if not models:
+                    del self.trigram_index[gram]
+        del self.model_years[model]
+
+    def _prefix_matches(self, text):
+        node = self.root
+        for ch in text:
+            node = node.children.get(ch)
+            if node is None:
+                return {}
+        return node.models
+
+    def _fuzzy_matches(self, text):
+        grams = trigrams(text)
+        overlap = defaultdict(int)
+        for gram in grams:
+            for model in self.trigram_index.get(gram, ()):
+                overlap[model] += 1
+        matches = {}
+        for model, shared in overlap.items():
+            similarity = shared / (len(grams) + len(self.model_trigrams[model]) - shared)
+            if similarity >= TRIGRAM_THRESHOLD:
+                matches[model] = similarity
+        return matches
+
+    def search(self, query, k=10):
+        """Return up to k (model, year) pairs for query, best match first.
+
+        A numeric token is a year prefix ("camry 202") if it has four digits or
+        starts a year in the catalogue; other numbers are part of the name, so
+        "rav 4" finds "RAV4". Full-name prefix matches rank above word prefix
+        matches, which rank above fuzzy matches; within a tier newer years come
+        first, then closer names.
+        """
+        tokens = [t for t in normalize(query).split(" ") if t]
+
+        with self.lock:
+            years = {str(year) for years in self.model_years.values() for year in years}
+            year_prefix = next((t for t in tokens if t.isdigit() and
+                                (len(t) == 4 or any(year.startswith(t) for year in years))), "")
+            text = " ".join(t for t in tokens if t != year_prefix)
+
+            if text:
+                scores = {}
+                # "rav 4" is also tried as "rav4"
+                for key in dict.fromkeys([text, text.replace(" ", "")]):
+                    for model, full in self._prefix_matches(key).items():
+                        closeness = len(key) / max(len(normalize(model)), 1)
+                        scores[model] = max(scores.get(model, (0, 0)), (2.0 + full, closeness))
+                for model, similarity in self._fuzzy_matches(text).items():
+                    scores.setdefault(model, (similarity, similarity))
+            elif year_prefix:
+                scores = {model: (0.0, 0.0) for model in self.model_years}
+            else:
+                return []
+
+            ranked = []
+            for model, (tier, closeness) in scores.items():
+                for year in self.model_years.get(model, ()):
+                    if str(year).startswith(year_prefix):
+                        ranked.append((-tier, -int(year), -closeness, model, year))
+
+        ranked.sort()
+        return [(model, year) for *_, model, year in ranked[:k]]
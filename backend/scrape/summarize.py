@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import random
+
+import tiktoken
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, InternalServerError, RateLimitError
+
+from fetch import TokenBucket
+from llm_cache import cache_key
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+def estimate_tokens(text):
+    # Rough count for rate budgets; about 4 characters per token for English
+    return len(text) // 4 + 1
+
+
+def print_progress(done, total, key, elapsed):
+    print(f"[{done}/{total}] {key} ({elapsed:.1f}s)")
+
+
+class SummaryScheduler:
+    """Runs many chat completions concurrently within rate-limit budgets.
+
+    One AsyncOpenAI client is shared by every request. At most `concurrency`
+    requests are in flight, and requests and tokens are drawn from per-minute
+    token buckets (`rpm`, `tpm`) before each call. Rate-limit, connection and
+    server errors are retried with exponential backoff and full jitter.
+    """
+
+    def __init__(self, client=None, model="gpt-3.5-turbo", temperature=0.7, max_tokens=300,
+                 concurrency=8, rpm=500, tpm=160_000, retries=5, backoff=1.0):
+        self.client = client or AsyncOpenAI()
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.requests = TokenBucket(rpm / 60, capacity=rpm)
+        self.tokens = TokenBucket(tpm / 60, capacity=tpm)
+        self.retries = retries
+        self.backoff = backoff
+
+    async def complete(self, prompt):
+        cost = estimate_tokens(prompt) + self.max_tokens
+        for attempt in range(self.retries + 1):
+            async with self.semaphore:
+                await self.requests.acquire()
+                await self.tokens.acquire(cost)
+                try:
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=self.temperature,
+                        max_tokens=self.max_tokens,
+                    )
+                    return response.choices[0].message.content
+                except RETRYABLE_ERRORS:
+                    if attempt == self.retries:
+                        raise
+            await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+
+# Past CHUNK_MIN_FILL of the budget, a content-defined chunk boundary falls
+# on average after every CHUNK_BOUNDARY texts, so chunks come close to the budget
+CHUNK_BOUNDARY = 4
+CHUNK_MIN_FILL = 0.5
+
+
+def get_encoding(model):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def pack_chunks(texts, budget, encoding, content_boundaries=True):
+    """Pack whole texts into chunks of at most `budget` tokens.
+
+    Texts that fit one budget together are a single chunk. Otherwise texts
+    are ordered by content hash, and with content_boundaries a chunk filled
+    past CHUNK_MIN_FILL of the budget also ends after any text whose hash hits
+    the boundary condition, so chunk edges depend on content rather than
+    position: adding a text changes only the chunk it lands in (and at most
+    the following ones up to the next content boundary). A text longer than
+    the budget on its own is truncated to it.
+    """
+    hashed = []
+    for digest, text in sorted((hashlib.sha1(text.encode("utf-8")).digest(), text) for text in texts):
+        tokens = encoding.encode(text)
+        if len(tokens) > budget:
+            tokens = tokens[:budget]
+            text = encoding.decode(tokens)
+        hashed.append((digest, text, len(tokens)))
+
+    # +1 for the newline that joins texts in the prompt
+    if sum(count + 1 for _, _, count in hashed) <= budget:
+        return [[text for _, text, _ in hashed]] if hashed else []
+
+    chunks = []
+    current, used = [], 0
+    for digest, text, count in hashed:
+        if current and used + count + 1 > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(text)
+        used += count + 1
+        if (content_boundaries and used >= CHUNK_MIN_FILL * budget
+                and int.from_bytes(digest[:4], "big") % CHUNK_BOUNDARY == 0):
+            chunks.append(current)
+            current, used = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class MapReduceSummarizer:
+    """Summarizes any number of texts within a per-prompt token budget.
+
+    Texts are packed into chunks (see pack_chunks). A single chunk is summarized
+    directly with summary_template. Otherwise every chunk is summarized in
+    parallel with map_template (the map step), and the chunk summaries are
+    combined with reduce_template, recursively if they do not fit one prompt.
+    Every completion is cached by its exact inputs, so when new texts arrive
+    only the chunks they land in and the reduce steps go back to the model.
+    Templates take the joined texts as {reviews}.
+    """
+
+    def __init__(self, scheduler, cache, summary_template, map_template, reduce_template, chunk_budget=3000):
+        self.scheduler = scheduler
+        self.cache = cache
+        self.summary_template = summary_template
+        self.map_template = map_template
+        self.reduce_template = reduce_template
+        self.chunk_budget = chunk_budget
+        self.encoding = get_encoding(scheduler.model)
+
+    async def complete(self, template, texts):
+        key = cache_key(self.scheduler.model, template, self.scheduler.temperature, texts)
+        cached, hit = self.cache.get(key)
+        if hit:
+            return cached
+        result = await self.scheduler.complete(template.format(reviews="\n".join(texts)))
+        self.cache.set(key, result)
+        return result
+
+    async def summarize(self, texts):
+        chunks = pack_chunks(texts, self.chunk_budget, self.encoding)
+        if len(chunks) <= 1:
+            return await self.complete(self.summary_template, chunks[0] if chunks else [])
+        partials = await asyncio.gather(*(self.complete(self.map_template, chunk) for chunk in chunks))
+        return await self.reduce(list(partials))
+
+    async def reduce(self, partials):
+        # Packed by budget only, so every round strictly shrinks the input
+        chunks = pack_chunks(partials, self.chunk_budget, self.encoding, content_boundaries=False)
+        if len(chunks) == 1:
+            return await self.complete(self.reduce_template, chunks[0])
+        merged = await asyncio.gather(*(self.complete(self.reduce_template, chunk) for chunk in chunks))
+        return await self.reduce(list(merged))
@@ -35,9 +35,13 @@ CREATE TABLE car_reviews
     review_title  TEXT,                     -- Title of the review
     review_body   TEXT         NOT NULL,    -- Full text of the review
     review_rating FLOAT,                    -- Rating (e.g., 4.5/5)
-    review_date   DATE DEFAULT CURRENT_DATE -- Date the review was scraped
+    review_date   DATE DEFAULT CURRENT_DATE, -- Date the review was scraped
+    content_hash  CHAR(32) UNIQUE,          -- md5 of the review fields, used to merge reloads
+    aspects_tagged BOOLEAN NOT NULL DEFAULT FALSE -- tags written to review_aspects by scrape/aspects.py
 );
 
+CREATE INDEX car_reviews_untagged ON car_reviews (review_id) WHERE NOT aspects_tagged;
+
 CREATE TABLE car_sentiment
 (
     review_id INT PRIMARY KEY, -- Unique identifier for each review
@@ -45,3 +49,81 @@ CREATE TABLE car_sentiment
     sentiment TEXT,            -- Sentiment of the review
     FOREIGN KEY (car_id) REFERENCES cars (car_id)
 );
+
+-- Catalogue version, bumped on every write to cars so the API can drop its caches
+CREATE TABLE catalogue_version
+(
+    name    VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO catalogue_version (name, version) VALUES ('cars', 0);
+
+CREATE OR REPLACE FUNCTION bump_catalogue_version() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE catalogue_version SET version = version + 1 WHERE name = TG_ARGV[0];
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER cars_bump_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON cars
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalogue_version('cars');
+
+-- Per (model, year, category) review statistics, built from car_reviews by scrape/aggregates.py.
+-- Counts and sums rather than ratios, so new reviews can be added to a row in place.
+CREATE TABLE car_review_aggregates
+(
+    car_name       VARCHAR(100) NOT NULL,
+    car_year       INT          NOT NULL,
+    category       VARCHAR(50)  NOT NULL, -- "overall" or a category from scrape/aspects.py
+    review_count   INT          NOT NULL DEFAULT 0,
+    rating_count   INT          NOT NULL DEFAULT 0, -- reviews with a rating
+    rating_sum     FLOAT        NOT NULL DEFAULT 0,
+    positive_count INT          NOT NULL DEFAULT 0, -- rated 4 or more
+    negative_count INT          NOT NULL DEFAULT 0, -- rated 2 or less
+    stars_1        INT          NOT NULL DEFAULT 0, -- rating histogram, ratings rounded to whole stars
+    stars_2        INT          NOT NULL DEFAULT 0,
+    stars_3        INT          NOT NULL DEFAULT 0,
+    stars_4        INT          NOT NULL DEFAULT 0,
+    stars_5        INT          NOT NULL DEFAULT 0,
+    PRIMARY KEY (car_name, car_year, category)
+);
+
+-- Watermark of the aggregates: reviews up to last_review_id are counted, review_count of them
+CREATE TABLE review_aggregate_state
+(
+    name           VARCHAR(50) PRIMARY KEY,
+    last_review_id INT    NOT NULL DEFAULT 0,
+    review_count   BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO review_aggregate_state (name) VALUES ('car_reviews');
+
+INSERT INTO catalogue_version (name, version) VALUES ('review_aggregates', 0);
+
+CREATE TRIGGER car_review_aggregates_bump_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON car_review_aggregates
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalogue_version('review_aggregates');
+
+-- Inverted index of review aspects, written by scrape/aspects.py when reviews are loaded.
+-- car_name/car_year are copied from car_reviews so a car's reviews for a category are one index range.
+CREATE TABLE review_aspects
+(
+    review_id INT          NOT NULL REFERENCES car_reviews (review_id) ON DELETE CASCADE,
+    car_name  VARCHAR(100) NOT NULL,
+    car_year  INT,
+    category  VARCHAR(50)  NOT NULL, -- a category from scrape/aspects.py; "overall" is implied
+    PRIMARY KEY (review_id, category)
+);
+
+CREATE INDEX review_aspects_car_category ON review_aspects (car_name, car_year, category, review_id);
+
+-- /all_cars filters and sorts on these; car_id makes each (column, car_id) key unique for keyset pagination
+CREATE INDEX cars_msrp ON cars (msrp, car_id);
+CREATE INDEX cars_horsepower ON cars (horsepower, car_id);
+CREATE INDEX cars_mpg ON cars (mpg, car_id);
+CREATE INDEX cars_num_seats ON cars (num_seats, car_id);
+CREATE INDEX cars_car_year ON cars (car_year, car_id);
+CREATE INDEX cars_car_model ON cars (car_model, car_id);
+CREATE INDEX cars_drive_type ON cars (drive_type, car_id);
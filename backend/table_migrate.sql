@@ -0,0 +1,86 @@
+-- Upgrades a test_db created from an older table_create.sql to the current schema.
+-- Every statement is idempotent, so the script can be run again on any version.
+-- A fresh database only needs table_create.sql.
+
+-- Reloads merge on content_hash (scrape/load_data.py)
+ALTER TABLE car_reviews ADD COLUMN IF NOT EXISTS content_hash CHAR(32);
+CREATE UNIQUE INDEX IF NOT EXISTS car_reviews_content_hash_key ON car_reviews (content_hash);
+
+-- Catalogue version, bumped on every write to cars so the API can drop its caches
+CREATE TABLE IF NOT EXISTS catalogue_version
+(
+    name    VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO catalogue_version (name, version) VALUES ('cars', 0) ON CONFLICT (name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_catalogue_version() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE catalogue_version SET version = version + 1 WHERE name = TG_ARGV[0];
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS cars_bump_version ON cars;
+CREATE TRIGGER cars_bump_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON cars
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalogue_version('cars');
+
+-- Review aggregates (scrape/aggregates.py)
+CREATE TABLE IF NOT EXISTS car_review_aggregates
+(
+    car_name       VARCHAR(100) NOT NULL,
+    car_year       INT          NOT NULL,
+    category       VARCHAR(50)  NOT NULL,
+    review_count   INT          NOT NULL DEFAULT 0,
+    rating_count   INT          NOT NULL DEFAULT 0,
+    rating_sum     FLOAT        NOT NULL DEFAULT 0,
+    positive_count INT          NOT NULL DEFAULT 0,
+    negative_count INT          NOT NULL DEFAULT 0,
+    stars_1        INT          NOT NULL DEFAULT 0,
+    stars_2        INT          NOT NULL DEFAULT 0,
+    stars_3        INT          NOT NULL DEFAULT 0,
+    stars_4        INT          NOT NULL DEFAULT 0,
+    stars_5        INT          NOT NULL DEFAULT 0,
+    PRIMARY KEY (car_name, car_year, category)
+);
+
+CREATE TABLE IF NOT EXISTS review_aggregate_state
+(
+    name           VARCHAR(50) PRIMARY KEY,
+    last_review_id INT    NOT NULL DEFAULT 0,
+    review_count   BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO review_aggregate_state (name) VALUES ('car_reviews') ON CONFLICT (name) DO NOTHING;
+INSERT INTO catalogue_version (name, version) VALUES ('review_aggregates', 0) ON CONFLICT (name) DO NOTHING;
+
+DROP TRIGGER IF EXISTS car_review_aggregates_bump_version ON car_review_aggregates;
+CREATE TRIGGER car_review_aggregates_bump_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON car_review_aggregates
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalogue_version('review_aggregates');
+
+-- Review aspects (scrape/aspects.py)
+ALTER TABLE car_reviews ADD COLUMN IF NOT EXISTS aspects_tagged BOOLEAN NOT NULL DEFAULT FALSE;
+CREATE INDEX IF NOT EXISTS car_reviews_untagged ON car_reviews (review_id) WHERE NOT aspects_tagged;
+
+CREATE TABLE IF NOT EXISTS review_aspects
+(
+    review_id INT          NOT NULL REFERENCES car_reviews (review_id) ON DELETE CASCADE,
+    car_name  VARCHAR(100) NOT NULL,
+    car_year  INT,
+    category  VARCHAR(50)  NOT NULL,
+    PRIMARY KEY (review_id, category)
+);
+
+CREATE INDEX IF NOT EXISTS review_aspects_car_category ON review_aspects (car_name, car_year, category, review_id);
+
+-- /all_cars filters and sorts (scrape/car_query.py)
+CREATE INDEX IF NOT EXISTS cars_msrp ON cars (msrp, car_id);
+CREATE INDEX IF NOT EXISTS cars_horsepower ON cars (horsepower, car_id);
+CREATE INDEX IF NOT EXISTS cars_mpg ON cars (mpg, car_id);
+CREATE INDEX IF NOT EXISTS cars_num_seats ON cars (num_seats, car_id);
+CREATE INDEX IF NOT EXISTS cars_car_year ON cars (car_year, car_id);
+CREATE INDEX IF NOT EXISTS cars_car_model ON cars (car_model, car_id);
+CREATE INDEX IF NOT EXISTS cars_drive_type ON cars (drive_type, car_id);
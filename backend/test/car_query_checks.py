@@ -0,0 +1,128 @@
+"""Page through a fake car table with CarQuery in both sort directions.
+
+fetch() stands in for Database.query_cars: it applies the same filters,
+keyset condition, order and limit + 1 to an in-memory list of cars, so the
+checks cover cursor encoding, decode_cursor validation and page() without a
+database. Run from the backend directory: python test/car_query_checks.py
+"""
+import base64
+import json
+import os
+import sys
+
+from werkzeug.datastructures import MultiDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scrape"))
+
+from car_query import CarQuery, CarQueryError
+
+# Repeated msrp values make car_id break ties; car 9 has no msrp
+CARS = [
+    {"car_id": car_id, "car_model": model, "car_year": year, "msrp": msrp, "horsepower": 200,
+     "mpg": 30, "num_seats": 5, "drive_type": "Front Wheel Drive"}
+    for car_id, model, year, msrp in [
+        (1, "camry", 2024, 28000), (2, "corolla", 2024, 22000), (3, "prius", 2024, 28000),
+        (4, "rav4", 2024, 31000), (5, "camry", 2023, 27000), (6, "corolla", 2023, 22000),
+        (7, "tacoma", 2024, 35000), (8, "sienna", 2024, 39000), (9, "tundra", 2024, None),
+        (10, "highlander", 2024, 39000),
+    ]
+]
+
+
+def fetch(query, cars=CARS):
+    rows = [car for car in cars if car[query.sort] is not None]
+    for field, (low, high) in query.ranges.items():
+        rows = [car for car in rows if (low is None or car[field] >= low) and (high is None or car[field] <= high)]
+    key = lambda car: (car[query.sort], car["car_id"])
+    if query.after is not None:
+        rows = [car for car in rows if (key(car) < query.after if query.descending else key(car) > query.after)]
+    rows.sort(key=key, reverse=query.descending)
+    return [tuple(car[column] for column in query.columns()) for car in rows[:query.limit + 1]]
+
+
+def page_through(**args):
+    """Follow next_cursor from the first page to the last. Returns the pages."""
+    pages, cursor = [], None
+    while True:
+        query = CarQuery.from_args(MultiDict(dict(args, cursor=cursor) if cursor else args))
+        page = query.page(fetch(query))
+        pages.append(page["all_cars"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def ids(pages):
+    return [car["car_id"] for page in pages for car in page]
+
+
+def test_ascending():
+    pages = page_through(sort="msrp", limit="4", fields="car_id,msrp")
+    assert ids(pages) == [2, 6, 5, 1, 3, 4, 7, 8, 10], ids(pages)
+    assert [len(page) for page in pages] == [4, 4, 1]
+    assert all(set(car) == {"car_id", "msrp"} for page in pages for car in page)
+    print("OK: ascending msrp over", len(pages), "pages")
+
+
+def test_descending():
+    pages = page_through(sort="-msrp", limit="4", fields="car_model")
+    assert [car["car_model"] for page in pages for car in page] == [
+        "highlander", "sienna", "tacoma", "rav4", "prius", "camry", "camry", "corolla", "corolla"]
+    # The sort column and car_id are selected for the cursor but not returned
+    assert all(set(car) == {"car_model"} for page in pages for car in page)
+    print("OK: descending msrp over", len(pages), "pages")
+
+
+def test_limit_plus_one():
+    # Exactly two full pages: the extra row is what tells page() there is more
+    pages = page_through(sort="car_id", limit="5")
+    assert [len(page) for page in pages] == [5, 5], [len(page) for page in pages]
+
+    query = CarQuery(sort="car_id", limit=5)
+    assert query.page(fetch(query, CARS[:5]))["next_cursor"] is None
+    assert query.page(fetch(query, CARS[:6]))["next_cursor"] is not None
+
+    pages = page_through(sort="msrp", min_msrp="30000", limit="3")
+    assert ids(pages) == [4, 7, 8, 10] and [len(page) for page in pages] == [3, 1]
+    print("OK: pages end without an empty trailing page")
+
+
+def test_cursor():
+    query = CarQuery(sort="msrp", descending=True)
+    cursor = query.encode_cursor({"msrp": 28000, "car_id": 3})
+    assert query.decode_cursor(cursor) == (28000, 3)
+
+    def rejects(query, cursor, message):
+        try:
+            query.decode_cursor(cursor)
+        except CarQueryError as e:
+            assert str(e) == message, str(e)
+        else:
+            raise AssertionError(f"accepted {cursor!r}")
+
+    encode = lambda payload: base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    rejects(query, "not a cursor", "Invalid cursor")
+    rejects(query, encode(["msrp", True, 28000]), "Invalid cursor")
+    rejects(query, encode(["msrp", True, "28000", 3]), "Invalid cursor")
+    rejects(query, encode(["msrp", True, 28000, "3"]), "Invalid cursor")
+    rejects(CarQuery(sort="msrp"), cursor, "Cursor is for a different sort order")
+    rejects(CarQuery(sort="mpg", descending=True), cursor, "Cursor is for a different sort order")
+
+    try:
+        CarQuery.from_args(MultiDict({"sort": "msrp", "cursor": cursor}))
+    except CarQueryError:
+        pass
+    else:
+        raise AssertionError("from_args accepted a cursor for another sort order")
+    print("OK: cursors round-trip and bad cursors are rejected")
+
+
+def main():
+    test_ascending()
+    test_descending()
+    test_limit_plus_one()
+    test_cursor()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Bulk review loading: executemany vs COPY through a staging table.
+
+Loads synthetic reviews into a scratch copy of car_reviews, so the real table
+is left alone. Needs the local Postgres from compose.yaml.
+Run from the backend directory: python test/copy_benchmark.py [rows]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from main import db_params
+from scrape.db import REVIEW_COLUMNS, Database, close_pools
+
+BENCH_TABLE = "car_reviews_bench"
+WORDS = "the car ride engine seats fuel mileage great poor noisy smooth reliable comfortable cheap dealer brakes".split()
+
+
+def synthetic_reviews(n):
+    rng = random.Random(0)
+    for i in range(n):
+        body = " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 200)))
+        yield ("camry", 2020 + i % 6, f"Review {i}", body, rng.randint(1, 5))
+
+
+def reset_table(db):
+    db.connect()
+    db.cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    db.cursor.execute(f"CREATE TABLE {BENCH_TABLE} (LIKE car_reviews INCLUDING DEFAULTS)")
+    db.conn.commit()
+
+
+def executemany_load(db, rows):
+    db.connect()
+    columns = ", ".join(REVIEW_COLUMNS)
+    db.cursor.execute(f"DELETE FROM {BENCH_TABLE}")
+    db.cursor.executemany(f"INSERT INTO {BENCH_TABLE} ({columns}) VALUES (%s, %s, %s, %s, %s)", rows)
+    db.conn.commit()
+
+
+def main(n):
+    db = Database(db_params)
+    reset_table(db)
+
+    start = time.perf_counter()
+    executemany_load(db, synthetic_reviews(n))
+    elapsed = time.perf_counter() - start
+    print(f"executemany: {n} rows in {elapsed:.2f}s ({n / elapsed:.0f} rows/sec)")
+
+    count, rate = db.replace_table_bulk(BENCH_TABLE, REVIEW_COLUMNS, synthetic_reviews(n))
+    print(f"COPY:        {count} rows in {count / rate:.2f}s ({rate:.0f} rows/sec)")
+
+    db.connect()
+    db.cursor.execute(f"DROP TABLE {BENCH_TABLE}")
+    db.conn.commit()
+    db.close()
+    close_pools()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
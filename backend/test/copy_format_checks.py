@@ -0,0 +1,80 @@
+"""Check that the committed datasets render to COPY text PostgreSQL accepts.
+
+COPY has no assignment casts, so every value bound for an INT column must be
+an integer literal ("194", not "194.0") and every FLOAT value a number.
+Renders scrape/cars.jsonl.gz and scrape/reviews.jsonl.gz through CopyBuffer
+and checks each field against its column type from table_create.sql. With
+--db, also loads the cars dataset into a scratch copy of cars in the local
+Postgres from compose.yaml.
+Run from the backend directory: python test/copy_format_checks.py [--db]
+"""
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scrape"))
+
+from dataset import iter_dataset
+from db import CAR_COLUMNS, REVIEW_COLUMNS, CopyBuffer, Database, close_pools
+
+SCRAPE_DIR = os.path.join(os.path.dirname(__file__), "..", "scrape")
+CHECK_TABLE = "cars_copy_check"
+
+# Column types in table_create.sql; text columns take any value
+INT = re.compile(r"[+-]?\d+")
+FLOAT = re.compile(r"[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?|NaN|[+-]?Infinity")
+COLUMN_TYPES = {
+    "cars": dict(zip(CAR_COLUMNS, [None, INT, INT, INT, INT, INT, None])),
+    "reviews": dict(zip(REVIEW_COLUMNS, [None, INT, None, None, FLOAT])),
+}
+
+
+def check_copy_text(kind, filename):
+    types = COLUMN_TYPES[kind]
+    buffer = CopyBuffer(record.convert_to_tuple()
+                        for record in iter_dataset(os.path.join(SCRAPE_DIR, filename), kind))
+    # Newlines inside values are escaped, so each line is one row
+    rows = buffer.read().split("\n")[:-1]
+    for row in rows:
+        for (column, pattern), value in zip(types.items(), row.split("\t")):
+            if pattern is not None and value != "\\N":
+                assert pattern.fullmatch(value), f"{filename}: {column} value {value!r} is not valid COPY input"
+    assert rows, f"{filename} is empty"
+    print(f"OK: {len(rows)} {kind} rows render to valid COPY text")
+    return len(rows)
+
+
+def load_cars(count):
+    from main import db_params
+
+    db = Database(db_params)
+    db.connect()
+    db.cursor.execute(f"DROP TABLE IF EXISTS {CHECK_TABLE}")
+    db.cursor.execute(f"CREATE TABLE {CHECK_TABLE} (LIKE cars INCLUDING ALL)")
+    db.conn.commit()
+    db.close()
+
+    rows = (car.convert_to_tuple() for car in iter_dataset(os.path.join(SCRAPE_DIR, "cars.jsonl.gz"), "cars"))
+    loaded, _ = db.replace_table_bulk(CHECK_TABLE, CAR_COLUMNS, rows)
+
+    db.connect()
+    db.cursor.execute(f"SELECT count(*) FROM {CHECK_TABLE}")
+    stored = db.cursor.fetchone()[0]
+    db.cursor.execute(f"DROP TABLE {CHECK_TABLE}")
+    db.conn.commit()
+    db.close()
+    close_pools()
+    assert loaded == stored == count, (loaded, stored, count)
+    print(f"OK: loaded {stored} cars with COPY")
+
+
+def main():
+    cars = check_copy_text("cars", "cars.jsonl.gz")
+    check_copy_text("reviews", "reviews.jsonl.gz")
+    if "--db" in sys.argv:
+        load_cars(cars)
+
+
+if __name__ == "__main__":
+    main()
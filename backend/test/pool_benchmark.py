@@ -0,0 +1,73 @@
+"""Requests/sec for /cars with and without the connection pool.
+
+Both runs go through the Flask app. The "before" run swaps in a Database
+that opens and closes its own connection, as every route used to. The
+response cache is turned off, so every request reaches the database.
+Needs the local Postgres from compose.yaml with the cars table loaded.
+Run from the backend directory: python test/pool_benchmark.py
+"""
+import os
+import sys
+import time
+import threading
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import main as api
+from scrape.db import Database, close_pools
+
+REQUESTS = 2000
+THREADS = 8
+
+
+class UnpooledDatabase(Database):
+    def connect(self):
+        if self.conn is None:
+            self.conn = psycopg2.connect(**self.db_params)
+            self.cursor = self.conn.cursor()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = None
+        self.cursor = None
+
+
+def request(client):
+    response = client.get("/cars")
+    assert response.status_code == 200
+
+
+def run(name, make_worker):
+    per_thread = REQUESTS // THREADS
+    threads = [threading.Thread(target=make_worker(per_thread)) for _ in range(THREADS)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    print(f"{name:>10}: {per_thread * THREADS / elapsed:8.1f} req/s ({elapsed:.2f}s, {THREADS} threads)")
+
+
+def main():
+    # Entries expire as soon as they are stored, so every request runs the queries
+    api.response_cache.ttl = 0
+
+    def worker(n):
+        def work():
+            client = api.app.test_client()
+            for _ in range(n):
+                request(client)
+        return work
+
+    api.Database = UnpooledDatabase
+    run("before", worker)
+    api.Database = Database
+    run("after", worker)
+    close_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Run the async review scraper against saved Edmunds pages served locally.
+
+Serves test/fixtures over HTTP on a free port, scrapes it without the browser
+fallback and checks the parsed reviews. A request for ?pagenum=N is served
+page-N.html from the directory when it exists and index.html otherwise, like
+a site that ignores the page number. Run from the backend directory:
+python test/scrape_fixtures.py
+"""
+import asyncio
+import functools
+import os
+import sys
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scrape"))
+
+from checkpoint import CrawlState
+from scrape import Review, scrape_reviews
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def translate_path(self, path):
+        url = urlsplit(path)
+        directory = super().translate_path(url.path)
+        page = parse_qs(url.query).get("pagenum", ["1"])[0]
+        paged = os.path.join(directory, f"page-{page}.html")
+        return paged if os.path.exists(paged) else directory
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures():
+    handler = functools.partial(QuietHandler, directory=FIXTURES)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def scrape(base_url, car, year, **kwargs):
+    state = CrawlState(tempfile.mkdtemp())
+    state.begin_run()
+    ok = asyncio.run(scrape_reviews(state, [car], [year], base_url=base_url, rate_per_host=50,
+                                    use_browser=False, **kwargs))
+    assert ok
+    return [Review.from_tuple(row) for row in state.iter_rows()]
+
+
+def main():
+    server = serve_fixtures()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/edmunds/toyota"
+    try:
+        reviews = scrape(base_url, "prius", "2023")
+        assert len(reviews) == 3, len(reviews)
+        assert reviews[0].title == "At last, the Prius is stylish!"
+        assert [r.rating for r in reviews] == [5, 5, 4]
+        assert all(r.car_name == "prius" and r.car_year == "2023" for r in reviews)
+        assert all(r.review_text and "<p>" not in r.review_text for r in reviews)
+        print("OK:", len(reviews), "reviews parsed from fixtures")
+
+        # Three pages of 2, 2 and 1 reviews: follows full pages and stops at the short one
+        reviews = scrape(base_url, "camry", "2024", page_size=2)
+        assert [r.rating for r in reviews] == [5, 3, 2, 5, 4], [r.rating for r in reviews]
+        assert reviews[-1].title == "Brakes feel grabby"
+        print("OK:", len(reviews), "reviews over 3 pages")
+
+        reviews = scrape(base_url, "camry", "2024", page_size=2, max_pages=2)
+        assert len(reviews) == 4, len(reviews)
+        print("OK: stopped at the page limit with", len(reviews), "reviews")
+
+        # Every page number serves the same full page; the repeat ends the crawl
+        reviews = scrape(base_url, "prius", "2023", page_size=3)
+        assert len(reviews) == 3, len(reviews)
+        print("OK: repeated page dropped,", len(reviews), "reviews kept")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Wall-clock time to summarize every model-year, sequential vs concurrent,
+and for a rerun with unchanged reviews served from the summary cache.
+
+Runs the summary scheduler over the review groups in scrape/reviews.jsonl.gz
+against the local fake OpenAI server, with 10% of requests rate limited.
+Run from the backend directory: python test/summarize_benchmark.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scrape"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from dataset import iter_dataset
+from analysis import summarize_groups
+from fake_openai import FakeOpenAIHandler, serve
+from llm_cache import LLMCache
+
+REVIEWS = os.path.join(os.path.dirname(__file__), "..", "scrape", "reviews.jsonl.gz")
+
+
+def main():
+    car_reviews = defaultdict(list)
+    for review in iter_dataset(REVIEWS, "reviews"):
+        car_reviews[f"{review.car_name} {review.car_year}"].append(review.review_text)
+
+    server, base_url = serve(latency=0.3, error_rate=0.1)
+    try:
+        for concurrency in (1, 8):
+            cache = LLMCache(os.path.join(tempfile.mkdtemp(), "cache.sqlite3"))
+            start = time.perf_counter()
+            summaries = asyncio.run(summarize_groups(car_reviews, concurrency, base_url=base_url, cache=cache))
+            elapsed = time.perf_counter() - start
+            print(f"concurrency={concurrency}: {len(summaries)}/{len(car_reviews)} groups in {elapsed:.1f}s")
+
+        # Unchanged reviews: everything should come from the cache
+        requests = FakeOpenAIHandler.requests
+        start = time.perf_counter()
+        summaries = asyncio.run(summarize_groups(car_reviews, 8, base_url=base_url, cache=cache))
+        elapsed = time.perf_counter() - start
+        print(f"cached rerun: {len(summaries)} groups in {elapsed:.2f}s, "
+              f"{FakeOpenAIHandler.requests - requests} requests sent")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
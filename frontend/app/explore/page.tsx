@@ -1,6 +1,6 @@
 "use client";
 
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import Slider from "rc-slider";
 import { motion, AnimatePresence } from "framer-motion";
 import Header from "@/components/headers/BlockHeader";
@@ -30,20 +30,65 @@ export default function Explore() {
     power: 0.4,
   });
   const [cars, setCars] = useState<CarOption[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  // Aborts the requests of a query once the filters or sort change
+  const queryController = useRef<AbortController | null>(null);
 
-  const fetchAllCarData = async () => {
-    const response = await fetch(`http://127.0.0.1:5000/all_cars`);
-    const data = await response.json();
-    const carData = data.all_cars.map((car: any) => ({
-      model: car[1],
-      price: Number.parseInt(car[4]),
+  // Price filter and price/MPG sorts run on the server; match score depends on the weights, so it is sorted here
+  const serverSort: Record<string, string> = {
+    "price-low": "msrp",
+    "price-high": "-msrp",
+    mpg: "-mpg",
+    "match-score": "car_id",
+  };
+
+  const toCarOption = (car: any) => {
+    const option = {
+      model: car.car_model,
+      price: car.msrp,
       features: [],
-      mpg: car[6] + "",
-      year: car[2],
-      horsepower: car[5],
+      mpg: car.mpg + "",
+      year: car.car_year,
+      horsepower: car.horsepower,
+      engineType: "",
       matchScore: 0,
-    }));
-    setCars(carData);
+    };
+    return { ...option, matchScore: calculateMatchScore(option) };
+  };
+
+  // Without a cursor this starts a new query and drops any older one still loading.
+  // Match score can only be sorted once every car is here, so it follows the cursors to the end.
+  const fetchCarData = async (cursor: string | null = null) => {
+    if (!cursor) {
+      queryController.current?.abort();
+      queryController.current = new AbortController();
+    }
+    const { signal } = queryController.current!;
+    const fetchAll = sortBy === "match-score";
+    const carData: CarOption[] = [];
+    let next = cursor;
+    try {
+      do {
+        const params = new URLSearchParams({
+          fields: "car_model,car_year,msrp,horsepower,mpg",
+          min_msrp: String(priceRange[0]),
+          max_msrp: String(priceRange[1]),
+          sort: serverSort[sortBy],
+          limit: fetchAll ? "200" : "60",
+        });
+        if (next) params.set("cursor", next);
+        const response = await fetch(`http://127.0.0.1:5000/all_cars?${params}`, { signal });
+        const data = await response.json();
+        carData.push(...(data.all_cars ?? []).map(toCarOption));
+        next = data.next_cursor ?? null;
+      } while (fetchAll && next);
+    } catch (error) {
+      if (signal.aborted) return;
+      throw error;
+    }
+    if (signal.aborted) return;
+    setCars((previous) => (cursor ? [...previous, ...carData] : carData));
+    setNextCursor(next);
   }
   
   useEffect(() => {
@@ -63,8 +108,15 @@ export default function Explore() {
 
 
   useEffect(() => {
-    fetchAllCarData();
-  }, []);
+    // Results of the previous query are stale as soon as it changes, not only once the new one starts
+    queryController.current?.abort();
+    setNextCursor(null);
+    // Wait for the price slider to settle before querying
+    const timer = setTimeout(() => fetchCarData(), 300);
+    return () => clearTimeout(timer);
+  }, [priceRange, sortBy]);
+
+  useEffect(() => () => queryController.current?.abort(), []);
 
   const calculateMatchScore = (car: CarOption) => {
     const priceScore = 1 - car.price / 40090;
@@ -133,24 +185,10 @@ export default function Explore() {
   }, [scoreWeights]);
   
 
-  const sortCars = (a: CarOption, b: CarOption) => {
-    switch (sortBy) {
-      case "price-low":
-        return a.price - b.price;
-      case "price-high":
-        return b.price - a.price;
-      case "mpg":
-        return Number(b.mpg) - Number(a.mpg);
-      case "match-score":
-        return b.matchScore - a.matchScore;
-      default:
-        return 0;
-    }
-  };
-
-  const filteredCars = cars
-    .filter((car) => car.price >= priceRange[0] && car.price <= priceRange[1])
-    .sort(sortCars);
+  const filteredCars =
+    sortBy === "match-score"
+      ? [...cars].sort((a, b) => b.matchScore - a.matchScore)
+      : cars;
 
   const formatPrice = (price: number) => `$${price.toLocaleString()}`;
   useEffect(() => {
@@ -314,6 +352,17 @@ export default function Explore() {
                   </AnimatePresence>
                 </motion.div>
 
+                {nextCursor && (
+                  <div className="flex justify-center mt-8">
+                    <button
+                      onClick={() => fetchCarData(nextCursor)}
+                      className="text-white bg-white/10 hover:bg-white/20 transition-colors duration-200 px-4 py-2 rounded-md"
+                    >
+                      Load more
+                    </button>
+                  </div>
+                )}
+
                 {selectedCars.length > 0 && (
                   <motion.div
                     initial={{ opacity: 0, y: 20 }}